@@ -3,6 +3,7 @@ from django.core.exceptions import ValidationError
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from hotelapp.images import derivative_urls
 from restaurant.serializers import RestaurantOutputSerializer
 from django.contrib.auth.hashers import check_password, make_password
 
@@ -13,6 +14,7 @@ class UserSerializer(serializers.ModelSerializer):
 
     phone_number = serializers.CharField(required=True)
     password = serializers.CharField(max_length=60, min_length=8, write_only=True)
+    avatar_derivatives = serializers.SerializerMethodField()
     # restaurant = RestaurantOutputSerializer(many=False, required=False, context = {"request": request} )
 
     class Meta:
@@ -20,6 +22,7 @@ class UserSerializer(serializers.ModelSerializer):
         fields = [
             "id",
             "avatar",
+            "avatar_derivatives",
             "first_name",
             "last_name",
             "email",
@@ -38,6 +41,9 @@ class UserSerializer(serializers.ModelSerializer):
             "updated_at",
         ]
 
+    def get_avatar_derivatives(self, obj):
+        return derivative_urls(obj.avatar, self.context.get("request"))
+
     def validate_password(self, value):
         valid_password(value)
         return value
@@ -0,0 +1,11 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from hotelapp.images import schedule_derivatives
+
+
+@receiver(post_save, sender=get_user_model())
+def resize_avatar(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and "avatar" not in update_fields):
+        return
+    schedule_derivatives(instance.avatar)
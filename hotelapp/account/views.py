@@ -38,6 +38,7 @@ from .utils import send_email_message
 from rest_framework.permissions import IsAuthenticated
 from django.db.models import Q
 from django.contrib.auth import get_user_model
+from hotelapp.pagination import paginate_queryset
 
 
 class KitchenStaffDeleteAPIView(APIView):
@@ -174,12 +175,18 @@ class GetAllKitchenUserApiView(APIView):
         try:
             if isactive and isactive.lower() =='true':
                 userObj = User.objects.filter(Q(role="kitchen_staff") & Q(is_active = True) & Q(is_staff=True) )
+                userObj, pagination_info = paginate_queryset(request, userObj)
                 user = UserSerializer(userObj, many=True ,context={'request':request}).data
                 resObj = {'status':status.HTTP_200_OK,'message':'', 'detail':user, 'error':False}
+                if pagination_info is not None:
+                    resObj['pagination_info'] = pagination_info
             elif  isactive and isactive.lower() =='false':
                 userObj = User.objects.filter(Q(role="kitchen_staff") & Q(is_active = False) & Q(is_staff=True) )
+                userObj, pagination_info = paginate_queryset(request, userObj)
                 user = UserSerializer(userObj, many=True ,context={'request':request}).data
                 resObj = {'status':status.HTTP_200_OK,'message':'', 'detail':user, 'error':False}
+                if pagination_info is not None:
+                    resObj['pagination_info'] = pagination_info
             else:
                 resObj = {'status':status.HTTP_400_BAD_REQUEST,'message':'', 'detail':[], 'error':True}
 
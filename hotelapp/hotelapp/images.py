@@ -0,0 +1,177 @@
+"""
+Resized derivatives of uploaded images.
+
+Every uploaded item image, logo and avatar gets WebP and JPEG copies at the
+widths in ``IMAGE_DERIVATIVE_WIDTHS``, so clients can load a small version
+instead of the original phone photo.  Derivatives are generated off the
+request path, in a thread pool, once the upload is committed; the
+``generate_image_derivatives`` command creates the missing ones for existing
+uploads.
+
+Derivative names follow from the original name (see ``derivative_name``),
+so serializers can build their urls without storing them anywhere.  Whether
+an image has them is remembered in the default cache once generated or
+looked up, so listing rows does not ask the storage for every image.
+"""
+
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+DERIVATIVE_DIR = "derivatives"
+DERIVATIVE_FORMATS = {"webp": "WEBP", "jpeg": "JPEG"}
+# How long an image is remembered as having no derivatives (yet); once they
+# are generated that is recorded right away, by the process generating them.
+MISSING_DERIVATIVES_TIMEOUT = 60
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def derivative_name(name, width, extension):
+    return f"{DERIVATIVE_DIR}/{name}.{width}w.{extension}"
+
+
+def derivative_names(name):
+    return [
+        derivative_name(name, width, extension)
+        for width in settings.IMAGE_DERIVATIVE_WIDTHS
+        for extension in DERIVATIVE_FORMATS
+    ]
+
+
+def has_derivatives(name, storage=default_storage):
+    # Written last, so its presence means the set is complete.
+    return storage.exists(derivative_names(name)[-1])
+
+
+def availability_key(name):
+    return f"image-derivatives:{hashlib.sha256(name.encode()).hexdigest()}"
+
+
+def remember_derivatives(name, available=True):
+    cache.set(
+        availability_key(name),
+        available,
+        timeout=None if available else MISSING_DERIVATIVES_TIMEOUT,
+    )
+
+
+def forget_derivatives(name):
+    cache.delete(availability_key(name))
+
+
+def derivatives_available(name, storage=default_storage):
+    """``has_derivatives``, answered from the cache when known."""
+    available = cache.get(availability_key(name))
+    if available is None:
+        available = has_derivatives(name, storage)
+        remember_derivatives(name, available)
+    return available
+
+
+def derivative_urls(field_file, request=None):
+    """
+    Return ``{width: {"webp": url, "jpeg": url}}`` for an image field, or
+    None while there are no derivatives (yet); clients then use the
+    original.
+    """
+    if not field_file or not derivatives_available(
+        field_file.name, field_file.storage
+    ):
+        return None
+    urls = {}
+    for width in settings.IMAGE_DERIVATIVE_WIDTHS:
+        urls[str(width)] = {}
+        for extension in DERIVATIVE_FORMATS:
+            url = field_file.storage.url(
+                derivative_name(field_file.name, width, extension)
+            )
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            urls[str(width)][extension] = url
+    return urls
+
+
+def flatten(image):
+    """Drop transparency onto a white background, for JPEG."""
+    if image.mode in ("RGBA", "LA") or "transparency" in image.info:
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def generate_derivatives(name, storage=default_storage, force=False):
+    """
+    Write the derivatives of the stored image ``name``.  Images narrower than
+    a width are not enlarged.  Returns False when there was nothing to do.
+    """
+    if not force and has_derivatives(name, storage):
+        remember_derivatives(name)
+        return False
+    with storage.open(name) as file:
+        image = ImageOps.exif_transpose(Image.open(file))
+        image = flatten(image)
+    for width in settings.IMAGE_DERIVATIVE_WIDTHS:
+        resized = image
+        if image.width > width:
+            height = max(1, round(image.height * width / image.width))
+            resized = image.resize((width, height), Image.LANCZOS)
+        for extension, image_format in DERIVATIVE_FORMATS.items():
+            output = BytesIO()
+            resized.save(
+                output,
+                image_format,
+                quality=settings.IMAGE_DERIVATIVE_QUALITY,
+                optimize=True,
+            )
+            target = derivative_name(name, width, extension)
+            if storage.exists(target):
+                storage.delete(target)
+            storage.save(target, ContentFile(output.getvalue()))
+    remember_derivatives(name)
+    return True
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.IMAGE_DERIVATIVE_WORKERS,
+                thread_name_prefix="image-derivatives",
+            )
+    return _executor
+
+
+def run(name, storage, on_done):
+    try:
+        if generate_derivatives(name, storage) and on_done is not None:
+            on_done()
+    except Exception:
+        logger.exception("Could not generate the derivatives of %s", name)
+
+
+def schedule_derivatives(field_file, on_done=None):
+    """
+    Generate the derivatives of an image field in the worker pool once the
+    current transaction commits.  ``on_done`` is called from the worker
+    after new derivatives were written.
+    """
+    if not field_file:
+        return
+    name, storage = field_file.name, field_file.storage
+    transaction.on_commit(lambda: get_executor().submit(run, name, storage, on_done))
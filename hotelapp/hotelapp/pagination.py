@@ -0,0 +1,289 @@
+import base64
+import binascii
+import json
+
+from django.core.paginator import InvalidPage, Paginator
+from django.db.models import F, Q
+from django.db.models.constants import LOOKUP_SEP
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+
+DEFAULT_ORDERING = ("-created_at", "-id")
+MAX_PAGE_SIZE = 100
+
+
+def is_nullable(model, path):
+    """
+    Whether the field ``path`` (e.g. ``customer_id__phone_number``) of
+    ``model`` can be NULL, counting nullable and reverse relations on the way.
+    """
+    for name in path.split(LOOKUP_SEP):
+        if name == "pk":
+            field = model._meta.pk
+        else:
+            field = model._meta.get_field(name)
+        if field.null:
+            return True
+        if not field.is_relation:
+            return False
+        model = field.related_model
+    return False
+
+
+def order_expression(key, descending, nullable):
+    """
+    ``ORDER BY`` for one key: nulls last when descending and first when
+    ascending, spelled out only for nullable fields so the ordering of the
+    others can still be read from an index.
+    """
+    if not nullable:
+        return F(key).desc() if descending else F(key).asc()
+    if descending:
+        return F(key).desc(nulls_last=True)
+    return F(key).asc(nulls_first=True)
+
+
+class CursorPage:
+    def __init__(self, items, next_cursor, previous_cursor):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+
+class CursorPaginator:
+    """
+    Keyset paginator.
+
+    Pages are selected with ``WHERE (key) > (cursor) ORDER BY key LIMIT n``
+    instead of ``COUNT(*)`` plus ``OFFSET``, so every page costs the same no
+    matter how deep the client pages.  ``ordering`` must end with a unique
+    field (``id``) to make the key total.  Ascending keys sort nulls first and
+    descending keys nulls last; the NULL branches are only added to the
+    ordering and the ``WHERE`` for nullable fields, so the keys of ``NOT NULL``
+    fields stay plain comparisons an index can answer.
+
+    ``continuation`` is an optional second queryset whose rows all sort after
+    those of ``queryset``, e.g. archived rows; pages run from one into the
+    other and the second one is only queried once the first runs out.
+    """
+
+    def __init__(
+        self, queryset, ordering=DEFAULT_ORDERING, page_size=10, continuation=None
+    ):
+        self.queryset = queryset
+        self.continuation = continuation
+        self.ordering = [
+            (
+                field.lstrip("-"),
+                field.startswith("-"),
+                is_nullable(queryset.model, field.lstrip("-")),
+            )
+            for field in ordering
+        ]
+        self.page_size = page_size
+
+    def page(self, cursor=None):
+        values, reverse = self.decode_cursor(cursor) if cursor else (None, False)
+        sources = [self.queryset]
+        if self.continuation is not None:
+            sources.append(self.continuation)
+        if reverse:
+            sources.reverse()
+        items = []
+        for source in sources:
+            queryset = self.select(source, values, reverse)
+            items.extend(queryset[: self.page_size + 1 - len(items)])
+            if len(items) > self.page_size:
+                break
+        has_more = len(items) > self.page_size
+        items = items[: self.page_size]
+        if reverse:
+            items.reverse()
+
+        next_cursor = previous_cursor = None
+        if items:
+            if has_more or reverse:
+                next_cursor = self.encode_cursor(items[-1], reverse=False)
+            if values is not None and (has_more or not reverse):
+                previous_cursor = self.encode_cursor(items[0], reverse=True)
+        return CursorPage(items, next_cursor, previous_cursor)
+
+    def select(self, source, values=None, reverse=False):
+        """
+        The rows of ``source`` in page order, from the cursor ``values`` on.
+        """
+        queryset = source.annotate(
+            **{
+                self.key_name(index): F(field)
+                for index, (field, _, _) in enumerate(self.ordering)
+            }
+        ).order_by(*self.order_by(reverse))
+        if values is not None:
+            queryset = queryset.filter(self.after(values, reverse))
+        return queryset
+
+    def key_name(self, index):
+        return f"cursor_key_{index}"
+
+    def directions(self, reverse):
+        return [
+            (self.key_name(index), descending != reverse, nullable)
+            for index, (_, descending, nullable) in enumerate(self.ordering)
+        ]
+
+    def order_by(self, reverse):
+        return [
+            order_expression(key, descending, nullable)
+            for key, descending, nullable in self.directions(reverse)
+        ]
+
+    def after(self, values, reverse):
+        condition = Q(pk__in=[])
+        equal = Q()
+        for (key, descending, nullable), value in zip(
+            self.directions(reverse), values
+        ):
+            if value is None:
+                beyond = None if descending else Q(**{f"{key}__isnull": False})
+                same = Q(**{f"{key}__isnull": True})
+            else:
+                lookup = "lt" if descending else "gt"
+                beyond = Q(**{f"{key}__{lookup}": value})
+                if descending and nullable:
+                    beyond |= Q(**{f"{key}__isnull": True})
+                same = Q(**{key: value})
+            if beyond is not None:
+                condition |= equal & beyond
+            equal &= same
+        return condition
+
+    def encode_cursor(self, item, reverse):
+        values = []
+        for index in range(len(self.ordering)):
+            value = getattr(item, self.key_name(index))
+            values.append(value.isoformat() if hasattr(value, "isoformat") else value)
+        payload = json.dumps({"v": values, "r": reverse}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    def decode_cursor(self, cursor):
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            values = payload["v"]
+            reverse = bool(payload["r"])
+            if len(values) != len(self.ordering):
+                raise ValueError
+        except (binascii.Error, ValueError, KeyError, TypeError):
+            raise NotFound("Invalid cursor.")
+        return values, reverse
+
+
+class ChainedRows:
+    """
+    Two querysets sliced as one list, the rows of ``second`` after those of
+    ``first``, for numbered pages over a ``continuation``.
+    """
+
+    def __init__(self, first, second):
+        self.first = first
+        self.second = second
+
+    @cached_property
+    def first_count(self):
+        return self.first.count()
+
+    def count(self):
+        return self.first_count + self.second.count()
+
+    def __getitem__(self, index):
+        start, stop = index.start or 0, index.stop
+        items = list(self.first[start:stop]) if start < self.first_count else []
+        if stop > self.first_count:
+            items += self.second[
+                max(start - self.first_count, 0) : stop - self.first_count
+            ]
+        return items
+
+
+def numbered_page(queryset, ordering, page_size, number, continuation=None):
+    """
+    Deprecated ``page`` based pagination, kept for the clients from before
+    cursors: ``COUNT(*)`` plus ``OFFSET``, answered with the ``total_pages``
+    and ``current_page`` they read.
+    """
+    order_by = [
+        order_expression(
+            field.lstrip("-"),
+            field.startswith("-"),
+            is_nullable(queryset.model, field.lstrip("-")),
+        )
+        for field in ordering
+    ]
+    rows = queryset.order_by(*order_by)
+    if continuation is not None:
+        rows = ChainedRows(rows, continuation.order_by(*order_by))
+    paginator = Paginator(rows, page_size)
+    try:
+        page = paginator.page(number)
+    except InvalidPage as exc:
+        raise NotFound(str(exc))
+    return list(page), {
+        "page_size": page_size,
+        "total_pages": paginator.num_pages,
+        "current_page": page.number,
+        "total_items": paginator.count,
+    }
+
+
+def get_page_size(request, default):
+    try:
+        page_size = int(request.query_params.get("page_size", default))
+    except (TypeError, ValueError):
+        page_size = default
+    return min(max(page_size, 1), MAX_PAGE_SIZE)
+
+
+def paginate_queryset(
+    request,
+    queryset,
+    ordering=DEFAULT_ORDERING,
+    default_page_size=None,
+    continuation=None,
+):
+    """
+    Cursor-paginate ``queryset`` for a list api.
+
+    Returns ``(items, pagination_info)``.  With ``default_page_size=None``
+    pagination is opt-in: unless the client sends ``page_size``, ``cursor`` or
+    ``page`` the whole queryset is returned and ``pagination_info`` is None.
+    The total count is only computed when the client asks for it with
+    ``include_total=true``.  See ``CursorPaginator`` for ``continuation``.
+
+    A ``page`` number without a cursor still selects a numbered page, see
+    ``numbered_page``; new clients should follow the cursors.
+    """
+    cursor = request.query_params.get("cursor")
+    page_number = request.query_params.get("page")
+    if default_page_size is None and not (
+        cursor or page_number or "page_size" in request.query_params
+    ):
+        return queryset, None
+
+    page_size = get_page_size(request, default_page_size or 10)
+    if page_number and not cursor:
+        return numbered_page(queryset, ordering, page_size, page_number, continuation)
+    paginator = CursorPaginator(
+        queryset, ordering=ordering, page_size=page_size, continuation=continuation
+    )
+    page = paginator.page(cursor)
+    pagination_info = {
+        "page_size": paginator.page_size,
+        "next_cursor": page.next_cursor,
+        "previous_cursor": page.previous_cursor,
+    }
+    if request.query_params.get("include_total", "").lower() == "true":
+        total_items = queryset.count()
+        if continuation is not None:
+            total_items += continuation.count()
+        pagination_info["total_items"] = total_items
+        pagination_info["total_pages"] = -(-total_items // paginator.page_size)
+    return page.items, pagination_info
@@ -96,6 +96,71 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+# Replayed order submissions are remembered for this many seconds.
+ORDER_IDEMPOTENCY_TIMEOUT = 60 * 60
+
+# Identical orders of a session sent without an Idempotency-Key header are
+# only replayed within this many seconds; later ones are new orders.
+ORDER_IMPLICIT_IDEMPOTENCY_TIMEOUT = 10
+
+# Number of counter slots a hot item's stock is split into by shard_stock.
+STOCK_SLOT_COUNT = 8
+# Seconds a cart reservation holds stock before fold_stock releases it.
+STOCK_RESERVATION_TIMEOUT = 10 * 60
+
+# Order feed for kitchen screens: events kept per restaurant for clients that
+# reconnect, and seconds between keepalive comments on idle streams.
+ORDER_FEED_BUFFER_SIZE = 256
+ORDER_FEED_HEARTBEAT = 15
+
+# Orders older than this many days are moved to the archive by archive_orders.
+ORDER_ARCHIVE_AFTER_DAYS = 180
+# Seconds a recently ordering customer stays in the "customers" cache.  It is
+# dropped on every change anyway; like the "menu" cache it must be shared when
+# the api runs in several processes.
+CUSTOMER_CACHE_TIMEOUT = 60 * 60
+
+# Seconds a public menu stays cached.  Menu changes invalidate it at once,
+# stock only when items sell out or come back, so this also bounds how far
+# behind its quantities can be; see restaurant.Inventory.menu_cache.  The
+# "menu" cache must be shared (e.g. redis or memcached) when the api runs in
+# several processes.
+MENU_CACHE_TIMEOUT = 60 * 60
+
+# Resized copies of uploaded images, see hotelapp.images: widths in pixels,
+# WebP/JPEG quality and the size of the thread pool generating them.
+IMAGE_DERIVATIVE_WIDTHS = (160, 320, 640)
+IMAGE_DERIVATIVE_QUALITY = 80
+IMAGE_DERIVATIVE_WORKERS = 2
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "idempotency": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "order-idempotency",
+        "TIMEOUT": ORDER_IDEMPOTENCY_TIMEOUT,
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    },
+    "menu": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "restaurant-menu",
+        "TIMEOUT": MENU_CACHE_TIMEOUT,
+        "OPTIONS": {"MAX_ENTRIES": 5000},
+    },
+    "customers": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "order-customers",
+        "TIMEOUT": CUSTOMER_CACHE_TIMEOUT,
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -135,6 +200,18 @@ STATIC_URL = "static/"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Uploads are stored under the hash of their content, see hotelapp.storage.
+STORAGES = {
+    "default": {"BACKEND": "hotelapp.storage.ContentAddressedStorage"},
+    "staticfiles": {
+        "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"
+    },
+}
+
+# Seconds an unreferenced media file is kept by collect_media_garbage, so
+# uploads whose rows are not committed yet are not collected.
+MEDIA_GC_GRACE_PERIOD = 60 * 60
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -170,6 +247,16 @@ REST_FRAMEWORK = {
         "rest_framework.authentication.SessionAuthentication",
         "rest_framework_simplejwt.authentication.JWTAuthentication",
     ],
+    # orjson backed JSON, see hotelapp.renderers.
+    "DEFAULT_RENDERER_CLASSES": [
+        "hotelapp.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "hotelapp.renderers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
     "EXCEPTION_HANDLER": "hotelapp.error_handler.custom_exception_handler",
 }
@@ -0,0 +1,91 @@
+"""
+Content-addressed media storage.
+
+Uploads are stored under the SHA-256 of their content, sharded by its first
+two byte pairs (``ab/cd/abcd….png``), whatever name and ``upload_to`` they
+come with.  The same photo uploaded for several items, restaurants or users
+is stored once and shared by all the rows referring to it, and a stored file
+never changes, so it can be served with a cache lifetime of forever.
+
+Shared files are never deleted by the rows referring to them: the
+``collect_media_garbage`` command counts the references of every stored file
+and deletes the ones no row refers to any more, e.g. after an item or a
+restaurant was deleted.
+
+Derivatives (see hotelapp.images) keep the names derived from their original
+and are not cached forever: ``generate_image_derivatives --force`` rewrites
+them in place.
+"""
+
+import hashlib
+import os
+import re
+from collections import Counter
+
+from django.apps import apps
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import models
+from django.views.static import serve
+
+from .images import DERIVATIVE_DIR
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+CONTENT_ADDRESSED_NAME = re.compile(r"^[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(\.\w+)?$")
+
+
+def content_name(digest, name):
+    extension = os.path.splitext(name)[1].lower()
+    return f"{digest[:2]}/{digest[2:4]}/{digest}{extension}"
+
+
+def is_content_addressed(name):
+    return CONTENT_ADDRESSED_NAME.match(name) is not None
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if name.startswith(DERIVATIVE_DIR + "/"):
+            return super().save(name, content, max_length)
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        name = content_name(digest.hexdigest(), name)
+        if self.exists(name):
+            # Already stored for another upload: share it.  It may be an
+            # orphan, so it is made recent again for collect_media_garbage to
+            # leave it alone until the new row is committed.
+            os.utime(self.path(name))
+            return name
+        return super().save(name, content, max_length)
+
+
+def file_references():
+    """
+    Count the rows referring to every stored file, over the file fields of
+    all models.
+    """
+    references = Counter()
+    for model in apps.get_models():
+        for field in model._meta.get_fields():
+            if not isinstance(field, models.FileField):
+                continue
+            references.update(
+                model._base_manager.exclude(**{field.name: ""})
+                .exclude(**{f"{field.name}__isnull": True})
+                .values_list(field.name, flat=True)
+            )
+    return references
+
+
+def serve_media(request, path, document_root=None, show_indexes=False):
+    """``django.views.static.serve`` with immutable caching of hashed files."""
+    response = serve(request, path, document_root, show_indexes)
+    if is_content_addressed(path):
+        response["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+    return response
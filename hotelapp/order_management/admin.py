@@ -1,5 +1,12 @@
 from django.contrib import admin
-from .models import Customer, OrderItem, Order
+from .models import (
+    ArchivedOrder,
+    Customer,
+    DailyItemRollup,
+    DailySalesRollup,
+    OrderItem,
+    Order,
+)
 
 
 @admin.register(Customer)
@@ -10,8 +17,15 @@ class CustomerAdmin(admin.ModelAdmin):
 
 @admin.register(OrderItem)
 class OrderItemAdmin(admin.ModelAdmin):
-    list_display = ("restaurant_id", "inventory_id", "quantity")
+    list_display = ("order", "restaurant_id", "inventory_id", "quantity")
     list_filter = ("restaurant_id", "inventory_id")
+    raw_id_fields = ("order",)
+
+
+class OrderItemInline(admin.TabularInline):
+    model = OrderItem
+    extra = 0
+    raw_id_fields = ("inventory_id",)
 
 
 @admin.register(Order)
@@ -25,4 +39,36 @@ class OrderAdmin(admin.ModelAdmin):
         "order_status",
     )
     list_filter = ("restaurant_id", "order_status", "order_type")
-    filter_horizontal = ("order_items",)
+    inlines = (OrderItemInline,)
+
+
+@admin.register(DailySalesRollup)
+class DailySalesRollupAdmin(admin.ModelAdmin):
+    list_display = (
+        "date",
+        "restaurant_id",
+        "order_type",
+        "order_status",
+        "order_count",
+        "revenue",
+    )
+    list_filter = ("restaurant_id", "order_type", "order_status")
+
+
+@admin.register(DailyItemRollup)
+class DailyItemRollupAdmin(admin.ModelAdmin):
+    list_display = ("date", "restaurant_id", "inventory_id", "quantity", "revenue")
+    list_filter = ("restaurant_id",)
+
+
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "restaurant_id",
+        "created_at",
+        "order_type",
+        "order_status",
+        "archived_at",
+    )
+    list_filter = ("restaurant_id", "order_status", "order_type")
@@ -0,0 +1,171 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .export import EXPORT_CHUNK_SIZE
+from .filters import filter_created_range
+from .models import ArchivedOrder, Order
+from .rollups import keep_rollups
+from .serializers import OrderOutputSerializer
+
+
+def archive_horizon():
+    """Orders created before this moment are moved to the archive."""
+    return timezone.now() - timedelta(days=settings.ORDER_ARCHIVE_AFTER_DAYS)
+
+
+def needs_archive(restaurant, start):
+    """
+    Whether a time range starting at ``start`` (None for open) reaches back
+    far enough to include archived orders of the restaurant.
+
+    Asks the archive itself rather than comparing with the horizon, as
+    ``archive_orders --days`` may have moved newer orders there.
+    """
+    return (
+        start is None
+        or ArchivedOrder.objects.filter(
+            restaurant_id=restaurant, created_at__gte=start
+        ).exists()
+    )
+
+
+def archive_batch(cutoff, batch_size):
+    """
+    Move up to ``batch_size`` of the oldest orders created before ``cutoff``
+    to the archive.  Returns the number of orders moved.
+
+    Orders are taken oldest first, so every archived order is older than
+    every live one; list and export rely on that to append the archive after
+    the live rows.
+    """
+    with transaction.atomic():
+        orders = list(
+            OrderOutputSerializer.setup_eager_loading(
+                Order.objects.select_for_update(of=("self",))
+                .select_related("customer_id", "table_no")
+                .filter(created_at__lt=cutoff)
+                .order_by("created_at", "id")
+            )[:batch_size]
+        )
+        if not orders:
+            return 0
+        payloads = OrderOutputSerializer(orders, many=True).data
+        ArchivedOrder.objects.bulk_create(
+            [
+                ArchivedOrder(
+                    id=order.id,
+                    restaurant_id_id=order.restaurant_id_id,
+                    created_at=order.created_at,
+                    order_type=order.order_type,
+                    order_status=order.order_status,
+                    payment_status=order.payment_status,
+                    table_number=order.table_no.tablenumber if order.table_no else None,
+                    customer_name=order.customer_id.name if order.customer_id else None,
+                    customer_phone_number=(
+                        order.customer_id.phone_number if order.customer_id else None
+                    ),
+                    payload=payload,
+                )
+                for order, payload in zip(orders, payloads)
+            ]
+        )
+        # The orders stay counted in the sales rollups.  Their items go with
+        # them through the cascade.
+        with keep_rollups():
+            Order.objects.filter(id__in=[order.id for order in orders]).delete()
+    return len(orders)
+
+
+def archive_orders(cutoff=None, batch_size=500):
+    """
+    Archive all orders created before ``cutoff`` (default the horizon), one
+    transaction per batch.  Returns the number of orders moved.
+    """
+    cutoff = cutoff or archive_horizon()
+    archived = 0
+    while True:
+        moved = archive_batch(cutoff, batch_size)
+        archived += moved
+        if moved < batch_size:
+            return archived
+
+
+def archived_orders(restaurant, filters, start, end):
+    return filter_created_range(
+        ArchivedOrder.objects.filter(restaurant_id=restaurant, **filters), start, end
+    )
+
+
+def serialize_orders(items):
+    """
+    Render a page mixing live and archived orders; archived ones are served
+    from their stored payload.
+    """
+    live = OrderOutputSerializer(
+        [item for item in items if isinstance(item, Order)], many=True
+    ).data
+    live = iter(live)
+    return [
+        next(live) if isinstance(item, Order) else item.payload for item in items
+    ]
+
+
+def archived_export_rows(queryset):
+    """
+    Iterate archived orders as the flat rows of ``export.export_rows``,
+    oldest first.
+    """
+    rows = (
+        queryset.order_by("created_at", "id")
+        .values_list(
+            "id",
+            "created_at",
+            "order_type",
+            "order_status",
+            "payment_status",
+            "table_number",
+            "customer_name",
+            "customer_phone_number",
+            "payload",
+        )
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    for (
+        order_id,
+        created_at,
+        order_type,
+        order_status,
+        payment_status,
+        table_number,
+        customer_name,
+        customer_phone_number,
+        payload,
+    ) in rows:
+        order = (
+            order_id,
+            created_at,
+            order_type,
+            order_status,
+            payment_status,
+            payload.get("payment_id"),
+            payload.get("session_id"),
+            table_number,
+            customer_name,
+            customer_phone_number,
+        )
+        # In item id order, like the live rows.
+        items = sorted(payload.get("order_items") or [], key=lambda item: item["id"])
+        if not items:
+            yield order + (None, None, None, None)
+        for item in items:
+            inventory = item.get("inventory") or {}
+            unit_price = item.get("unit_price", inventory.get("unit_price"))
+            yield order + (
+                inventory.get("id"),
+                inventory.get("name"),
+                item.get("quantity"),
+                Decimal(unit_price) if unit_price is not None else None,
+            )
@@ -0,0 +1,86 @@
+import re
+
+from django.core.cache import caches
+from django.db import IntegrityError, transaction
+from .models import Customer
+
+
+def normalize_phone(value):
+    """
+    Strip the formatting from a phone number: "+91 98989-89898" becomes
+    "+919898989898".  Only digits and a leading "+" are kept.
+    """
+    value = str(value or "").strip()
+    digits = re.sub(r"\D", "", value)
+    return f"+{digits}" if value.startswith("+") and digits else digits
+
+
+class CustomerCache:
+    """
+    Recently resolved customers by restaurant and phone number, kept in the
+    "customers" cache.
+
+    Saves the lookup for regulars; entries are dropped when the customer is
+    saved or deleted, see ``order_management.signals``.  The cache is shared
+    by all processes, so none of them keeps serving a stale customer.
+    """
+
+    def key(self, restaurant_id, phone_number):
+        return f"customer:{restaurant_id}:{phone_number}"
+
+    def get(self, restaurant_id, phone_number):
+        return caches["customers"].get(self.key(restaurant_id, phone_number))
+
+    def put(self, customer):
+        caches["customers"].set(
+            self.key(customer.restaurant_id_id, customer.phone_number), customer
+        )
+
+    def discard(self, restaurant_id, phone_number):
+        caches["customers"].delete(self.key(restaurant_id, phone_number))
+
+
+customer_cache = CustomerCache()
+
+
+def resolve_customer(restaurant_id, phone_number, name, address=None):
+    """
+    Return the restaurant's customer with this phone number, creating it on
+    the first order.  A changed name, or a new address, is saved in place.
+    """
+    phone_number = normalize_phone(phone_number)
+    restaurant_pk = getattr(restaurant_id, "pk", restaurant_id)
+    customer = customer_cache.get(restaurant_pk, phone_number)
+    if customer is None:
+        customer = Customer.objects.filter(
+            restaurant_id=restaurant_pk, phone_number=phone_number
+        ).first()
+    if customer is None:
+        try:
+            with transaction.atomic():
+                customer = Customer.objects.create(
+                    restaurant_id_id=restaurant_pk,
+                    phone_number=phone_number,
+                    name=name,
+                    address=address,
+                )
+        except IntegrityError:
+            # Created by a concurrent order of the same customer.
+            customer = Customer.objects.get(
+                restaurant_id=restaurant_pk, phone_number=phone_number
+            )
+        else:
+            customer_cache.put(customer)
+            return customer
+
+    changed = []
+    if name and customer.name != name:
+        customer.name = name
+        changed.append("name")
+    if address and customer.address != address:
+        customer.address = address
+        changed.append("address")
+    if changed:
+        customer.save(update_fields=changed + ["updated_at"])
+    customer_cache.put(customer)
+    return customer
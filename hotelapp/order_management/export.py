@@ -0,0 +1,95 @@
+import csv
+from decimal import Decimal
+from itertools import groupby
+
+from hotelapp.renderers import dumps
+
+EXPORT_CHUNK_SIZE = 2000
+
+# One row per order line.  Orders without items give a single row with
+# empty item columns.
+EXPORT_FIELDS = (
+    ("order_id", "id"),
+    ("created_at", "created_at"),
+    ("order_type", "order_type"),
+    ("order_status", "order_status"),
+    ("payment_status", "payment_status"),
+    ("payment_id", "payment_id"),
+    ("session_id", "session_id"),
+    ("table_number", "table_no__tablenumber"),
+    ("customer_name", "customer_id__name"),
+    ("customer_phone_number", "customer_id__phone_number"),
+    ("inventory_id", "order_items__inventory_id"),
+    ("item_name", "order_items__inventory_id__name"),
+    ("quantity", "order_items__quantity"),
+    ("unit_price", "order_items__unit_price"),
+)
+EXPORT_COLUMNS = [column for column, _ in EXPORT_FIELDS]
+ORDER_COLUMNS = EXPORT_COLUMNS[: EXPORT_COLUMNS.index("inventory_id")]
+
+
+def export_rows(queryset):
+    """
+    Iterate the flat order line rows of ``queryset`` as tuples in
+    ``EXPORT_COLUMNS`` order, oldest order first, without loading model
+    instances or the whole result into memory.
+    """
+    return (
+        queryset.order_by("created_at", "id", "order_items__id")
+        .values_list(*[lookup for _, lookup in EXPORT_FIELDS])
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+
+
+class Echo:
+    """File-like object handing back what is written, for ``csv.writer``."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_COLUMNS + ["line_total"])
+    for row in rows:
+        quantity, unit_price = row[-2], row[-1]
+        line_total = ""
+        if quantity is not None and unit_price is not None:
+            line_total = quantity * unit_price
+        values = [
+            value.isoformat() if hasattr(value, "isoformat") else value
+            for value in row
+        ]
+        yield writer.writerow(values + [line_total])
+
+
+def order_document(order_rows):
+    """Fold the line rows of one order into a nested document."""
+    first = order_rows[0]
+    document = {"id": first[0], **dict(zip(ORDER_COLUMNS[1:], first[1:]))}
+    document["items"] = []
+    total = Decimal("0.00")
+    for row in order_rows:
+        inventory_id, name, quantity, unit_price = row[len(ORDER_COLUMNS):]
+        if quantity is None:
+            continue
+        line_total = quantity * unit_price if unit_price is not None else None
+        total += line_total or 0
+        document["items"].append(
+            {
+                "inventory_id": inventory_id,
+                "name": name,
+                "quantity": quantity,
+                # Amounts as strings, like the api's decimal fields.
+                "unit_price": str(unit_price) if unit_price is not None else None,
+                "line_total": str(line_total) if line_total is not None else None,
+            }
+        )
+    document["total"] = str(total)
+    return document
+
+
+def stream_ndjson(rows):
+    """One JSON document per order, its line rows grouped into ``items``."""
+    for _, order_rows in groupby(rows, key=lambda row: row[0]):
+        yield dumps(order_document(list(order_rows))) + b"\n"
@@ -0,0 +1,289 @@
+"""
+Server-sent events feed of new orders and status changes for kitchen screens.
+
+The feed is served by ``feed_application``, a plain ASGI app that
+``hotelapp.asgi`` routes ``FEED_PATH`` to, so it only exists when the project
+runs under an ASGI server (e.g. ``uvicorn hotelapp.asgi:application``).
+Events go through an in-process broker: orders written by another process
+(e.g. a WSGI worker) are not pushed, so run the api under a single ASGI
+worker per restaurant group, or swap the broker for a shared one.
+
+Clients authenticate with their access token, either as ``Authorization:
+Bearer <token>`` or, because ``EventSource`` cannot send headers, as
+``?token=<token>``.  A reconnecting client sends back ``Last-Event-ID`` (done
+by ``EventSource`` automatically) and receives the events it missed.  When
+they are no longer buffered it gets a ``reset`` event and should reload the
+order list.
+"""
+
+import asyncio
+import json
+import threading
+from collections import defaultdict, deque
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from hotelapp.renderers import dumps
+from .models import Order
+from .serializers import OrderOutputSerializer
+
+FEED_PATH = "/api/order/feed/"
+FEED_ROLES = ("restaurant", "kitchen_staff")
+
+ORDER_CREATED = "order.created"
+ORDER_UPDATED = "order.updated"
+RESET = "reset"
+
+
+class OrderFeedBroker:
+    """
+    Per-restaurant pub/sub with a ring buffer of the latest events.
+
+    ``publish`` may be called from any thread; events are handed to the
+    subscribers' event loops with ``call_soon_threadsafe``.  Restaurants are
+    only buffered once a client subscribed to them, so processes without
+    feed clients do not pay for serializing events.
+    """
+
+    def __init__(self, buffer_size=256, queue_size=256):
+        self.buffer_size = buffer_size
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._last_id = 0
+        self._buffers = {}
+        self._evicted = {}
+        self._subscribers = defaultdict(set)
+
+    def is_watched(self, restaurant_id):
+        return restaurant_id in self._buffers
+
+    def publish(self, restaurant_id, event, data):
+        with self._lock:
+            buffer = self._buffers.get(restaurant_id)
+            if buffer is None:
+                return None
+            self._last_id += 1
+            entry = (self._last_id, event, dumps(data).decode())
+            if len(buffer) == buffer.maxlen:
+                self._evicted[restaurant_id] = buffer[0][0]
+            buffer.append(entry)
+            subscribers = list(self._subscribers[restaurant_id])
+        for subscriber in subscribers:
+            subscriber.loop.call_soon_threadsafe(subscriber.push, entry)
+        return entry[0]
+
+    def subscribe(self, restaurant_id, last_event_id=None):
+        """
+        Register a subscriber for the running event loop.  Its queue starts
+        with the buffered events after ``last_event_id``, or a ``reset``
+        event when some of them were already dropped.
+        """
+        subscriber = Subscriber(asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            known = restaurant_id in self._buffers
+            buffer = self._buffers.setdefault(
+                restaurant_id, deque(maxlen=self.buffer_size)
+            )
+            self._subscribers[restaurant_id].add(subscriber)
+            if last_event_id is None:
+                return subscriber
+            if (
+                not known
+                or last_event_id > self._last_id
+                or last_event_id < self._evicted.get(restaurant_id, 0)
+            ):
+                # Events were missed before this process buffered them, were
+                # dropped from the buffer, or the id is from an earlier run.
+                subscriber.push((self._last_id, RESET, "{}"))
+            else:
+                for entry in buffer:
+                    if entry[0] > last_event_id:
+                        subscriber.push(entry)
+        return subscriber
+
+    def unsubscribe(self, restaurant_id, subscriber):
+        with self._lock:
+            self._subscribers[restaurant_id].discard(subscriber)
+
+
+class Subscriber:
+    def __init__(self, loop, queue_size):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.lagging = False
+
+    def push(self, entry):
+        try:
+            self.queue.put_nowait(entry)
+        except asyncio.QueueFull:
+            # The client does not keep up; it is disconnected and resumes
+            # from its last event id.
+            self.lagging = True
+
+
+broker = OrderFeedBroker(buffer_size=settings.ORDER_FEED_BUFFER_SIZE)
+
+
+def serialize_orders(order_ids):
+    orders = OrderOutputSerializer.setup_eager_loading(
+        Order.objects.filter(id__in=order_ids)
+    )
+    return [
+        (order.restaurant_id_id, data)
+        for order, data in zip(
+            orders, OrderOutputSerializer(orders, many=True).data
+        )
+    ]
+
+
+def publish_orders(restaurant_id, order_ids, event):
+    """
+    Push the given orders of a restaurant to its feed once the current
+    transaction commits.
+    """
+    order_ids = list(order_ids)
+    if not order_ids or not broker.is_watched(restaurant_id):
+        return
+
+    def publish():
+        for order_restaurant_id, data in serialize_orders(order_ids):
+            broker.publish(order_restaurant_id, event, data)
+
+    transaction.on_commit(publish)
+
+
+def authenticate(raw_token):
+    close_old_connections()
+    try:
+        authentication = JWTAuthentication()
+        user = authentication.get_user(authentication.get_validated_token(raw_token))
+    except (InvalidToken, TokenError):
+        return None
+    finally:
+        close_old_connections()
+    if not user.is_active or user.role not in FEED_ROLES or not user.restaurant_id:
+        return None
+    return user
+
+
+def get_token(headers, query):
+    authorization = headers.get(b"authorization", b"").decode("latin-1").split()
+    if len(authorization) == 2 and authorization[0] in settings.SIMPLE_JWT.get(
+        "AUTH_HEADER_TYPES", ("Bearer",)
+    ):
+        return authorization[1]
+    return query.get("token", [None])[0]
+
+
+def get_last_event_id(headers, query):
+    value = headers.get(b"last-event-id", b"").decode("latin-1") or query.get(
+        "last_event_id", [""]
+    )[0]
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
+def cors_headers(headers):
+    origin = headers.get(b"origin")
+    if not origin:
+        return []
+    if getattr(settings, "CORS_ALLOW_ALL_ORIGINS", False):
+        return [(b"access-control-allow-origin", b"*")]
+    if origin.decode("latin-1") in getattr(settings, "CORS_ALLOWED_ORIGINS", []):
+        return [(b"access-control-allow-origin", origin), (b"vary", b"Origin")]
+    return []
+
+
+def format_event(entry):
+    event_id, event, data = entry
+    return f"id: {event_id}\nevent: {event}\ndata: {data}\n\n".encode()
+
+
+async def send_error(send, status_code, message, extra_headers):
+    body = json.dumps(
+        {"status": status_code, "error": True, "detail": "", "message": message}
+    ).encode()
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status_code,
+            "headers": [(b"content-type", b"application/json")] + extra_headers,
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+async def feed_application(scope, receive, send):
+    headers = dict(scope["headers"])
+    query = parse_qs(scope["query_string"].decode("latin-1"))
+    extra_headers = cors_headers(headers)
+    if scope["method"] != "GET":
+        await send_error(send, 405, "Method not allowed.", extra_headers)
+        return
+    token = get_token(headers, query)
+    user = await sync_to_async(authenticate)(token) if token else None
+    if user is None:
+        await send_error(
+            send, 401, "Authentication credentials were not provided or are invalid.",
+            extra_headers,
+        )
+        return
+
+    restaurant_id = user.restaurant_id
+    subscriber = broker.subscribe(restaurant_id, get_last_event_id(headers, query))
+    disconnected = asyncio.ensure_future(wait_for_disconnect(receive))
+    heartbeat = settings.ORDER_FEED_HEARTBEAT
+    try:
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"text/event-stream"),
+                    (b"cache-control", b"no-cache"),
+                    (b"x-accel-buffering", b"no"),
+                ]
+                + extra_headers,
+            }
+        )
+        await send(
+            {
+                "type": "http.response.body",
+                "body": b"retry: 3000\n\n",
+                "more_body": True,
+            }
+        )
+        next_entry = asyncio.ensure_future(subscriber.queue.get())
+        while not subscriber.lagging:
+            done, _ = await asyncio.wait(
+                {next_entry, disconnected},
+                timeout=heartbeat,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if disconnected in done:
+                next_entry.cancel()
+                return
+            if next_entry in done:
+                body = format_event(next_entry.result())
+                next_entry = asyncio.ensure_future(subscriber.queue.get())
+            else:
+                body = b": keepalive\n\n"
+            await send({"type": "http.response.body", "body": body, "more_body": True})
+        next_entry.cancel()
+        await send({"type": "http.response.body", "body": b""})
+    finally:
+        disconnected.cancel()
+        broker.unsubscribe(restaurant_id, subscriber)
+
+
+async def wait_for_disconnect(receive):
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return
@@ -0,0 +1,68 @@
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+
+def day_range(day):
+    """
+    Return the half-open ``[start, end)`` datetime range of a local day.
+
+    Filtering on ``created_at__gte=start, created_at__lt=end`` keeps the
+    column bare so the ``created_at`` indexes can be used, unlike
+    ``created_at__date=day`` which wraps it in a function.
+    """
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+def parse_bound(value, name, end=False):
+    """
+    Parse a ``from``/``to`` query parameter, an ISO date or datetime.
+
+    A date given as upper bound includes the whole day.
+    """
+    try:
+        day = parse_date(value)
+        moment = None if day else parse_datetime(value)
+    except ValueError:
+        day = moment = None
+    if day:
+        start, next_day = day_range(day)
+        return next_day if end else start
+    if moment:
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+        return moment
+    raise ValueError(f"Invalid '{name}' value, expected an ISO date or datetime.")
+
+
+def get_created_range(query_params):
+    """
+    Build the ``created_at`` range of a list request from ``time_filter``
+    (``recent`` or ``yesterday``) and the ``from``/``to`` parameters.
+
+    Returns ``(start, end)``; either may be None for an open end.
+    """
+    start = end = None
+    time_filter = query_params.get("time_filter")
+    if time_filter == "recent":
+        start, end = day_range(timezone.localdate())
+    elif time_filter == "yesterday":
+        start, end = day_range(timezone.localdate() - timedelta(days=1))
+
+    if query_params.get("from"):
+        lower = parse_bound(query_params["from"], "from")
+        start = max(start, lower) if start else lower
+    if query_params.get("to"):
+        upper = parse_bound(query_params["to"], "to", end=True)
+        end = min(end, upper) if end else upper
+    return start, end
+
+
+def filter_created_range(queryset, start, end):
+    if start:
+        queryset = queryset.filter(created_at__gte=start)
+    if end:
+        queryset = queryset.filter(created_at__lt=end)
+    return queryset
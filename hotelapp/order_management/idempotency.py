@@ -0,0 +1,96 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import caches
+
+IDEMPOTENCY_HEADER = "HTTP_IDEMPOTENCY_KEY"
+# How long a submission may stay in flight before another attempt is let in.
+PENDING_TIMEOUT = 60
+
+PENDING = "pending"
+DONE = "done"
+
+
+def _cache():
+    return caches["idempotency"]
+
+
+def _digest(value):
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+def get_idempotency_key(request):
+    """
+    Build the store key, the payload fingerprint and how long to remember
+    the response for an order submission.
+
+    An explicit ``Idempotency-Key`` header wins and is remembered for
+    ``ORDER_IDEMPOTENCY_TIMEOUT``.  Otherwise the order's ``session_id`` is
+    used together with the payload fingerprint, so a table can still place
+    several different orders within the same session while byte-identical
+    retries collapse into one.  As a table may well order the same thing
+    again, such implicit keys only last ``ORDER_IMPLICIT_IDEMPOTENCY_TIMEOUT``
+    seconds, long enough for a double tap or a network retry.  Returns
+    ``(None, None, None)`` when the request carries neither.
+    """
+    fingerprint = _digest(json.dumps(request.data, sort_keys=True, default=str))
+    restaurant_id = request.user.restaurant_id
+    header_key = request.META.get(IDEMPOTENCY_HEADER)
+    if header_key:
+        return (
+            f"order:{restaurant_id}:key:{_digest(header_key)}",
+            fingerprint,
+            settings.ORDER_IDEMPOTENCY_TIMEOUT,
+        )
+    session_id = request.data.get("session_id")
+    if session_id:
+        session_key = _digest(str(session_id))
+        return (
+            f"order:{restaurant_id}:session:{session_key}:{fingerprint}",
+            fingerprint,
+            settings.ORDER_IMPLICIT_IDEMPOTENCY_TIMEOUT,
+        )
+    return None, None, None
+
+
+def claim_key(key, fingerprint):
+    """
+    Mark ``key`` as in flight.
+
+    Returns ``None`` when the caller owns the key and should process the
+    request, otherwise the stored entry of the earlier submission.
+    """
+    entry = {"state": PENDING, "fingerprint": fingerprint}
+    while True:
+        if _cache().add(key, entry, timeout=PENDING_TIMEOUT):
+            return None
+        stored = _cache().get(key)
+        # Gone between the two calls (expired, evicted or released): try to
+        # claim it again rather than process the request unclaimed.
+        if stored is not None:
+            return stored
+
+
+def store_response(key, fingerprint, response, timeout):
+    """
+    Remember a successful response for replay for ``timeout`` seconds; release
+    the key otherwise so the client can correct the payload and try again.
+    """
+    if response.status_code >= 300:
+        release_key(key)
+        return
+    _cache().set(
+        key,
+        {
+            "state": DONE,
+            "fingerprint": fingerprint,
+            "status": response.status_code,
+            "data": response.data,
+        },
+        timeout=timeout,
+    )
+
+
+def release_key(key):
+    _cache().delete(key)
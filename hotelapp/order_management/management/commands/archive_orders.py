@@ -0,0 +1,35 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from order_management.archive import archive_orders
+
+
+class Command(BaseCommand):
+    help = "Move orders older than ORDER_ARCHIVE_AFTER_DAYS to the archive."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=settings.ORDER_ARCHIVE_AFTER_DAYS,
+            help="Archive orders older than this many days.",
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=0,
+            help="Keep running and archive every INTERVAL seconds.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            cutoff = timezone.now() - timedelta(days=options["days"])
+            archived = archive_orders(cutoff, options["batch_size"])
+            self.stdout.write(f"Archived {archived} orders created before {cutoff}.")
+            if not options["interval"]:
+                break
+            time.sleep(options["interval"])
@@ -0,0 +1,173 @@
+import io
+import json
+import random
+import time as clock
+from datetime import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from hotelapp.renderers import FastJSONParser, FastJSONRenderer, orjson
+from order_management.models import Customer, Order, OrderItem
+from order_management.serializers import OrderOutputSerializer
+from restaurant.Inventory.serializers import InventoryOutputSerializer
+from restaurant.models import (
+    Category,
+    Inventory,
+    Menu_Subtype,
+    MenuTypes,
+    Restaurant,
+    UnitCategory,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway database with a menu and orders and compare the "
+        "stdlib and orjson renderers and parsers on the inventory and order "
+        "list payloads."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--items", type=int, default=500)
+        parser.add_argument("--orders", type=int, default=500)
+        parser.add_argument("--lines", type=int, default=4)
+        parser.add_argument("--repeat", type=int, default=50)
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stderr.write("orjson is not installed, both sides would use json.")
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            payloads = self.seed(options)
+            for name, data in payloads:
+                self.compare(name, data, options["repeat"])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def seed(self, options):
+        category = Category.objects.create(name="Benchmark")
+        restaurant = Restaurant.objects.create(
+            name="Restaurant",
+            description="benchmark",
+            opening_time=time(9, 0),
+            closing_time=time(23, 0),
+            phone_number="7777777777",
+            address="benchmark",
+            restaurant_category=category,
+            email="restaurant@example.com",
+            logo="restaurants/logo.png",
+        )
+        unit = UnitCategory.objects.create(name="Plate", abbreviation="plate")
+        subtypes = []
+        for type_index in range(5):
+            menu_type = MenuTypes.objects.create(
+                name=f"Type {type_index}", restaurant=restaurant
+            )
+            for subtype_index in range(4):
+                subtypes.append(
+                    Menu_Subtype.objects.create(
+                        name=f"Subtype {type_index}.{subtype_index}",
+                        menutype=menu_type,
+                    )
+                )
+        inventories = Inventory.objects.bulk_create(
+            [
+                Inventory(
+                    name=f"Item {index}",
+                    restaurant=restaurant,
+                    video_link="https://example.com/video",
+                    item_image=f"items/item-{index}.jpg",
+                    description="A dish with a longer description — épicé.",
+                    menu_type_id=subtype.menutype_id,
+                    menu_subtype=subtype,
+                    total_quantity=100,
+                    available_quantity=random.randrange(100),
+                    unit_price=f"{random.randrange(100, 99999) / 100:.2f}",
+                    unit_category=unit,
+                )
+                for index, subtype in (
+                    (index, random.choice(subtypes)) for index in range(options["items"])
+                )
+            ]
+        )
+        if not connection.features.can_return_rows_from_bulk_insert:
+            inventories = list(Inventory.objects.order_by("id"))
+
+        customer = Customer.objects.create(
+            restaurant_id=restaurant, name="Customer", phone_number="9999999999"
+        )
+        orders = Order.objects.bulk_create(
+            [
+                Order(
+                    restaurant_id=restaurant,
+                    customer_id=customer,
+                    order_type="take-away",
+                    payment_status="paid",
+                    session_id=f"session-{index}",
+                )
+                for index in range(options["orders"])
+            ]
+        )
+        if not connection.features.can_return_rows_from_bulk_insert:
+            orders = list(Order.objects.order_by("id"))
+        lines = []
+        for order in orders:
+            for _ in range(options["lines"]):
+                inventory = random.choice(inventories)
+                lines.append(
+                    OrderItem(
+                        order=order,
+                        restaurant_id=restaurant,
+                        inventory_id=inventory,
+                        quantity=random.randrange(1, 5),
+                        unit_price=inventory.unit_price,
+                    )
+                )
+        OrderItem.objects.bulk_create(lines, batch_size=1000)
+
+        inventory_list = InventoryOutputSerializer(
+            Inventory.objects.select_related(
+                "unit_category", "menu_subtype", "menu_type"
+            ),
+            many=True,
+        ).data
+        order_list = OrderOutputSerializer(
+            OrderOutputSerializer.setup_eager_loading(Order.objects.all()),
+            many=True,
+        ).data
+        return [
+            (f"InventoryOutputSerializer, {len(inventory_list)} items", inventory_list),
+            (f"OrderOutputSerializer, {len(order_list)} orders", order_list),
+        ]
+
+    def time(self, func, repeat):
+        started = clock.perf_counter()
+        for _ in range(repeat):
+            func()
+        return (clock.perf_counter() - started) / repeat * 1000
+
+    def compare(self, name, data, repeat):
+        self.stdout.write(self.style.MIGRATE_HEADING(name))
+        stdlib, fast = JSONRenderer(), FastJSONRenderer()
+        body = stdlib.render(data)
+        if json.loads(fast.render(data)) != json.loads(body):
+            self.stderr.write("The renderers disagree on this payload.")
+        self.stdout.write(f"size: {len(body) / 1024:.1f} KiB")
+
+        render = self.time(lambda: stdlib.render(data), repeat)
+        fast_render = self.time(lambda: fast.render(data), repeat)
+        self.stdout.write(
+            f"render: json {render:.2f} ms, orjson {fast_render:.2f} ms "
+            f"({render / fast_render:.1f}x)"
+        )
+
+        parse = self.time(lambda: JSONParser().parse(io.BytesIO(body)), repeat)
+        fast_parse = self.time(lambda: FastJSONParser().parse(io.BytesIO(body)), repeat)
+        self.stdout.write(
+            f"parse: json {parse:.2f} ms, orjson {fast_parse:.2f} ms "
+            f"({parse / fast_parse:.1f}x)"
+        )
+        self.stdout.write("")
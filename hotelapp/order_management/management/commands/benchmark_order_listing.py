@@ -0,0 +1,163 @@
+import random
+import time as clock
+from datetime import time, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+from hotelapp.pagination import CursorPaginator
+from order_management.filters import day_range, filter_created_range
+from order_management.models import Order
+from restaurant.models import Category, Restaurant
+
+PAGE_SIZE = 10
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway database with orders and compare the query plans and "
+        "timings of the order listing before and after the composite indexes "
+        "and range-based time filters, for the first page and a page --depth "
+        "rows deep, both selected by the list api's cursor paginator."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--orders", type=int, default=50000)
+        parser.add_argument("--restaurants", type=int, default=20)
+        parser.add_argument("--days", type=int, default=90)
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--depth", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            restaurant = self.seed(options)
+            self.compare(restaurant, options["repeat"], options["depth"])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def seed(self, options):
+        category = Category.objects.create(name="Benchmark")
+        restaurants = Restaurant.objects.bulk_create(
+            [
+                Restaurant(
+                    name=f"Restaurant {index}",
+                    description="benchmark",
+                    opening_time=time(9, 0),
+                    closing_time=time(23, 0),
+                    phone_number="7777777777",
+                    address="benchmark",
+                    restaurant_category=category,
+                    email=f"restaurant{index}@example.com",
+                    logo="restaurants/logo.png",
+                )
+                for index in range(options["restaurants"])
+            ]
+        )
+        if not connection.features.can_return_rows_from_bulk_insert:
+            restaurants = list(Restaurant.objects.order_by("id"))
+
+        now = timezone.now()
+        seconds = options["days"] * 24 * 60 * 60
+        order_types = [value for value, _ in Order.ORDER_TYPE_CHOICES]
+        order_statuses = [value for value, _ in Order.ORDER_STATUS_CHOICES]
+        payment_statuses = ["paid", "unpaid", None]
+        Order.objects.bulk_create(
+            (
+                Order(
+                    restaurant_id=random.choice(restaurants),
+                    order_type=random.choice(order_types),
+                    order_status=random.choice(order_statuses),
+                    payment_status=random.choice(payment_statuses),
+                    created_at=now - timedelta(seconds=random.randrange(seconds)),
+                )
+                for _ in range(options["orders"])
+            ),
+            batch_size=1000,
+        )
+        self.analyze()
+        self.stdout.write(
+            f"Seeded {options['orders']} orders over {options['days']} days "
+            f"for {len(restaurants)} restaurants.\n"
+        )
+        return restaurants[0]
+
+    def analyze(self):
+        """Refresh the planner statistics after bulk changes."""
+        sql = "ANALYZE"
+        if connection.vendor == "mysql":
+            sql = f"ANALYZE TABLE {Order._meta.db_table}"
+        with connection.cursor() as cursor:
+            cursor.execute(sql)
+
+    def querysets(self, restaurant, legacy):
+        yesterday = timezone.localdate() - timedelta(days=1)
+        orders = Order.objects.filter(restaurant_id=restaurant)
+        if legacy:
+            yesterdays = orders.filter(created_at__date=yesterday)
+        else:
+            yesterdays = filter_created_range(orders, *day_range(yesterday))
+        return [
+            ("latest orders", orders),
+            ("pending orders", orders.filter(order_status="pending")),
+            ("yesterday's orders", yesterdays),
+            ("yesterday's dine-in orders", yesterdays.filter(order_type="dine-in")),
+        ]
+
+    def pages(self, queryset, depth):
+        """
+        The queries of the first page and of the page ``depth`` rows deep, as
+        ``CursorPaginator`` runs them for the order list.
+        """
+        paginator = CursorPaginator(queryset, page_size=PAGE_SIZE)
+        pages = [("first page", paginator.select(queryset)[: PAGE_SIZE + 1])]
+        cursor = CursorPaginator(queryset, page_size=depth).page().next_cursor
+        if cursor:
+            values, reverse = paginator.decode_cursor(cursor)
+            pages.append(
+                (
+                    f"page after {depth} rows",
+                    paginator.select(queryset, values, reverse)[: PAGE_SIZE + 1],
+                )
+            )
+        return pages
+
+    def run(self, title, restaurant, repeat, depth, legacy):
+        self.stdout.write(self.style.MIGRATE_HEADING(title))
+        for name, queryset in self.querysets(restaurant, legacy):
+            for page, rows in self.pages(queryset, depth):
+                started = clock.perf_counter()
+                for _ in range(repeat):
+                    list(rows)
+                elapsed = (clock.perf_counter() - started) / repeat * 1000
+                self.stdout.write(f"{name}, {page}: {elapsed:.2f} ms")
+                self.stdout.write(rows.explain())
+                self.stdout.write("")
+
+    def compare(self, restaurant, repeat, depth):
+        indexes = Order._meta.indexes
+        with connection.schema_editor() as schema_editor:
+            for index in indexes:
+                schema_editor.remove_index(Order, index)
+        self.run(
+            "Before: single column indexes, created_at__date filter",
+            restaurant,
+            repeat,
+            depth,
+            legacy=True,
+        )
+
+        with connection.schema_editor() as schema_editor:
+            for index in indexes:
+                schema_editor.add_index(Order, index)
+        self.analyze()
+        self.run(
+            "After: composite indexes, half-open created_at range",
+            restaurant,
+            repeat,
+            depth,
+            legacy=False,
+        )
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from order_management.models import Order, OrderSearchTerm
+from order_management.search import index_orders
+
+
+class Command(BaseCommand):
+    help = "Rebuild the order search index."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--restaurant", type=int, help="Only rebuild one restaurant.")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        orders = Order.objects.select_related("customer_id", "table_no").order_by("id")
+        terms = OrderSearchTerm.objects.all()
+        if options["restaurant"]:
+            orders = orders.filter(restaurant_id=options["restaurant"])
+            terms = terms.filter(restaurant_id=options["restaurant"])
+        terms.delete()
+
+        batch = []
+        indexed = 0
+        for order in orders.iterator(chunk_size=options["batch_size"]):
+            batch.append(order)
+            if len(batch) >= options["batch_size"]:
+                index_orders(batch, replace=False)
+                indexed += len(batch)
+                batch = []
+        if batch:
+            index_orders(batch, replace=False)
+            indexed += len(batch)
+        self.stdout.write(f"Indexed {indexed} orders.")
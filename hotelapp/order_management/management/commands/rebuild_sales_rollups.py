@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from order_management.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily sales and item rollups from the orders."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--restaurant", type=int, help="Only rebuild one restaurant.")
+        parser.add_argument(
+            "--since", help="Only rebuild the days from this date (YYYY-MM-DD) on."
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options["since"]:
+            since = parse_date(options["since"])
+            if since is None:
+                raise CommandError("--since must be a date in YYYY-MM-DD format.")
+        sales, items = rebuild_rollups(restaurant=options["restaurant"], since=since)
+        self.stdout.write(f"Rebuilt {sales} sales rollups and {items} item rollups.")
@@ -0,0 +1,57 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:32
+
+import re
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def index_existing_orders(apps, schema_editor):
+    Order = apps.get_model("order_management", "Order")
+    OrderSearchTerm = apps.get_model("order_management", "OrderSearchTerm")
+    batch = []
+    orders = Order.objects.select_related("customer_id", "table_no").order_by("id")
+    for order in orders.iterator(chunk_size=1000):
+        values = [order.id]
+        if order.customer_id_id:
+            values.append(order.customer_id.phone_number)
+        if order.table_no_id:
+            values.append(order.table_no.tablenumber)
+        terms = set()
+        for value in values:
+            value = re.sub(r"\D", "", str(value or ""))[-30:]
+            terms.update(value[start:] for start in range(len(value)))
+        batch.extend(
+            OrderSearchTerm(
+                restaurant_id_id=order.restaurant_id_id, order_id_id=order.id, term=term
+            )
+            for term in terms
+        )
+        if len(batch) >= 5000:
+            OrderSearchTerm.objects.bulk_create(batch)
+            batch = []
+    OrderSearchTerm.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0008_stockslot_stockreservation'),
+        ('order_management', '0007_alter_order_order_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=30)),
+                ('order_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='order_management.order')),
+                ('restaurant_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='order_search_terms', to='restaurant.restaurant')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['restaurant_id', 'term'], name='order_search_term_idx')],
+            },
+        ),
+        migrations.RunPython(index_existing_orders, migrations.RunPython.noop),
+    ]
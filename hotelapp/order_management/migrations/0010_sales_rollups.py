@@ -0,0 +1,100 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:37
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum
+from django.db.models.functions import Coalesce, TruncDate
+import django.db.models.deletion
+
+
+def build_rollups(apps, schema_editor):
+    Order = apps.get_model("order_management", "Order")
+    DailySalesRollup = apps.get_model("order_management", "DailySalesRollup")
+    DailyItemRollup = apps.get_model("order_management", "DailyItemRollup")
+    line_revenue = ExpressionWrapper(
+        F("order_items__quantity") * F("order_items__inventory_id__unit_price"),
+        output_field=DecimalField(max_digits=14, decimal_places=2),
+    )
+    orders = Order.objects.annotate(day=TruncDate("created_at")).order_by()
+    DailySalesRollup.objects.bulk_create(
+        [
+            DailySalesRollup(
+                restaurant_id_id=row["restaurant_id"],
+                date=row["day"],
+                order_type=row["order_type"],
+                order_status=row["order_status"],
+                order_count=row["order_count"],
+                revenue=row["revenue"],
+            )
+            for row in orders.values(
+                "restaurant_id", "day", "order_type", "order_status"
+            ).annotate(
+                order_count=Count("id", distinct=True),
+                revenue=Coalesce(Sum(line_revenue), Decimal(0)),
+            )
+        ],
+        batch_size=1000,
+    )
+    DailyItemRollup.objects.bulk_create(
+        [
+            DailyItemRollup(
+                restaurant_id_id=row["restaurant_id"],
+                date=row["day"],
+                inventory_id_id=row["order_items__inventory_id"],
+                quantity=row["quantity"],
+                revenue=row["revenue"],
+            )
+            for row in orders.exclude(order_status="cancelled")
+            .filter(order_items__inventory_id__isnull=False)
+            .values("restaurant_id", "day", "order_items__inventory_id")
+            .annotate(
+                quantity=Sum("order_items__quantity"),
+                revenue=Sum(line_revenue),
+            )
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0008_stockslot_stockreservation'),
+        ('order_management', '0009_order_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('order_type', models.CharField(choices=[('dine-in', 'Dine in'), ('take-away', 'Take Away'), ('home-delivery', 'Home Delivery')], max_length=20)),
+                ('order_status', models.CharField(choices=[('pending', 'Pending'), ('delivered', 'Delivered'), ('confirmed', 'Confirmed'), ('cancelled', 'Cancelled')], max_length=100)),
+                ('order_count', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('restaurant_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_rollups', to='restaurant.restaurant')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyItemRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('quantity', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('inventory_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='restaurant.inventory')),
+                ('restaurant_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='item_rollups', to='restaurant.restaurant')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='dailysalesrollup',
+            constraint=models.UniqueConstraint(fields=('restaurant_id', 'date', 'order_type', 'order_status'), name='unique_daily_sales_rollup'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailyitemrollup',
+            constraint=models.UniqueConstraint(fields=('restaurant_id', 'date', 'inventory_id'), name='unique_daily_item_rollup'),
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:42
+
+import django.core.serializers.json
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0008_stockslot_stockreservation'),
+        ('order_management', '0010_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedOrder',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField()),
+                ('order_type', models.CharField(choices=[('dine-in', 'Dine in'), ('take-away', 'Take Away'), ('home-delivery', 'Home Delivery')], max_length=20)),
+                ('order_status', models.CharField(choices=[('pending', 'Pending'), ('delivered', 'Delivered'), ('confirmed', 'Confirmed'), ('cancelled', 'Cancelled')], max_length=100)),
+                ('payment_status', models.CharField(blank=True, max_length=50, null=True)),
+                ('table_number', models.IntegerField(blank=True, null=True)),
+                ('customer_name', models.CharField(blank=True, max_length=200, null=True)),
+                ('customer_phone_number', models.CharField(blank=True, max_length=20, null=True)),
+                ('payload', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('restaurant_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_orders', to='restaurant.restaurant')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['restaurant_id', '-created_at'], name='archived_order_created_idx')],
+            },
+        ),
+    ]
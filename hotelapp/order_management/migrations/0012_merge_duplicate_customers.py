@@ -0,0 +1,57 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:43
+
+import re
+from collections import defaultdict
+
+from django.db import migrations
+
+
+def normalize_phone(value):
+    value = str(value or "").strip()
+    digits = re.sub(r"\D", "", value)
+    return f"+{digits}" if value.startswith("+") and digits else digits
+
+
+def merge_duplicate_customers(apps, schema_editor):
+    """
+    Normalize phone numbers and fold the customers sharing a restaurant and
+    phone number into the oldest one, which takes the latest name and address.
+    """
+    Customer = apps.get_model("order_management", "Customer")
+    Order = apps.get_model("order_management", "Order")
+    groups = defaultdict(list)
+    customers = Customer.objects.order_by("id").values_list(
+        "id", "restaurant_id_id", "phone_number", "name", "address"
+    )
+    for customer_id, restaurant_id, phone_number, name, address in customers.iterator(
+        chunk_size=2000
+    ):
+        groups[(restaurant_id, normalize_phone(phone_number))].append(
+            (customer_id, phone_number, name, address)
+        )
+
+    for (restaurant_id, phone_number), rows in groups.items():
+        keep_id, stored_phone_number, _, _ = rows[0]
+        duplicate_ids = [row[0] for row in rows[1:]]
+        name = rows[-1][2]
+        address = next((row[3] for row in reversed(rows) if row[3]), None)
+        if duplicate_ids:
+            Order.objects.filter(customer_id__in=duplicate_ids).update(
+                customer_id=keep_id
+            )
+            Customer.objects.filter(id__in=duplicate_ids).delete()
+        if duplicate_ids or stored_phone_number != phone_number:
+            Customer.objects.filter(id=keep_id).update(
+                phone_number=phone_number, name=name, address=address
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order_management', '0011_archivedorder'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_customers, migrations.RunPython.noop),
+    ]
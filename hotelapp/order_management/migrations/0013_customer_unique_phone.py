@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order_management', '0012_merge_duplicate_customers'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='customer',
+            constraint=models.UniqueConstraint(fields=('restaurant_id', 'phone_number'), name='unique_restaurant_customer_phone'),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:50
+
+from django.db import migrations, models
+from django.db.models import Max, Min, OuterRef, Subquery
+import django.db.models.deletion
+
+BATCH_SIZE = 5000
+
+
+def copy_order_links(apps, schema_editor):
+    """
+    Point every order item at its order from the ``order_items`` link table,
+    one UPDATE per range of item ids.  Items that belong to no order are
+    unreachable and are deleted, so the column can become NOT NULL.
+    """
+    Order = apps.get_model("order_management", "Order")
+    OrderItem = apps.get_model("order_management", "OrderItem")
+    OrderLink = Order.order_items.through
+    bounds = OrderItem.objects.aggregate(first=Min("id"), last=Max("id"))
+    if bounds["first"] is None:
+        return
+    order_id = Subquery(
+        OrderLink.objects.filter(orderitem_id=OuterRef("pk"))
+        .order_by("id")
+        .values("order_id")[:1]
+    )
+    for start in range(bounds["first"], bounds["last"] + 1, BATCH_SIZE):
+        OrderItem.objects.filter(id__gte=start, id__lt=start + BATCH_SIZE).update(
+            order_id=order_id
+        )
+    OrderItem.objects.filter(order__isnull=True).delete()
+
+
+def copy_order_links_back(apps, schema_editor):
+    Order = apps.get_model("order_management", "Order")
+    OrderItem = apps.get_model("order_management", "OrderItem")
+    OrderLink = Order.order_items.through
+    items = OrderItem.objects.order_by("id").values_list("id", "order_id")
+    batch = []
+    for orderitem_id, order_id in items.iterator(chunk_size=BATCH_SIZE):
+        batch.append(OrderLink(order_id=order_id, orderitem_id=orderitem_id))
+        if len(batch) >= BATCH_SIZE:
+            OrderLink.objects.bulk_create(batch)
+            batch = []
+    OrderLink.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order_management', '0013_customer_unique_phone'),
+    ]
+
+    operations = [
+        # Without a reverse accessor until the many-to-many field, which owns
+        # the ``order_items`` name, is removed in the next migration.
+        migrations.AddField(
+            model_name='orderitem',
+            name='order',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='order_management.order'),
+        ),
+        migrations.RunPython(copy_order_links, copy_order_links_back),
+    ]
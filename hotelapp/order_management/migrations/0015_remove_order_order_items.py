@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:50
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order_management', '0014_orderitem_order'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='order',
+            name='order_items',
+        ),
+        migrations.AlterField(
+            model_name='orderitem',
+            name='order',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='order_items', to='order_management.order'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:05
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_unit_prices(apps, schema_editor):
+    """
+    Existing lines take the item's current price, the one their rollups were
+    recorded with.
+    """
+    Inventory = apps.get_model("restaurant", "Inventory")
+    OrderItem = apps.get_model("order_management", "OrderItem")
+    OrderItem.objects.filter(inventory_id__isnull=False).update(
+        unit_price=Subquery(
+            Inventory.objects.filter(id=OuterRef("inventory_id")).values(
+                "unit_price"
+            )[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order_management', '0015_remove_order_order_items'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='unit_price',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True),
+        ),
+        migrations.RunPython(copy_unit_prices, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:23
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0009_inventory_menu_index'),
+        ('order_management', '0016_orderitem_unit_price'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='dailyitemrollup',
+            name='inventory_id',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='daily_rollups', to='restaurant.inventory'),
+        ),
+    ]
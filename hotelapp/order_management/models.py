@@ -1,3 +1,4 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.utils import timezone
 from restaurant.models import Restaurant, Table, Inventory
@@ -20,11 +21,24 @@ class Customer(BaseModel):
     phone_number = models.CharField(max_length=20)
     address = models.TextField(blank=True, null=True)
 
+    class Meta(BaseModel.Meta):
+        # One customer per phone number and restaurant, see
+        # order_management.customers.
+        constraints = [
+            models.UniqueConstraint(
+                fields=["restaurant_id", "phone_number"],
+                name="unique_restaurant_customer_phone",
+            ),
+        ]
+
     def __str__(self):
         return f"{self.name}"
 
 
 class OrderItem(BaseModel):
+    order = models.ForeignKey(
+        "Order", on_delete=models.CASCADE, related_name="order_items"
+    )
     restaurant_id = models.ForeignKey(
         Restaurant, on_delete=models.SET_NULL, related_name="order_items", null=True
     )
@@ -32,6 +46,10 @@ class OrderItem(BaseModel):
         Inventory, on_delete=models.SET_NULL, related_name="order_inventory", null=True
     )
     quantity = models.PositiveIntegerField()
+    # The item's price when the order was placed.
+    unit_price = models.DecimalField(
+        max_digits=5, decimal_places=2, null=True, blank=True
+    )
     # session_id = models.CharField(max_length=100, null=True, blank=True)
 
     def __str__(self):
@@ -69,8 +87,158 @@ class Order(BaseModel):
         max_length=100, choices=ORDER_STATUS_CHOICES, default="pending"
     )
     payment_status = models.CharField(max_length=50, blank=True, null=True)
-    order_items = models.ManyToManyField(OrderItem, related_name="order_items_in_order")
     session_id = models.CharField(max_length=100, null=True, blank=True)
 
+    class Meta(BaseModel.Meta):
+        # Match the filter combinations of ListOrderApiView, which always
+        # filters on the restaurant and lists the newest orders first.
+        indexes = [
+            models.Index(
+                fields=["restaurant_id", "-created_at"],
+                name="order_restaurant_created_idx",
+            ),
+            models.Index(
+                fields=["restaurant_id", "order_type", "-created_at"],
+                name="order_type_created_idx",
+            ),
+            models.Index(
+                fields=["restaurant_id", "order_status", "-created_at"],
+                name="order_status_created_idx",
+            ),
+            models.Index(
+                fields=["restaurant_id", "payment_status", "-created_at"],
+                name="order_payment_created_idx",
+            ),
+        ]
+
     def __str__(self):
         return f"Order Id: {self.id}"
+
+
+class OrderSearchTerm(models.Model):
+    """
+    Search index row for an order.
+
+    Holds every suffix of the order's normalized phone number, id and table
+    number, so a substring search becomes an indexed prefix lookup on
+    ``(restaurant_id, term)``.  Maintained by ``order_management.search``.
+    """
+
+    restaurant_id = models.ForeignKey(
+        Restaurant, on_delete=models.CASCADE, related_name="order_search_terms"
+    )
+    order_id = models.ForeignKey(
+        Order, on_delete=models.CASCADE, related_name="search_terms"
+    )
+    term = models.CharField(max_length=30)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["restaurant_id", "term"], name="order_search_term_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.order_id} - {self.term}"
+
+
+class DailySalesRollup(models.Model):
+    """
+    Number of orders and their value per restaurant, day, order type and
+    status.  Maintained by ``order_management.rollups``.
+    """
+
+    restaurant_id = models.ForeignKey(
+        Restaurant, on_delete=models.CASCADE, related_name="sales_rollups"
+    )
+    date = models.DateField()
+    order_type = models.CharField(max_length=20, choices=Order.ORDER_TYPE_CHOICES)
+    order_status = models.CharField(
+        max_length=100, choices=Order.ORDER_STATUS_CHOICES
+    )
+    order_count = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["restaurant_id", "date", "order_type", "order_status"],
+                name="unique_daily_sales_rollup",
+            ),
+        ]
+
+    def __str__(self):
+        return (
+            f"{self.restaurant_id} - {self.date} - {self.order_type} - "
+            f"{self.order_status}"
+        )
+
+
+class DailyItemRollup(models.Model):
+    """
+    Quantity sold and revenue per restaurant, day and menu item.  Cancelled
+    orders are not counted.  Maintained by ``order_management.rollups``.
+
+    The rows of a deleted item are kept, with no item, so the item rollups
+    still add up to the sales rollups.
+    """
+
+    restaurant_id = models.ForeignKey(
+        Restaurant, on_delete=models.CASCADE, related_name="item_rollups"
+    )
+    date = models.DateField()
+    inventory_id = models.ForeignKey(
+        Inventory, on_delete=models.SET_NULL, related_name="daily_rollups", null=True
+    )
+    quantity = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["restaurant_id", "date", "inventory_id"],
+                name="unique_daily_item_rollup",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.restaurant_id} - {self.date} - {self.inventory_id}"
+
+
+class ArchivedOrder(models.Model):
+    """
+    An order moved out of the live tables by ``archive_orders``.
+
+    Keeps the original id and creation time, the columns the order list and
+    export filter on, and ``payload``, the order as rendered by
+    ``OrderOutputSerializer`` when it was archived.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    restaurant_id = models.ForeignKey(
+        Restaurant, on_delete=models.CASCADE, related_name="archived_orders"
+    )
+    created_at = models.DateTimeField()
+    order_type = models.CharField(max_length=20, choices=Order.ORDER_TYPE_CHOICES)
+    order_status = models.CharField(
+        max_length=100, choices=Order.ORDER_STATUS_CHOICES
+    )
+    payment_status = models.CharField(max_length=50, blank=True, null=True)
+    table_number = models.IntegerField(blank=True, null=True)
+    customer_name = models.CharField(max_length=200, blank=True, null=True)
+    customer_phone_number = models.CharField(max_length=20, blank=True, null=True)
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(
+                fields=["restaurant_id", "-created_at"],
+                name="archived_order_created_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"Archived Order Id: {self.id}"
@@ -0,0 +1,339 @@
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+from .filters import day_range
+from .models import ArchivedOrder, DailyItemRollup, DailySalesRollup, Order
+
+CANCELLED = "cancelled"
+
+_local = threading.local()
+
+# The value of an order line at the price the order was placed with, so later
+# price changes do not change what an order adds to or takes from the rollups.
+LINE_REVENUE = ExpressionWrapper(
+    F("order_items__quantity") * F("order_items__unit_price"),
+    output_field=DecimalField(max_digits=14, decimal_places=2),
+)
+
+
+def order_lines(order_ids):
+    """
+    Return ``{order_id: [(inventory_id, quantity, unit_price), ...]}``.
+    """
+    lines = defaultdict(list)
+    rows = Order.objects.filter(
+        id__in=order_ids, order_items__isnull=False
+    ).values_list(
+        "id",
+        "order_items__inventory_id",
+        "order_items__quantity",
+        "order_items__unit_price",
+    )
+    for order_id, inventory_id, quantity, unit_price in rows:
+        lines[order_id].append((inventory_id, quantity, unit_price))
+    return lines
+
+
+def collect(sales, items, orders, lines, sign, states=None):
+    """
+    Add the contribution of ``orders`` times ``sign`` to the ``sales`` and
+    ``items`` deltas.  ``states`` maps order ids to an ``(order_type,
+    order_status)`` to use instead of the order's current one.
+    """
+    for order in orders:
+        order_type, order_status = (states or {}).get(
+            order.id, (order.order_type, order.order_status)
+        )
+        date = timezone.localdate(order.created_at)
+        restaurant_id = order.restaurant_id_id
+        revenue = Decimal(0)
+        for inventory_id, quantity, unit_price in lines.get(order.id, []):
+            line_revenue = quantity * unit_price if unit_price is not None else 0
+            revenue += line_revenue
+            # Lines of deleted items go to the item rollup row without item.
+            if order_status != CANCELLED:
+                delta = items[(restaurant_id, date, inventory_id)]
+                delta[0] += sign * quantity
+                delta[1] += sign * line_revenue
+        delta = sales[(restaurant_id, date, order_type, order_status)]
+        delta[0] += sign
+        delta[1] += sign * revenue
+
+
+def increment(model, lookup, **deltas):
+    deltas = {field: value for field, value in deltas.items() if value}
+    if not deltas:
+        return
+    changes = {field: F(field) + value for field, value in deltas.items()}
+    rows = model.objects.filter(**lookup)
+    if None in lookup.values():
+        # NULLs never collide in the unique constraint, so items deleted the
+        # same day may have left several rows: change only one of them.
+        rows = model.objects.filter(pk__in=list(rows.values_list("pk", flat=True)[:1]))
+    if rows.update(**changes):
+        return
+    if any(value < 0 for value in deltas.values()):
+        # Nothing to take away from; the rows are rebuilt by
+        # ``rebuild_sales_rollups``.
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **deltas)
+    except IntegrityError:
+        # Created by a concurrent order in the meantime.
+        rows.update(**changes)
+
+
+def write(sales, items):
+    for (restaurant_id, date, order_type, order_status), delta in sales.items():
+        increment(
+            DailySalesRollup,
+            {
+                "restaurant_id_id": restaurant_id,
+                "date": date,
+                "order_type": order_type,
+                "order_status": order_status,
+            },
+            order_count=delta[0],
+            revenue=delta[1],
+        )
+    for (restaurant_id, date, inventory_id), delta in items.items():
+        increment(
+            DailyItemRollup,
+            {
+                "restaurant_id_id": restaurant_id,
+                "date": date,
+                "inventory_id_id": inventory_id,
+            },
+            quantity=delta[0],
+            revenue=delta[1],
+        )
+
+
+def new_deltas():
+    return (
+        defaultdict(lambda: [0, Decimal(0)]),
+        defaultdict(lambda: [0, Decimal(0)]),
+    )
+
+
+@transaction.atomic
+def record_orders(orders):
+    """
+    Add newly placed orders, with their items saved, to the rollups.
+    """
+    orders = list(orders)
+    sales, items = new_deltas()
+    collect(sales, items, orders, order_lines([order.id for order in orders]), 1)
+    write(sales, items)
+
+
+@contextmanager
+def keep_rollups():
+    """
+    Leave the rollups alone for orders deleted in this block, e.g. because
+    they are moved to the archive rather than undone.
+    """
+    previous = getattr(_local, "keep", False)
+    _local.keep = True
+    try:
+        yield
+    finally:
+        _local.keep = previous
+
+
+def rollups_kept():
+    return getattr(_local, "keep", False)
+
+
+@transaction.atomic
+def remove_orders(orders):
+    orders = list(orders)
+    sales, items = new_deltas()
+    collect(sales, items, orders, order_lines([order.id for order in orders]), -1)
+    write(sales, items)
+
+
+@transaction.atomic
+def move_orders(orders, previous):
+    """
+    Move orders whose type or status changed between rollup rows.
+
+    ``orders`` carry their new values, ``previous`` maps each order id to its
+    former ``(order_type, order_status)``.
+    """
+    orders = [order for order in orders if order.id in previous]
+    lines = order_lines([order.id for order in orders])
+    sales, items = new_deltas()
+    collect(sales, items, orders, lines, -1, states=previous)
+    collect(sales, items, orders, lines, 1)
+    write(sales, items)
+
+
+def payload_lines(payload):
+    """
+    The ``(inventory_id, quantity, unit_price)`` lines of an archived order's
+    payload, like ``order_lines`` gives for live orders.
+    """
+    lines = []
+    for item in payload.get("order_items") or []:
+        inventory = item.get("inventory") or {}
+        unit_price = item.get("unit_price", inventory.get("unit_price"))
+        lines.append(
+            (
+                inventory.get("id"),
+                item.get("quantity") or 0,
+                Decimal(unit_price) if unit_price is not None else None,
+            )
+        )
+    return lines
+
+
+@transaction.atomic
+def rebuild_rollups(restaurant=None, since=None):
+    """
+    Recompute the rollups from the orders, live and archived, for one
+    restaurant and/or from the day ``since`` on.  Returns the number of sales
+    and item rows.
+    """
+    orders = Order.objects.all()
+    archived = ArchivedOrder.objects.all()
+    sales_rows = DailySalesRollup.objects.all()
+    item_rows = DailyItemRollup.objects.all()
+    if restaurant:
+        orders = orders.filter(restaurant_id=restaurant)
+        archived = archived.filter(restaurant_id=restaurant)
+        sales_rows = sales_rows.filter(restaurant_id=restaurant)
+        item_rows = item_rows.filter(restaurant_id=restaurant)
+    if since:
+        start, _ = day_range(since)
+        orders = orders.filter(created_at__gte=start)
+        archived = archived.filter(created_at__gte=start)
+        sales_rows = sales_rows.filter(date__gte=since)
+        item_rows = item_rows.filter(date__gte=since)
+    sales_rows.delete()
+    item_rows.delete()
+
+    sales, items = new_deltas()
+    orders = orders.annotate(day=TruncDate("created_at")).order_by()
+    for row in orders.values(
+        "restaurant_id", "day", "order_type", "order_status"
+    ).annotate(
+        order_count=Count("id", distinct=True),
+        revenue=Coalesce(Sum(LINE_REVENUE), Decimal(0)),
+    ):
+        delta = sales[
+            (row["restaurant_id"], row["day"], row["order_type"], row["order_status"])
+        ]
+        delta[0] += row["order_count"]
+        delta[1] += row["revenue"]
+    for row in (
+        orders.exclude(order_status=CANCELLED)
+        .filter(order_items__isnull=False)
+        .values("restaurant_id", "day", "order_items__inventory_id")
+        .annotate(
+            quantity=Sum("order_items__quantity"),
+            revenue=Coalesce(Sum(LINE_REVENUE), Decimal(0)),
+        )
+    ):
+        delta = items[
+            (row["restaurant_id"], row["day"], row["order_items__inventory_id"])
+        ]
+        delta[0] += row["quantity"]
+        delta[1] += row["revenue"]
+    # Archived orders left the live tables but not the rollups: add them back
+    # from the payloads they were archived with.
+    for order in archived.iterator(chunk_size=1000):
+        collect(sales, items, [order], {order.id: payload_lines(order.payload)}, 1)
+
+    sales_rows = DailySalesRollup.objects.bulk_create(
+        [
+            DailySalesRollup(
+                restaurant_id_id=restaurant_id,
+                date=date,
+                order_type=order_type,
+                order_status=order_status,
+                order_count=delta[0],
+                revenue=delta[1],
+            )
+            for (restaurant_id, date, order_type, order_status), delta in sales.items()
+        ],
+        batch_size=1000,
+    )
+    item_rows = DailyItemRollup.objects.bulk_create(
+        [
+            DailyItemRollup(
+                restaurant_id_id=restaurant_id,
+                date=date,
+                inventory_id_id=inventory_id,
+                quantity=delta[0],
+                revenue=delta[1],
+            )
+            for (restaurant_id, date, inventory_id), delta in items.items()
+        ],
+        batch_size=1000,
+    )
+    return len(sales_rows), len(item_rows)
+
+
+def sales_summary(restaurant, start, end, top_items=10):
+    """
+    Answer the analytics dashboard from the rollups of the days
+    ``start`` to ``end`` (both included).  Revenue leaves out cancelled
+    orders.
+    """
+    rows = DailySalesRollup.objects.filter(
+        restaurant_id=restaurant, date__gte=start, date__lte=end
+    ).values_list("date", "order_type", "order_status", "order_count", "revenue")
+
+    totals = {"order_count": 0, "cancelled_count": 0, "revenue": Decimal(0)}
+    by_type = defaultdict(lambda: {"order_count": 0, "revenue": Decimal(0)})
+    by_status = defaultdict(lambda: {"order_count": 0, "revenue": Decimal(0)})
+    daily = defaultdict(lambda: {"order_count": 0, "revenue": Decimal(0)})
+    for date, order_type, order_status, order_count, revenue in rows:
+        by_status[order_status]["order_count"] += order_count
+        by_status[order_status]["revenue"] += revenue
+        if order_status == CANCELLED:
+            totals["cancelled_count"] += order_count
+            continue
+        for bucket in (totals, by_type[order_type], daily[date]):
+            bucket["order_count"] += order_count
+            bucket["revenue"] += revenue
+
+    items = (
+        DailyItemRollup.objects.filter(
+            restaurant_id=restaurant, date__gte=start, date__lte=end
+        )
+        .values("inventory_id", "inventory_id__name")
+        .annotate(total_quantity=Sum("quantity"), total_revenue=Sum("revenue"))
+        .order_by("-total_quantity", "inventory_id")[:top_items]
+    )
+    return {
+        "from": start,
+        "to": end,
+        "totals": totals,
+        "by_order_type": [
+            {"order_type": order_type, **values}
+            for order_type, values in sorted(by_type.items())
+        ],
+        "by_order_status": [
+            {"order_status": order_status, **values}
+            for order_status, values in sorted(by_status.items())
+        ],
+        "daily": [{"date": date, **values} for date, values in sorted(daily.items())],
+        "top_items": [
+            {
+                "inventory_id": item["inventory_id"],
+                "name": item["inventory_id__name"],
+                "quantity": item["total_quantity"],
+                "revenue": item["total_revenue"],
+            }
+            for item in items
+        ],
+    }
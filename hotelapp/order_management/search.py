@@ -0,0 +1,80 @@
+import re
+
+from django.db.models import Q
+from django.utils.dateparse import parse_date
+from .filters import day_range
+from .models import Order, OrderSearchTerm
+
+MAX_TERM_LENGTH = OrderSearchTerm._meta.get_field("term").max_length
+
+
+def normalize(value):
+    """
+    Reduce a phone number, order id or table number to its digits, so
+    "+91 98989-89898" and "9189898989898" match the same way.
+    """
+    return re.sub(r"\D", "", str(value or ""))[-MAX_TERM_LENGTH:]
+
+
+def order_terms(order):
+    values = [order.id]
+    if order.customer_id_id:
+        values.append(order.customer_id.phone_number)
+    if order.table_no_id:
+        values.append(order.table_no.tablenumber)
+    terms = set()
+    for value in values:
+        value = normalize(value)
+        terms.update(value[start:] for start in range(len(value)))
+    return terms
+
+
+def index_orders(orders, replace=True):
+    """
+    (Re)build the search terms of ``orders``.  Pass ``replace=False`` for
+    orders that were just created and have no terms yet.
+    """
+    orders = list(orders)
+    if replace:
+        OrderSearchTerm.objects.filter(order_id__in=orders).delete()
+    OrderSearchTerm.objects.bulk_create(
+        [
+            OrderSearchTerm(
+                restaurant_id_id=order.restaurant_id_id, order_id=order, term=term
+            )
+            for order in orders
+            for term in order_terms(order)
+        ]
+    )
+
+
+def search_orders(queryset, restaurant, query):
+    """
+    Filter ``queryset`` down to the restaurant's orders matching ``query``.
+
+    Digits are looked up in the search index (order id, customer phone and
+    table number, anywhere in the value).  The query also matches order
+    statuses containing it and, if it is a date, the orders of that day.
+    """
+    query = query.strip()
+    condition = Q(pk__in=[])
+    digits = normalize(query)
+    if digits:
+        condition |= Q(
+            id__in=OrderSearchTerm.objects.filter(
+                restaurant_id=restaurant, term__startswith=digits
+            ).values("order_id")
+        )
+    statuses = [
+        value for value, _ in Order.ORDER_STATUS_CHOICES if query.lower() in value
+    ]
+    if statuses:
+        condition |= Q(order_status__in=statuses)
+    try:
+        day = parse_date(query)
+    except ValueError:
+        day = None
+    if day:
+        start, end = day_range(day)
+        condition |= Q(created_at__gte=start, created_at__lt=end)
+    return queryset.filter(condition)
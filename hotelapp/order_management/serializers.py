@@ -1,5 +1,10 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import connection
+from django.db.models import Prefetch
 from rest_framework import serializers
+from .customers import normalize_phone, resolve_customer
 from .models import Order, OrderItem, Customer
+from restaurant.models import Inventory, StockReservation
 from restaurant.Inventory.serializers import InventoryOutputSerializer
 
 
@@ -9,14 +14,79 @@ class CustomerSerializer(serializers.ModelSerializer):
         fields = "__all__"
         read_only_fields = ["restaurant_id"]
 
+    def validate_phone_number(self, value):
+        value = normalize_phone(value)
+        if not value.lstrip("+"):
+            raise serializers.ValidationError("Enter a valid phone number.")
+        return value
+
+    def create(self, validated_data):
+        # Regulars reuse their customer row, matched on the phone number.
+        return resolve_customer(
+            restaurant_id=validated_data["restaurant_id"],
+            phone_number=validated_data["phone_number"],
+            name=validated_data["name"],
+            address=validated_data.get("address"),
+        )
+
+
+class PreloadedInventoryField(serializers.PrimaryKeyRelatedField):
+    """
+    Primary key field that resolves ids from a map preloaded by
+    ``OrderItemListSerializer`` instead of running one query per line item.
+    """
+
+    preloaded = None
+
+    def to_internal_value(self, data):
+        if self.preloaded is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        try:
+            pk = Inventory._meta.pk.to_python(data)
+        except DjangoValidationError:
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        try:
+            return self.preloaded[pk]
+        except KeyError:
+            self.fail("does_not_exist", pk_value=data)
+
+
+class OrderItemListSerializer(serializers.ListSerializer):
+    def to_internal_value(self, data):
+        inventory_field = self.child.fields["inventory_id"]
+        if isinstance(data, list):
+            pks = set()
+            for item in data:
+                if not isinstance(item, dict) or isinstance(
+                    item.get("inventory_id"), bool
+                ):
+                    continue
+                try:
+                    pk = Inventory._meta.pk.to_python(item.get("inventory_id"))
+                except DjangoValidationError:
+                    continue
+                if pk is not None:
+                    pks.add(pk)
+            inventory_field.preloaded = Inventory.objects.in_bulk(pks)
+        try:
+            return super().to_internal_value(data)
+        finally:
+            inventory_field.preloaded = None
+
 
 class OrderItemSerializer(serializers.ModelSerializer):
     # inventory = InventoryOutputSerializer(source="inventory_id")
+    inventory_id = PreloadedInventoryField(
+        queryset=Inventory.objects.all(), allow_null=True
+    )
 
     class Meta:
         model = OrderItem
         fields = "__all__"
-        read_only_fields = ["restaurant_id", "inventory"]
+        read_only_fields = ["order", "restaurant_id", "inventory", "unit_price"]
+        list_serializer_class = OrderItemListSerializer
 
 
 class OrderItemOutputSerializer(serializers.ModelSerializer):
@@ -38,15 +108,32 @@ class OrderSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         order_items_data = validated_data.pop("order_items")
+        restaurant_id = self.context["request"].user.restaurant
 
         order = Order.objects.create(**validated_data)
         order_items = []
         for order_item_data in order_items_data:
-            restaurant_id = self.context["request"].user.restaurant
-            order_item_data["restaurant_id"] = restaurant_id
-            order_item = OrderItem.objects.create(**order_item_data)
-            order_items.append(order_item)
-        order.order_items.add(*order_items)
+            inventory = order_item_data.get("inventory_id")
+            order_items.append(
+                OrderItem(
+                    order=order,
+                    restaurant_id=restaurant_id,
+                    # Kept with the line so later price changes leave it be.
+                    unit_price=inventory.unit_price if inventory else None,
+                    **order_item_data,
+                )
+            )
+        order_items = OrderItem.objects.bulk_create(order_items)
+        if not connection.features.can_return_rows_from_bulk_insert:
+            # Without RETURNING support bulk_create leaves the pks unset.
+            order_items = list(
+                OrderItem.objects.filter(order=order)
+                .select_related("inventory_id")
+                .order_by("id")
+            )
+        # Serve ``order.order_items.all()`` from memory so rendering the
+        # response does not query the items back.
+        order._prefetched_objects_cache = {"order_items": order_items}
         return order
 
 
@@ -57,3 +144,83 @@ class OrderOutputSerializer(serializers.ModelSerializer):
         model = Order
         fields = "__all__"
         read_only_fields = ["customer_id", "restaurant_id", "order_status"]
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """
+        Load the nested order items and the inventory relations rendered by
+        ``InventoryOutputSerializer`` in one extra query for the whole page.
+        """
+        return queryset.prefetch_related(
+            Prefetch(
+                "order_items",
+                queryset=OrderItem.objects.select_related(
+                    "inventory_id__unit_category",
+                    "inventory_id__menu_subtype",
+                    "inventory_id__menu_type",
+                ),
+            )
+        )
+
+
+class StockReservationSerializer(serializers.ModelSerializer):
+    inventory_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1)
+
+    class Meta:
+        model = StockReservation
+        fields = ["id", "session_id", "inventory_id", "quantity", "expires_at"]
+        read_only_fields = ["expires_at"]
+
+
+class OrderStatusTransitionSerializer(serializers.Serializer):
+    order_ids = serializers.ListField(
+        child=serializers.IntegerField(), allow_empty=False, max_length=500
+    )
+    order_status = serializers.ChoiceField(choices=Order.ORDER_STATUS_CHOICES)
+
+
+class SalesFiguresSerializer(serializers.Serializer):
+    order_count = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=None, decimal_places=2)
+
+
+class SalesTotalsSerializer(SalesFiguresSerializer):
+    cancelled_count = serializers.IntegerField()
+
+
+class OrderTypeSalesSerializer(SalesFiguresSerializer):
+    order_type = serializers.CharField()
+
+
+class OrderStatusSalesSerializer(SalesFiguresSerializer):
+    order_status = serializers.CharField()
+
+
+class DailySalesSerializer(SalesFiguresSerializer):
+    date = serializers.DateField()
+
+
+class TopItemSerializer(serializers.Serializer):
+    inventory_id = serializers.IntegerField(allow_null=True)
+    name = serializers.CharField(allow_null=True)
+    quantity = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=None, decimal_places=2)
+
+
+class SalesSummarySerializer(serializers.Serializer):
+    """Renders ``rollups.sales_summary`` with the amounts as decimal strings."""
+
+    totals = SalesTotalsSerializer()
+    by_order_type = OrderTypeSalesSerializer(many=True)
+    by_order_status = OrderStatusSalesSerializer(many=True)
+    daily = DailySalesSerializer(many=True)
+    top_items = TopItemSerializer(many=True)
+
+    def get_fields(self):
+        # "from" and "to" cannot be declared as class attributes.
+        return {
+            "from": serializers.DateField(),
+            "to": serializers.DateField(),
+            **super().get_fields(),
+        }
@@ -0,0 +1,158 @@
+from django.db.models.signals import (
+    post_delete,
+    post_init,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+from restaurant.models import Table
+from .customers import customer_cache
+from .feed import ORDER_CREATED, ORDER_UPDATED, publish_orders
+from .models import Customer, Order
+from .rollups import move_orders, remove_orders, rollups_kept
+from .search import index_orders
+
+
+# Order fields whose previous values the receivers below compare with.
+ORDER_STATE_FIELDS = ("order_type", "order_status")
+ORDER_SEARCH_FIELDS = ("customer_id", "table_no")
+
+
+def saves_any(update_fields, field_names):
+    return update_fields is None or any(name in update_fields for name in field_names)
+
+
+@receiver(pre_save, sender=Order)
+def remember_order_state(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    Load what the order was before this save, in one query, and only when
+    the save can change it.
+    """
+    previous = None
+    if (
+        instance.pk
+        and not raw
+        and saves_any(update_fields, ORDER_STATE_FIELDS + ORDER_SEARCH_FIELDS)
+    ):
+        previous = (
+            Order.objects.filter(pk=instance.pk)
+            .values_list(*ORDER_STATE_FIELDS, *ORDER_SEARCH_FIELDS)
+            .first()
+        )
+    instance._previous_state = previous[:2] if previous else None
+    instance._previous_search_keys = previous[2:] if previous else None
+
+
+@receiver(post_save, sender=Order)
+def index_saved_order(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        index_orders([instance], replace=False)
+        return
+    previous = getattr(instance, "_previous_search_keys", None)
+    if previous is not None and previous != (
+        instance.customer_id_id,
+        instance.table_no_id,
+    ):
+        index_orders([instance])
+
+
+def remember_loaded_value(instance, field_name):
+    # Straight from __dict__, so a deferred field is not loaded for this.
+    instance._search_previous_value = instance.__dict__.get(field_name)
+
+
+@receiver(post_init, sender=Customer)
+def remember_customer_phone(sender, instance, **kwargs):
+    remember_loaded_value(instance, "phone_number")
+
+
+@receiver(post_init, sender=Table)
+def remember_table_number(sender, instance, **kwargs):
+    remember_loaded_value(instance, "tablenumber")
+
+
+def search_value_changed(instance, field_name, created, raw, update_fields):
+    previous = getattr(instance, "_search_previous_value", None)
+    return (
+        not (created or raw)
+        and saves_any(update_fields, [field_name])
+        and previous != getattr(instance, field_name)
+    )
+
+
+@receiver(post_save, sender=Customer)
+def reindex_customer_orders(
+    sender, instance, created, raw=False, update_fields=None, **kwargs
+):
+    if not search_value_changed(instance, "phone_number", created, raw, update_fields):
+        return
+    index_orders(
+        Order.objects.filter(customer_id=instance).select_related(
+            "customer_id", "table_no"
+        )
+    )
+
+
+@receiver(post_save, sender=Table)
+def reindex_table_orders(
+    sender, instance, created, raw=False, update_fields=None, **kwargs
+):
+    if not search_value_changed(instance, "tablenumber", created, raw, update_fields):
+        return
+    index_orders(
+        Order.objects.filter(table_no=instance).select_related(
+            "customer_id", "table_no"
+        )
+    )
+
+
+@receiver(post_save, sender=Order)
+def move_order_rollups(sender, instance, created, raw=False, **kwargs):
+    # New orders are recorded once their items are saved, see
+    # ``order_management.views.save_order``.
+    previous = getattr(instance, "_previous_state", None)
+    if created or raw or previous is None:
+        return
+    if previous != (instance.order_type, instance.order_status):
+        move_orders([instance], {instance.id: previous})
+
+
+@receiver(pre_delete, sender=Order)
+def remove_order_rollups(sender, instance, **kwargs):
+    if not rollups_kept():
+        remove_orders([instance])
+
+
+@receiver(post_save, sender=Order)
+def publish_saved_order(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, "_previous_state", None)
+    if created:
+        publish_orders(instance.restaurant_id_id, [instance.id], ORDER_CREATED)
+    elif previous is not None and previous[1] != instance.order_status:
+        publish_orders(instance.restaurant_id_id, [instance.id], ORDER_UPDATED)
+
+
+@receiver(post_save, sender=Customer)
+@receiver(post_delete, sender=Customer)
+def forget_cached_customer(sender, instance, **kwargs):
+    customer_cache.discard(instance.restaurant_id_id, instance.phone_number)
+    previous = getattr(instance, "_search_previous_value", None)
+    if previous:
+        customer_cache.discard(instance.restaurant_id_id, previous)
+
+
+# Registered last: the receivers above compare with the value before the
+# save, the next save of the same instance with this one.
+@receiver(post_save, sender=Customer)
+def remember_saved_phone(sender, instance, **kwargs):
+    remember_loaded_value(instance, "phone_number")
+
+
+@receiver(post_save, sender=Table)
+def remember_saved_table_number(sender, instance, **kwargs):
+    remember_loaded_value(instance, "tablenumber")
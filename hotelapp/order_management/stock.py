@@ -0,0 +1,163 @@
+from django.db.models import Case, F, PositiveIntegerField, Q, When
+from restaurant.models import Inventory
+from restaurant.Inventory.stock import (
+    consume_reservations,
+    sharded_stock,
+    stock_changed,
+    take_from_slots,
+)
+
+
+class InsufficientStockError(Exception):
+    """
+    Raised when one or more ordered items cannot be covered by the stock.
+
+    ``shortages`` holds one dict per failing item with the requested and
+    available quantity so the view can report all of them at once.
+    """
+
+    def __init__(self, shortages):
+        names = ", ".join(
+            str(shortage["name"] or shortage["inventory_id"]) for shortage in shortages
+        )
+        self.message = f"Insufficient quantity for product {names}"
+        self.shortages = shortages
+        super().__init__(self.message)
+
+
+def collect_quantities(order_items):
+    """
+    Sum the ordered quantity per inventory id.
+
+    The same item may appear on several order lines, so the stock check has to
+    run against the total and not against each line on its own.
+    """
+    quantities = {}
+    for item in order_items:
+        inventory = item.get("inventory_id")
+        if inventory is None:
+            continue
+        quantities[inventory.id] = quantities.get(inventory.id, 0) + item.get(
+            "quantity", 0
+        )
+    return quantities
+
+
+def merge_quantities(*quantities):
+    """
+    Add up several ``{inventory_id: quantity}`` maps, e.g. for a batch of
+    orders that is checked against one stock snapshot.
+    """
+    merged = {}
+    for order_quantities in quantities:
+        for inventory_id, quantity in order_quantities.items():
+            merged[inventory_id] = merged.get(inventory_id, 0) + quantity
+    return merged
+
+
+def find_shortages(quantities, stock):
+    """
+    Compare the requested quantities with a ``{id: Inventory}`` snapshot.
+    """
+    shortages = []
+    for inventory_id, quantity in quantities.items():
+        inventory_item = stock.get(inventory_id)
+        available = inventory_item.available_quantity if inventory_item else 0
+        if available < quantity:
+            shortages.append(
+                {
+                    "inventory_id": inventory_id,
+                    "name": inventory_item.name if inventory_item else None,
+                    "requested": quantity,
+                    "available": available,
+                }
+            )
+    return shortages
+
+
+def lock_stock(quantities, lock=True):
+    """
+    Fetch every ordered inventory row, row-locked, in a single query.
+
+    Sharded items are read from their stock slots instead and their inventory
+    row is not locked, which is the point of sharding them.  Their snapshot
+    entries carry ``is_sharded = True``.
+    """
+    slot_totals = sharded_stock(list(quantities))
+    queryset = Inventory.objects.only("id", "name", "available_quantity")
+    stock = (queryset.select_for_update() if lock else queryset).in_bulk(
+        [inventory_id for inventory_id in quantities if inventory_id not in slot_totals]
+    )
+    if slot_totals:
+        for inventory_item in queryset.in_bulk(list(slot_totals)).values():
+            inventory_item.available_quantity = slot_totals[inventory_item.id]
+            inventory_item.is_sharded = True
+            stock[inventory_item.id] = inventory_item
+    return stock
+
+
+def sharded_ids(stock):
+    return {
+        inventory_id
+        for inventory_id, inventory_item in stock.items()
+        if getattr(inventory_item, "is_sharded", False)
+    }
+
+
+def decrement_stock(quantities, sharded=()):
+    """
+    Decrement all ordered items with one conditional UPDATE.
+
+    A row is only touched when ``available_quantity >= quantity`` still holds,
+    so the stock can never go negative even without the row lock.  Items in
+    ``sharded`` are taken from their stock slots instead.  If anything could
+    not be covered the failing items are reported through
+    ``InsufficientStockError``; the caller's transaction must roll back the
+    rows that did get decremented.
+    """
+    failed = [
+        inventory_id
+        for inventory_id, quantity in quantities.items()
+        if inventory_id in sharded and not take_from_slots(inventory_id, quantity)
+    ]
+    plain = {
+        inventory_id: quantity
+        for inventory_id, quantity in quantities.items()
+        if inventory_id not in sharded
+    }
+    updated = 0
+    if plain:
+        condition = Q()
+        for inventory_id, quantity in plain.items():
+            condition |= Q(id=inventory_id, available_quantity__gte=quantity)
+        updated = Inventory.objects.filter(condition).update(
+            available_quantity=Case(
+                *[
+                    When(id=inventory_id, then=F("available_quantity") - quantity)
+                    for inventory_id, quantity in plain.items()
+                ],
+                default=F("available_quantity"),
+                output_field=PositiveIntegerField(),
+            )
+        )
+    if failed or updated != len(plain):
+        stock = lock_stock(quantities, lock=False)
+        raise InsufficientStockError(find_shortages(quantities, stock))
+    stock_changed(plain)
+
+
+def reserve_stock(quantities, session_id=None):
+    """
+    Validate and decrement the stock for an order.
+
+    Stock the cart ``session_id`` reserved beforehand is used first.  Must be
+    called inside ``transaction.atomic``.  Without sharded items this costs a
+    handful of queries however many items are ordered: one locked bulk fetch
+    and one UPDATE.
+    """
+    quantities = consume_reservations(session_id, quantities)
+    stock = lock_stock(quantities)
+    shortages = find_shortages(quantities, stock)
+    if shortages:
+        raise InsufficientStockError(shortages)
+    decrement_stock(quantities, sharded_ids(stock))
@@ -1,3 +1,821 @@
-from django.test import TestCase
+import asyncio
+import csv
+import io
+import json
+from datetime import time, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from account.models import User
+from restaurant.models import (
+    Category,
+    Inventory,
+    Menu_Subtype,
+    MenuTypes,
+    Restaurant,
+    StockReservation,
+    Table,
+    UnitCategory,
+)
+from restaurant.Inventory.stock import reserve
+from .archive import archive_orders
+from .feed import ORDER_CREATED, ORDER_UPDATED, RESET, OrderFeedBroker
+from .idempotency import claim_key, get_idempotency_key
+from .models import ArchivedOrder, Customer, Order, OrderItem, OrderSearchTerm
+from .rollups import rebuild_rollups, sales_summary
+from .search import search_orders
+from .stock import InsufficientStockError, decrement_stock
+from .transitions import transition_orders
+
+
+class OrderTestMixin:
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name="Cafe")
+        cls.restaurant = Restaurant.objects.create(
+            name="Test Restaurant",
+            description="test description",
+            opening_time=time(9, 0),
+            closing_time=time(23, 0),
+            phone_number="7777777777",
+            address="test address",
+            restaurant_category=category,
+            email="restaurant@test.com",
+            logo="restaurants/logo.png",
+        )
+        cls.user = User.objects.create(
+            email="restaurant@test.com", role="restaurant", restaurant=cls.restaurant
+        )
+        cls.table = Table.objects.create(
+            restaurant=cls.restaurant, tablenumber=1, capacity=4
+        )
+        menu_type = MenuTypes.objects.create(name="Veg", restaurant=cls.restaurant)
+        menu_subtype = Menu_Subtype.objects.create(name="Starters", menutype=menu_type)
+        unit_category = UnitCategory.objects.create(name="Plate", abbreviation="plate")
+        cls.inventory = [
+            Inventory.objects.create(
+                name=f"Item {index}",
+                restaurant=cls.restaurant,
+                video_link="https://example.com/video",
+                item_image="item.png",
+                description="test item",
+                menu_type=menu_type,
+                menu_subtype=menu_subtype,
+                total_quantity=100,
+                available_quantity=100,
+                unit_price="10.50",
+                unit_category=unit_category,
+            )
+            for index in range(5)
+        ]
+
+    def setUp(self):
+        caches["customers"].clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_orders(self, count, items_per_order=5):
+        customer, _ = Customer.objects.get_or_create(
+            restaurant_id=self.restaurant,
+            phone_number="9898989898",
+            defaults={"name": "Ankit"},
+        )
+        for _ in range(count):
+            order = Order.objects.create(
+                restaurant_id=self.restaurant,
+                customer_id=customer,
+                table_no=self.table,
+                order_type="dine-in",
+            )
+            OrderItem.objects.bulk_create(
+                [
+                    OrderItem(
+                        order=order,
+                        restaurant_id=self.restaurant,
+                        inventory_id=inventory,
+                        quantity=1,
+                        unit_price=inventory.unit_price,
+                    )
+                    for inventory in self.inventory[:items_per_order]
+                ]
+            )
+
+
+class ListOrderApiViewTests(OrderTestMixin, TestCase):
+    def test_order_page_uses_constant_number_of_queries(self):
+        self.create_orders(3)
+        # The page of orders, one prefetch for all order items with their
+        # inventory relations, and the archive for the rest of the short page.
+        with self.assertNumQueries(3):
+            response = self.client.get("/api/order/list/", {"page_size": 10})
+        self.assertEqual(len(response.data["detail"]), 3)
+
+        self.create_orders(8)
+        # With more live orders than fit the page the archive is not read.
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/order/list/", {"page_size": 10})
+        self.assertEqual(len(response.data["detail"]), 10)
+        inventory = response.data["detail"][0]["order_items"][0]["inventory"]
+        self.assertEqual(inventory["menu_type"], "Veg")
+        self.assertEqual(inventory["menu_subtype"], "Starters")
+        self.assertEqual(inventory["unit_category"], "Plate")
+
+    def test_numbered_pages_are_still_answered(self):
+        self.create_orders(3)
+        response = self.client.get("/api/order/list/", {"page": 2, "page_size": 2})
+        self.assertEqual(len(response.data["detail"]), 1)
+        self.assertEqual(
+            response.data["pagination_info"],
+            {"page_size": 2, "total_pages": 2, "current_page": 2, "total_items": 3},
+        )
+
+    def test_cursor_on_not_null_keys_is_a_plain_comparison(self):
+        self.create_orders(3, items_per_order=1)
+        response = self.client.get("/api/order/list/", {"page_size": 2})
+        cursor = response.data["pagination_info"]["next_cursor"]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                "/api/order/list/", {"page_size": 2, "cursor": cursor}
+            )
+        self.assertEqual(len(response.data["detail"]), 1)
+        sql = queries.captured_queries[0]["sql"]
+        self.assertNotIn("IS NULL", sql)
+        self.assertNotIn("NULLS", sql)
+
+    def test_cursor_pages_through_null_keys(self):
+        self.create_orders(4, items_per_order=1)
+        Order.objects.filter(id__in=Order.objects.values("id")[:2]).update(
+            table_no=None
+        )
+        for sort_order in ("asc", "desc"):
+            seen, params = [], {"page_size": 1, "sort_by": "table_no"}
+            params["sort_order"] = sort_order
+            while True:
+                response = self.client.get("/api/order/list/", params)
+                seen += [order["id"] for order in response.data["detail"]]
+                params["cursor"] = response.data["pagination_info"]["next_cursor"]
+                if params["cursor"] is None:
+                    break
+            self.assertCountEqual(seen, Order.objects.values_list("id", flat=True))
+
+    def test_orders_archived_early_are_listed(self):
+        self.create_orders(2)
+        # As with ``archive_orders --days 0``.
+        archive_orders(timezone.now())
+        response = self.client.get(
+            "/api/order/list/", {"from": timezone.localdate().isoformat()}
+        )
+        self.assertEqual(len(response.data["detail"]), 2)
+
+
+class OrderItemTests(OrderTestMixin, TestCase):
+    def test_items_stay_with_their_order_through_list_and_archive(self):
+        self.create_orders(1, items_per_order=2)
+        old = Order.objects.get()
+        Order.objects.filter(id=old.id).update(
+            created_at=timezone.now() - timedelta(days=1)
+        )
+        self.create_orders(1, items_per_order=3)
+        new = Order.objects.exclude(id=old.id).get()
+        items = {
+            order.id: sorted(order.order_items.values_list("id", flat=True))
+            for order in (old, new)
+        }
+
+        response = self.client.get("/api/order/list/", {"page_size": 10})
+        for order in response.data["detail"]:
+            self.assertEqual(
+                sorted(item["id"] for item in order["order_items"]), items[order["id"]]
+            )
+            self.assertEqual(
+                {item["order"] for item in order["order_items"]}, {order["id"]}
+            )
+
+        archive_orders(timezone.now() - timedelta(hours=1))
+        payload = ArchivedOrder.objects.get(id=old.id).payload
+        self.assertEqual(
+            sorted(item["id"] for item in payload["order_items"]), items[old.id]
+        )
+        # The archived order's items went with it, the other order kept its own.
+        self.assertFalse(OrderItem.objects.filter(id__in=items[old.id]).exists())
+        self.assertEqual(
+            sorted(new.order_items.values_list("id", flat=True)), items[new.id]
+        )
+
+
+class BatchCreateOrderApiViewTests(OrderTestMixin, TestCase):
+    def order(self, inventory, quantity, session_id=None):
+        order = {
+            "order_type": "take-away",
+            "order_items": [{"inventory_id": inventory.id, "quantity": quantity}],
+            "customer_data": {"name": "Ankit", "phone_number": "9898989898"},
+        }
+        if session_id:
+            order["session_id"] = session_id
+        return order
+
+    def test_atomic_batch_with_one_short_order_leaves_reservations_intact(self):
+        item, other = self.inventory[:2]
+        reserve("cart-1", item.id, 5)
+        response = self.client.post(
+            "/api/order/batch/",
+            {
+                "orders": [
+                    self.order(item, 2, session_id="cart-1"),
+                    self.order(other, 1000),
+                ]
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order.objects.exists())
+        reservation = StockReservation.objects.get(session_id="cart-1")
+        self.assertEqual(reservation.quantity, 5)
+        item.refresh_from_db()
+        self.assertEqual(item.available_quantity, 95)
+
+    def test_surplus_reservation_is_available_to_later_orders(self):
+        item = self.inventory[0]
+        reserve("cart-1", item.id, 100)
+        response = self.client.post(
+            "/api/order/batch/",
+            {
+                "orders": [
+                    self.order(item, 40, session_id="cart-1"),
+                    self.order(item, 50),
+                ]
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        item.refresh_from_db()
+        self.assertEqual(item.available_quantity, 10)
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_customer_fields_beyond_contact_details_are_accepted(self):
+        order = self.order(self.inventory[0], 1)
+        order["customer_data"]["created_at"] = "2024-01-01T00:00:00Z"
+        response = self.client.post(
+            "/api/order/batch/", {"orders": [order]}, format="json"
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Customer.objects.get().name, "Ankit")
+
+
+class CreateOrderApiViewTests(OrderTestMixin, TestCase):
+    def submit(self, lines, order_type="take-away", **customer_data):
+        order = {
+            "order_type": order_type,
+            "order_items": [
+                {"inventory_id": inventory.id, "quantity": quantity}
+                for inventory, quantity in lines
+            ],
+            "customer_data": {
+                "name": "Ankit",
+                "phone_number": "9898989898",
+                **customer_data,
+            },
+        }
+        return self.client.post("/api/order/create/", order, format="json")
+
+    def available(self):
+        return list(
+            Inventory.objects.filter(restaurant=self.restaurant)
+            .order_by("id")
+            .values_list("available_quantity", flat=True)
+        )
+
+    def test_repeated_lines_are_decremented_by_their_sum(self):
+        first, second = self.inventory[:2]
+        response = self.submit([(first, 30), (second, 5), (first, 40)])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.available(), [30, 95, 100, 100, 100])
+
+    def test_oversold_order_lists_every_short_item(self):
+        first, second, third = self.inventory[:3]
+        # Each line of the first item fits the stock, their sum does not.
+        response = self.submit([(first, 60), (second, 101), (third, 1), (first, 60)])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.data["detail"],
+            [
+                {
+                    "inventory_id": first.id,
+                    "name": first.name,
+                    "requested": 120,
+                    "available": 100,
+                },
+                {
+                    "inventory_id": second.id,
+                    "name": second.name,
+                    "requested": 101,
+                    "available": 100,
+                },
+            ],
+        )
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(self.available(), [100] * 5)
+
+    def test_conditional_update_does_not_oversell(self):
+        first, second = self.inventory[:2]
+        # Stock taken by a concurrent order after the snapshot was read.
+        Inventory.objects.filter(id=first.id).update(available_quantity=5)
+        with self.assertRaises(InsufficientStockError) as raised:
+            with transaction.atomic():
+                decrement_stock({first.id: 10, second.id: 1})
+        self.assertEqual(
+            [shortage["inventory_id"] for shortage in raised.exception.shortages],
+            [first.id],
+        )
+        self.assertEqual(self.available(), [5, 100, 100, 100, 100])
+
+        with transaction.atomic():
+            decrement_stock({first.id: 5, second.id: 1})
+        self.assertEqual(self.available(), [0, 99, 100, 100, 100])
+
+    def test_order_lines_are_written_with_one_insert(self):
+        lines = [(item, index + 1) for index, item in enumerate(self.inventory)]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.submit(lines)
+        self.assertEqual(response.status_code, 201)
+        inserts = [
+            query
+            for query in queries.captured_queries
+            if query["sql"].startswith(f'INSERT INTO "{OrderItem._meta.db_table}"')
+        ]
+        self.assertEqual(len(inserts), 1)
+        self.assert_response_items(response)
+
+    def test_order_lines_are_read_back_without_returning_support(self):
+        # As on MySQL, where bulk_create cannot return the new primary keys.
+        with mock.patch.object(
+            type(connection.features),
+            "can_return_rows_from_bulk_insert",
+            new_callable=mock.PropertyMock,
+            return_value=False,
+        ):
+            response = self.submit([(self.inventory[0], 2), (self.inventory[1], 3)])
+        self.assertEqual(response.status_code, 201)
+        self.assert_response_items(response)
+
+    def assert_response_items(self, response):
+        order = response.data["detail"]["order"]
+        rendered = sorted(
+            (item["id"], item["inventory_id"], item["quantity"], item["unit_price"])
+            for item in order["order_items"]
+        )
+        stored = sorted(
+            (item.id, item.inventory_id_id, item.quantity, str(item.unit_price))
+            for item in OrderItem.objects.filter(order_id=order["id"])
+        )
+        self.assertEqual(rendered, stored)
+        self.assertTrue(all(item_id for item_id, _, _, _ in rendered))
+
+    def test_home_delivery_order_keeps_its_type(self):
+        response = self.submit(
+            [(self.inventory[0], 1)], order_type="home-delivery", address="Street 1"
+        )
+        self.assertEqual(response.status_code, 201)
+        order = response.data["detail"]["order"]
+        self.assertEqual(order["order_type"], "home-delivery")
+        self.assertEqual(Order.objects.get().order_type, "home-delivery")
+
+
+class IdempotentCreateOrderApiViewTests(OrderTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        caches["idempotency"].clear()
+
+    def submit(self, quantity=2, key="order-1", session_id=None):
+        order = {
+            "order_type": "take-away",
+            "order_items": [
+                {"inventory_id": self.inventory[0].id, "quantity": quantity}
+            ],
+            "customer_data": {"name": "Ankit", "phone_number": "9898989898"},
+        }
+        if session_id:
+            order["session_id"] = session_id
+        headers = {"HTTP_IDEMPOTENCY_KEY": key} if key else {}
+        return self.client.post("/api/order/create/", order, format="json", **headers)
+
+    def test_retry_is_replayed(self):
+        first = self.submit()
+        second = self.submit()
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(second["Idempotent-Replayed"], "true")
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_retry_while_in_flight_conflicts(self):
+        order = {"order_type": "take-away"}
+        key, fingerprint, _ = get_idempotency_key(
+            SimpleNamespace(
+                data=order, META={"HTTP_IDEMPOTENCY_KEY": "order-1"}, user=self.user
+            )
+        )
+        self.assertIsNone(claim_key(key, fingerprint))
+        response = self.client.post(
+            "/api/order/create/", order, format="json", HTTP_IDEMPOTENCY_KEY="order-1"
+        )
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(Order.objects.exists())
+
+    def test_key_reused_for_another_order_is_rejected(self):
+        self.assertEqual(self.submit(quantity=2).status_code, 201)
+        response = self.submit(quantity=3)
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_key_is_released_when_the_order_fails(self):
+        self.assertEqual(self.submit(quantity=1000).status_code, 400)
+        self.assertEqual(self.submit(quantity=1000).status_code, 400)
+        self.assertEqual(self.submit(quantity=2).status_code, 201)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_same_order_of_a_session_is_new_after_the_retry_window(self):
+        self.assertEqual(self.submit(key=None, session_id="cart-1").status_code, 201)
+        replay = self.submit(key=None, session_id="cart-1")
+        self.assertEqual(replay["Idempotent-Replayed"], "true")
+        self.assertEqual(Order.objects.count(), 1)
+
+        with override_settings(ORDER_IMPLICIT_IDEMPOTENCY_TIMEOUT=0):
+            caches["idempotency"].clear()
+            self.submit(key=None, session_id="cart-1")
+            response = self.submit(key=None, session_id="cart-1")
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(response.has_header("Idempotent-Replayed"))
+        self.assertEqual(Order.objects.count(), 3)
+
+
+class OrderSearchTests(OrderTestMixin, TestCase):
+    def search(self, query):
+        return set(
+            search_orders(Order.objects.all(), self.restaurant, query).values_list(
+                "id", flat=True
+            )
+        )
+
+    def test_orders_are_found_by_any_part_of_their_numbers(self):
+        self.create_orders(1, items_per_order=1)
+        order = Order.objects.get()
+        self.assertEqual(self.search("89898"), {order.id})
+        # Formatting is ignored, on both sides.
+        self.assertEqual(self.search("989-898"), {order.id})
+        self.assertEqual(self.search(str(order.id)), {order.id})
+        self.assertEqual(self.search("5555"), set())
+
+    def test_phone_change_reindexes_the_customers_orders(self):
+        self.create_orders(2, items_per_order=1)
+        customer = Customer.objects.get()
+        customer.phone_number = "9123456780"
+        customer.save()
+        orders = set(Order.objects.values_list("id", flat=True))
+        self.assertEqual(self.search("345678"), orders)
+        self.assertEqual(self.search("89898"), set())
+
+    def test_table_number_change_reindexes_the_tables_orders(self):
+        self.create_orders(1, items_per_order=1)
+        self.table.tablenumber = 4242
+        self.table.save()
+        self.assertEqual(self.search("424"), {Order.objects.get().id})
+
+    def test_order_moved_to_another_table_is_reindexed(self):
+        self.create_orders(1, items_per_order=1)
+        order = Order.objects.get()
+        order.table_no = Table.objects.create(
+            restaurant=self.restaurant, tablenumber=7373, capacity=2
+        )
+        order.save()
+        self.assertEqual(self.search("737"), {order.id})
+
+    def test_saves_of_other_fields_leave_the_index_alone(self):
+        self.create_orders(1, items_per_order=1)
+        order = Order.objects.get()
+        order.payment_status = "paid"
+        with CaptureQueriesContext(connection) as queries:
+            order.save()
+        self.assertFalse(
+            [
+                query
+                for query in queries.captured_queries
+                if OrderSearchTerm._meta.db_table in query["sql"]
+            ]
+        )
+
+    def test_statuses_and_days_are_matched(self):
+        self.create_orders(2, items_per_order=1)
+        confirmed, pending = Order.objects.order_by("id")
+        Order.objects.filter(id=confirmed.id).update(order_status="confirmed")
+        self.assertEqual(self.search("confirm"), {confirmed.id})
+        self.assertEqual(self.search("PEND"), {pending.id})
+        today = timezone.localdate()
+        self.assertEqual(self.search(today.isoformat()), {confirmed.id, pending.id})
+        self.assertEqual(self.search((today - timedelta(days=1)).isoformat()), set())
+
+
+class OrderStatusTransitionApiViewTests(OrderTestMixin, TestCase):
+    def transition(self, order_ids, order_status):
+        return self.client.post(
+            "/api/order/status/",
+            {"order_ids": order_ids, "order_status": order_status},
+            format="json",
+        )
+
+    def test_only_allowed_transitions_are_made(self):
+        allowed = {
+            ("pending", "confirmed"),
+            ("pending", "cancelled"),
+            ("confirmed", "delivered"),
+            ("confirmed", "cancelled"),
+        }
+        statuses = [value for value, _ in Order.ORDER_STATUS_CHOICES]
+        self.create_orders(1, items_per_order=1)
+        order = Order.objects.get()
+        for source in statuses:
+            for target in statuses:
+                with self.subTest(source=source, target=target):
+                    Order.objects.filter(id=order.id).update(order_status=source)
+                    rebuild_rollups(self.restaurant)
+                    response = self.transition([order.id], target)
+                    order.refresh_from_db()
+                    if (source, target) in allowed:
+                        self.assertEqual(response.status_code, 200)
+                        self.assertEqual(order.order_status, target)
+                    else:
+                        self.assertEqual(response.status_code, 400)
+                        self.assertEqual(order.order_status, source)
+
+    def test_partly_rejected_batch_is_multi_status(self):
+        self.create_orders(2, items_per_order=1)
+        pending, delivered = Order.objects.order_by("id")
+        Order.objects.filter(id=delivered.id).update(order_status="delivered")
+        missing = delivered.id + 1000
+
+        response = self.transition([pending.id, delivered.id, missing], "confirmed")
+        self.assertEqual(response.status_code, 207)
+        detail = response.data["detail"]
+        self.assertEqual(
+            [(row["id"], row["previous_status"]) for row in detail["updated"]],
+            [(pending.id, "pending")],
+        )
+        self.assertEqual(
+            [row["id"] for row in detail["rejected"]], [delivered.id, missing]
+        )
+        self.assertEqual(detail["rejected"][0]["order_status"], "delivered")
+
+        response = self.transition([pending.id], "unknown")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("order_status", response.data["detail"])
+
+    def test_rollups_and_feed_follow_the_transition(self):
+        self.create_orders(2, items_per_order=1)
+        rebuild_rollups(self.restaurant)
+        order_ids = sorted(Order.objects.values_list("id", flat=True))
+        with mock.patch("order_management.transitions.publish_orders") as publish:
+            response = self.transition(order_ids, "confirmed")
+        self.assertEqual(response.status_code, 200)
+        publish.assert_called_once_with(self.restaurant.id, order_ids, ORDER_UPDATED)
+
+        today = timezone.localdate()
+        summary = sales_summary(self.restaurant, today, today)
+        counts = {
+            row["order_status"]: row["order_count"]
+            for row in summary["by_order_status"]
+        }
+        self.assertEqual(counts, {"pending": 0, "confirmed": 2})
+        rebuild_rollups(self.restaurant)
+        rebuilt = sales_summary(self.restaurant, today, today)
+        self.assertEqual(summary["totals"], rebuilt["totals"])
+
+
+class ExportOrderApiViewTests(OrderTestMixin, TestCase):
+    def export(self, **params):
+        response = self.client.get("/api/order/export/", params)
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content).decode()
+
+    def test_csv_has_a_row_per_item(self):
+        self.create_orders(2, items_per_order=2)
+        rows = list(csv.DictReader(io.StringIO(self.export())))
+        self.assertEqual(len(rows), 4)
+        order_ids = sorted(Order.objects.values_list("id", flat=True))
+        self.assertEqual(
+            [int(row["order_id"]) for row in rows],
+            [order_ids[0], order_ids[0], order_ids[1], order_ids[1]],
+        )
+        self.assertEqual([row["item_name"] for row in rows], ["Item 0", "Item 1"] * 2)
+        self.assertEqual(
+            {(row["quantity"], row["unit_price"], row["line_total"]) for row in rows},
+            {("1", "10.50", "10.50")},
+        )
+
+    def test_ndjson_groups_the_items_of_filtered_orders(self):
+        self.create_orders(2, items_per_order=2)
+        confirmed = Order.objects.order_by("id").first()
+        Order.objects.filter(id=confirmed.id).update(order_status="confirmed")
+
+        lines = self.export(export_format="ndjson", order_status="confirmed")
+        documents = [json.loads(line) for line in lines.splitlines()]
+        self.assertEqual([document["id"] for document in documents], [confirmed.id])
+        document = documents[0]
+        self.assertEqual(document["order_status"], "confirmed")
+        self.assertEqual(
+            [(item["name"], item["line_total"]) for item in document["items"]],
+            [("Item 0", "10.50"), ("Item 1", "10.50")],
+        )
+        self.assertEqual(document["total"], "21.00")
+
+    def test_archived_orders_come_first(self):
+        self.create_orders(1, items_per_order=2)
+        archived = Order.objects.get()
+        Order.objects.filter(id=archived.id).update(
+            created_at=timezone.now() - timedelta(days=1)
+        )
+        archive_orders(timezone.now() - timedelta(hours=1))
+        self.create_orders(1, items_per_order=1)
+        live = Order.objects.get()
+
+        lines = self.export(export_format="ndjson")
+        documents = [json.loads(line) for line in lines.splitlines()]
+        self.assertEqual(
+            [(document["id"], len(document["items"])) for document in documents],
+            [(archived.id, 2), (live.id, 1)],
+        )
+        self.assertEqual(documents[0]["customer_phone_number"], "9898989898")
+        self.assertEqual(documents[0]["total"], "21.00")
+
+        rows = list(csv.DictReader(io.StringIO(self.export())))
+        self.assertEqual(
+            [int(row["order_id"]) for row in rows], [archived.id] * 2 + [live.id]
+        )
+
+
+class OrderFeedBrokerTests(SimpleTestCase):
+    def drain(self, subscriber):
+        entries = []
+        while not subscriber.queue.empty():
+            entries.append(subscriber.queue.get_nowait())
+        return [(event_id, event) for event_id, event, _ in entries]
+
+    def test_reconnecting_clients_resume_or_reset(self):
+        async def scenario():
+            broker = OrderFeedBroker(buffer_size=2)
+            # Nobody watches the restaurant yet: nothing is buffered.
+            self.assertIsNone(broker.publish(1, ORDER_CREATED, {"id": 1}))
+
+            live = broker.subscribe(1)
+            first = broker.publish(1, ORDER_CREATED, {"id": 1})
+            second = broker.publish(1, ORDER_UPDATED, {"id": 1})
+            third = broker.publish(1, ORDER_CREATED, {"id": 2})
+            # Pushed to the subscriber's loop with call_soon_threadsafe.
+            await asyncio.sleep(0)
+            self.assertEqual(
+                self.drain(live),
+                [
+                    (first, ORDER_CREATED),
+                    (second, ORDER_UPDATED),
+                    (third, ORDER_CREATED),
+                ],
+            )
+
+            # Everything after the last event seen is still buffered.
+            resumed = broker.subscribe(1, last_event_id=first)
+            self.assertEqual(
+                self.drain(resumed), [(second, ORDER_UPDATED), (third, ORDER_CREATED)]
+            )
+            # ``first`` was dropped from the buffer of two.
+            self.assertEqual(
+                self.drain(broker.subscribe(1, last_event_id=first - 1)),
+                [(third, RESET)],
+            )
+            # An id from an earlier run of the process.
+            self.assertEqual(
+                self.drain(broker.subscribe(1, last_event_id=third + 10)),
+                [(third, RESET)],
+            )
+            # A restaurant this process did not buffer before.
+            self.assertEqual(
+                self.drain(broker.subscribe(2, last_event_id=first)), [(third, RESET)]
+            )
+
+        asyncio.run(scenario())
+
+
+class SalesRollupTests(OrderTestMixin, TestCase):
+    def test_price_change_does_not_skew_rollups(self):
+        item = self.inventory[0]
+        response = self.client.post(
+            "/api/order/create/",
+            {
+                "order_type": "take-away",
+                "order_items": [{"inventory_id": item.id, "quantity": 2}],
+                "customer_data": {"name": "Ankit", "phone_number": "9898989898"},
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        order_id = response.data["detail"]["order"]["id"]
+
+        Inventory.objects.filter(id=item.id).update(unit_price="99.00")
+        transition_orders(self.restaurant, [order_id], "confirmed")
+
+        today = timezone.localdate()
+        incremental = self.summarize(sales_summary(self.restaurant, today, today))
+        rebuild_rollups(self.restaurant)
+        rebuilt = self.summarize(sales_summary(self.restaurant, today, today))
+        self.assertEqual(incremental, rebuilt)
+        self.assertEqual(incremental[0]["revenue"], Decimal("21.00"))
+
+    def test_rebuild_keeps_archived_orders(self):
+        for item, quantity in ((self.inventory[0], 2), (self.inventory[1], 3)):
+            response = self.client.post(
+                "/api/order/create/",
+                {
+                    "order_type": "take-away",
+                    "order_items": [{"inventory_id": item.id, "quantity": quantity}],
+                    "customer_data": {"name": "Ankit", "phone_number": "9898989898"},
+                },
+                format="json",
+            )
+            self.assertEqual(response.status_code, 201)
+
+        today = timezone.localdate()
+        before = self.summarize(sales_summary(self.restaurant, today, today))
+        archive_orders(timezone.now())
+        self.assertFalse(Order.objects.exists())
+        rebuild_rollups(self.restaurant, since=today)
+        rebuilt = self.summarize(sales_summary(self.restaurant, today, today))
+        self.assertEqual(before, rebuilt)
+        self.assertEqual(rebuilt[0]["order_count"], 2)
+        self.assertEqual(rebuilt[0]["revenue"], Decimal("52.50"))
+
+    def test_analytics_renders_amounts_as_decimal_strings(self):
+        response = self.client.post(
+            "/api/order/create/",
+            {
+                "order_type": "take-away",
+                "order_items": [{"inventory_id": self.inventory[0].id, "quantity": 2}],
+                "customer_data": {"name": "Ankit", "phone_number": "9898989898"},
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+
+        response = self.client.get("/api/order/analytics/")
+        self.assertEqual(response.status_code, 200)
+        detail = json.loads(response.content)["detail"]
+        self.assertEqual(detail["totals"]["revenue"], "21.00")
+        self.assertEqual(detail["daily"][0]["revenue"], "21.00")
+        self.assertEqual(detail["top_items"][0]["revenue"], "21.00")
+        self.assertEqual(detail["to"], timezone.localdate().isoformat())
+
+    def test_deleted_item_keeps_its_sales(self):
+        item = self.inventory[0]
+        response = self.client.post(
+            "/api/order/create/",
+            {
+                "order_type": "take-away",
+                "order_items": [{"inventory_id": item.id, "quantity": 2}],
+                "customer_data": {"name": "Ankit", "phone_number": "9898989898"},
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        order_id = response.data["detail"]["order"]["id"]
+        item.delete()
+        transition_orders(self.restaurant, [order_id], "confirmed")
+
+        today = timezone.localdate()
+        incremental = self.summarize(sales_summary(self.restaurant, today, today))
+        self.assertEqual(
+            incremental[2],
+            [
+                {
+                    "inventory_id": None,
+                    "name": None,
+                    "quantity": 2,
+                    "revenue": Decimal("21.00"),
+                }
+            ],
+        )
+        rebuild_rollups(self.restaurant)
+        rebuilt = self.summarize(sales_summary(self.restaurant, today, today))
+        self.assertEqual(incremental, rebuilt)
+
+    def summarize(self, summary):
+        # Rows emptied by a transition stay behind with zero counts.
+        return (
+            summary["totals"],
+            [row for row in summary["by_order_status"] if row["order_count"]],
+            [item for item in summary["top_items"] if item["quantity"]],
+        )
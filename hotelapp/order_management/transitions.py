@@ -0,0 +1,81 @@
+from django.db import transaction
+from django.utils import timezone
+from .feed import ORDER_UPDATED, publish_orders
+from .models import Order
+from .rollups import move_orders
+
+# Statuses an order may move to from its current status.
+ORDER_TRANSITIONS = {
+    "pending": ("confirmed", "cancelled"),
+    "confirmed": ("delivered", "cancelled"),
+    "delivered": (),
+    "cancelled": (),
+}
+
+
+def allowed_sources(target):
+    return [
+        source for source, targets in ORDER_TRANSITIONS.items() if target in targets
+    ]
+
+
+@transaction.atomic
+def transition_orders(restaurant, order_ids, target):
+    """
+    Move the restaurant's orders to ``target`` with a single UPDATE.
+
+    Returns ``(updated, rejected)``: the moved orders with their previous
+    status, and the ids that were not found or cannot move to ``target``.
+    Bulk updates skip the model signals, so the rollups and the kitchen feed
+    are updated here.
+    """
+    order_ids = list(dict.fromkeys(order_ids))
+    orders = {
+        order.id: order
+        for order in Order.objects.select_for_update()
+        .filter(restaurant_id=restaurant, id__in=order_ids)
+        .only("id", "restaurant_id", "order_type", "order_status", "created_at")
+    }
+    sources = allowed_sources(target)
+    movable = []
+    rejected = []
+    for order_id in order_ids:
+        order = orders.get(order_id)
+        if order is None:
+            rejected.append({"id": order_id, "message": "Order not found."})
+        elif order.order_status not in sources:
+            message = f"Cannot change a {order.order_status} order to {target}."
+            rejected.append(
+                {
+                    "id": order_id,
+                    "order_status": order.order_status,
+                    "message": message,
+                }
+            )
+        else:
+            movable.append(order)
+    if not movable:
+        return [], rejected
+
+    now = timezone.now()
+    # ``updated_at`` is auto_now, which update() does not apply by itself.
+    Order.objects.filter(
+        id__in=[order.id for order in movable], order_status__in=sources
+    ).update(order_status=target, updated_at=now)
+
+    previous = {order.id: (order.order_type, order.order_status) for order in movable}
+    updated = []
+    for order in movable:
+        updated.append(
+            {
+                "id": order.id,
+                "previous_status": order.order_status,
+                "order_status": target,
+                "updated_at": now,
+            }
+        )
+        order.order_status = target
+        order.updated_at = now
+    move_orders(movable, previous)
+    publish_orders(restaurant.id, [order.id for order in movable], ORDER_UPDATED)
+    return updated, rejected
@@ -1,7 +1,24 @@
 from django.urls import path
-from .views import CreateOrderApiView, ListOrderApiView
+from .views import (
+    BatchCreateOrderApiView,
+    CreateOrderApiView,
+    ExportOrderApiView,
+    ListOrderApiView,
+    OrderAnalyticsApiView,
+    OrderStatusTransitionApiView,
+    ReserveStockApiView,
+)
 
 urlpatterns = [
     path("create/", CreateOrderApiView.as_view(), name="create_order"),
+    path("batch/", BatchCreateOrderApiView.as_view(), name="batch_create_order"),
+    path("reserve/", ReserveStockApiView.as_view(), name="reserve_stock"),
     path("list/", ListOrderApiView.as_view(), name="list_order"),
+    path(
+        "status/",
+        OrderStatusTransitionApiView.as_view(),
+        name="order_status_transition",
+    ),
+    path("export/", ExportOrderApiView.as_view(), name="export_order"),
+    path("analytics/", OrderAnalyticsApiView.as_view(), name="order_analytics"),
 ]
@@ -1,25 +1,97 @@
-from django.utils import timezone
 from datetime import timedelta
+from itertools import chain
 from django.db import transaction
-from django.db.models import Q
-from django.core.paginator import Paginator
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from restaurant.models import Inventory
 from rest_framework import permissions
-from restaurant.permissions import IsRestaurant
+from hotelapp.pagination import DEFAULT_ORDERING, paginate_queryset
+from restaurant.permissions import IsKitchenStaff, IsRestaurant
+from restaurant.models import Inventory, StockReservation
+from restaurant.Inventory.stock import (
+    consume_reservations,
+    release_reservations,
+    reserve,
+)
 from .serializers import (
     OrderSerializer,
     CustomerSerializer,
     OrderItemOutputSerializer,
     OrderOutputSerializer,
+    OrderStatusTransitionSerializer,
+    SalesSummarySerializer,
+    StockReservationSerializer,
 )
 from .models import Order
+from .archive import (
+    archived_export_rows,
+    archived_orders,
+    needs_archive,
+    serialize_orders,
+)
+from .export import export_rows, stream_csv, stream_ndjson
+from .filters import filter_created_range, get_created_range
+from .rollups import record_orders, sales_summary
+from .search import search_orders
+from .transitions import transition_orders
+from .idempotency import (
+    DONE,
+    claim_key,
+    get_idempotency_key,
+    release_key,
+    store_response,
+)
+from .stock import (
+    InsufficientStockError,
+    collect_quantities,
+    decrement_stock,
+    find_shortages,
+    lock_stock,
+    merge_quantities,
+    reserve_stock,
+    sharded_ids,
+)
 
 # Create your views here.
 
 
+def get_order_payload_error(data):
+    """
+    Check the fields each order type requires before running the serializers.
+    Returns an error message, or None when the payload can be processed.
+    """
+    order_type = data.get("order_type")
+    if order_type not in dict(Order.ORDER_TYPE_CHOICES):
+        return "Invalid order type."
+    if not isinstance(data.get("customer_data"), dict):
+        return "Customer Data is required for this order"
+    if order_type == "dine-in" and not "table_no" in data:
+        return "table no is required for this order."
+    if order_type == "home-delivery" and not data["customer_data"].get("address"):
+        return "customer address is required for this order."
+    return None
+
+
+def get_order_serializers(request, data):
+    order_serializer = OrderSerializer(data=data, context={"request": request})
+    customer_serializer = CustomerSerializer(data=data["customer_data"])
+    return order_serializer, customer_serializer
+
+
+def save_order(request, order_type, order_serializer, customer_serializer):
+    customer = customer_serializer.save(restaurant_id=request.user.restaurant)
+    order = order_serializer.save(
+        order_type=order_type,
+        customer_id=customer,
+        restaurant_id=request.user.restaurant,
+    )
+    record_orders([order])
+    return order
+
+
 class CreateOrderApiView(APIView):
     """
     Api to create order of type "dine-in","take-away" and "home-delivery".
@@ -90,222 +162,353 @@ class CreateOrderApiView(APIView):
         "session_id": "abcd1234"
     }
     ```
+
+    Retried submissions are answered from the stored response instead of
+    creating the order again. Send an `Idempotency-Key` header to make the
+    key explicit; otherwise an identical payload with the same `session_id`
+    is treated as a retry for `ORDER_IMPLICIT_IDEMPOTENCY_TIMEOUT` seconds.
     """
 
     permission_classes = [permissions.IsAuthenticated, IsRestaurant]
 
-    @transaction.atomic
-    def create_dine_in_order(self, request):
-        order_serializer = OrderSerializer(
-            data=request.data, context={"request": request}
+    def create_order(self, request, order_type):
+        order_serializer, customer_serializer = get_order_serializers(
+            request, request.data
         )
-        customer_serializer = CustomerSerializer(data=request.data["customer_data"])
-        if order_serializer.is_valid(
-            raise_exception=True
-        ) and customer_serializer.is_valid(raise_exception=True):
-            ordered_items = order_serializer.validated_data.get("order_items", [])
-            for item in ordered_items:
-                product = item.get("inventory_id")
-                quantity_ordered = item.get("quantity", 0)
-                try:
-                    inventory_item = Inventory.objects.get(id=product.id)
-                except Inventory.DoesNotExist:
-                    response_data = {
-                        "status": status.HTTP_400_BAD_REQUEST,
-                        "error": True,
-                        "detail": "",
-                        "message": f"Product {product} not found in inventory",
-                    }
-                    return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
-
-                if inventory_item.available_quantity < quantity_ordered:
-                    response_data = {
-                        "status": status.HTTP_400_BAD_REQUEST,
-                        "error": True,
-                        "detail": "",
-                        "message": f"Insufficient quantity for product {product}",
-                    }
-                    return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+        order_serializer.is_valid(raise_exception=True)
+        customer_serializer.is_valid(raise_exception=True)
 
-            customer = customer_serializer.save(restaurant_id=request.user.restaurant)
-            order = order_serializer.save(
-                order_type="dine-in",
-                customer_id=customer,
-                restaurant_id=request.user.restaurant,
-            )
-            for item in order.order_items.all():
-                print(item)
-                inventory_item = Inventory.objects.get(id=item.inventory_id.id)
-                inventory_item.available_quantity -= item.quantity
-                inventory_item.save()
+        ordered_items = order_serializer.validated_data.get("order_items", [])
+        quantities = collect_quantities(ordered_items)
+        try:
+            with transaction.atomic():
+                reserve_stock(
+                    quantities, order_serializer.validated_data.get("session_id")
+                )
+                save_order(request, order_type, order_serializer, customer_serializer)
+        except InsufficientStockError as exc:
             response_data = {
-                "status": status.HTTP_201_CREATED,
-                "error": False,
-                "detail": {
-                    "order": order_serializer.data,
-                    "customer": customer_serializer.data,
-                },
-                "message": "",
+                "status": status.HTTP_400_BAD_REQUEST,
+                "error": True,
+                "detail": exc.shortages,
+                "message": exc.message,
             }
-            return Response(response_data, status=status.HTTP_201_CREATED)
+            return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
 
-    @transaction.atomic
-    def create_take_away_order(self, request):
-        order_serializer = OrderSerializer(
-            data=request.data, context={"request": request}
-        )
-        customer_serializer = CustomerSerializer(data=request.data["customer_data"])
-        if order_serializer.is_valid(
-            raise_exception=True
-        ) and customer_serializer.is_valid(raise_exception=True):
-            ordered_items = order_serializer.validated_data.get("order_items", [])
-            for item in ordered_items:
-                product = item.get("inventory_id")
-                quantity_ordered = item.get("quantity", 0)
-                try:
-                    inventory_item = Inventory.objects.get(id=product.id)
-                except Inventory.DoesNotExist:
-                    response_data = {
-                        "status": status.HTTP_400_BAD_REQUEST,
-                        "error": True,
-                        "detail": "",
-                        "message": f"Product {product} not found in inventory",
-                    }
-                    return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
-
-                if inventory_item.available_quantity < quantity_ordered:
-                    response_data = {
-                        "status": status.HTTP_400_BAD_REQUEST,
-                        "error": True,
-                        "detail": "",
-                        "message": f"Insufficient quantity for product {product}",
-                    }
-                    return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+        response_data = {
+            "status": status.HTTP_201_CREATED,
+            "error": False,
+            "detail": {
+                "order": order_serializer.data,
+                "customer": customer_serializer.data,
+            },
+            "message": "",
+        }
+        return Response(response_data, status=status.HTTP_201_CREATED)
+
+    def post(self, request):
+        key, fingerprint, timeout = get_idempotency_key(request)
+        if key is None:
+            return self.submit_order(request)
+
+        stored = claim_key(key, fingerprint)
+        if stored is not None:
+            return self.replay_response(stored, fingerprint)
+        try:
+            response = self.submit_order(request)
+        except Exception:
+            release_key(key)
+            raise
+        store_response(key, fingerprint, response, timeout)
+        return response
 
-            customer = customer_serializer.save(restaurant_id=request.user.restaurant)
-            order = order_serializer.save(
-                order_type="take-away",
-                customer_id=customer,
-                restaurant_id=request.user.restaurant,
+    def replay_response(self, stored, fingerprint):
+        if stored["fingerprint"] != fingerprint:
+            response_data = {
+                "status": status.HTTP_422_UNPROCESSABLE_ENTITY,
+                "error": True,
+                "detail": "",
+                "message": "Idempotency key was already used for a different order.",
+            }
+            return Response(
+                response_data, status=status.HTTP_422_UNPROCESSABLE_ENTITY
             )
-            for item in order.order_items.all():
-                inventory_item = Inventory.objects.get(id=item.inventory_id.id)
-                inventory_item.available_quantity -= item.quantity
-                inventory_item.save()
+        if stored["state"] != DONE:
             response_data = {
-                "status": status.HTTP_201_CREATED,
-                "error": False,
-                "detail": {
-                    "order": order_serializer.data,
-                    "customer": customer_serializer.data,
-                },
-                "message": "",
+                "status": status.HTTP_409_CONFLICT,
+                "error": True,
+                "detail": "",
+                "message": "This order is already being processed.",
             }
-            return Response(response_data, status=status.HTTP_201_CREATED)
-
-    @transaction.atomic
-    def create_home_delivery_order(self, request):
-        order_serializer = OrderSerializer(
-            data=request.data, context={"request": request}
+            return Response(response_data, status=status.HTTP_409_CONFLICT)
+        return Response(
+            stored["data"],
+            status=stored["status"],
+            headers={"Idempotent-Replayed": "true"},
         )
-        customer_serializer = CustomerSerializer(data=request.data["customer_data"])
-        if order_serializer.is_valid(
-            raise_exception=True
-        ) and customer_serializer.is_valid(raise_exception=True):
-            ordered_items = order_serializer.validated_data.get("order_items", [])
-            for item in ordered_items:
-                product = item.get("inventory_id")
-                quantity_ordered = item.get("quantity", 0)
-                try:
-                    inventory_item = Inventory.objects.get(id=product.id)
-                except Inventory.DoesNotExist:
-                    response_data = {
-                        "status": status.HTTP_400_BAD_REQUEST,
-                        "error": True,
-                        "detail": "",
-                        "message": f"Product {product} not found in inventory",
-                    }
-                    return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
-
-                if inventory_item.available_quantity < quantity_ordered:
-                    response_data = {
-                        "status": status.HTTP_400_BAD_REQUEST,
-                        "error": True,
-                        "detail": "",
-                        "message": f"Insufficient quantity for product {product}",
+
+    def submit_order(self, request):
+        message = get_order_payload_error(request.data)
+        if message:
+            response_data = {
+                "status": status.HTTP_400_BAD_REQUEST,
+                "error": True,
+                "detail": "",
+                "message": message,
+            }
+            return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+        return self.create_order(request, request.data["order_type"])
+
+
+class BatchCreateOrderApiView(APIView):
+    """
+    Api to create several orders of any type in one request.
+
+    Every order in `orders` uses the same format as the create order api.
+    All orders are checked against one stock snapshot and written in a single
+    transaction. With `"atomic": true` (the default) nothing is written unless
+    every order succeeds; with `"atomic": false` the valid orders are created
+    and the others are reported as failed.
+    ```
+    {
+        "atomic": false,
+        "orders": [
+            {
+                "order_type": "take-away",
+                "order_items": [
+                    {
+                        "inventory_id": 14,
+                        "quantity": 2
                     }
-                    return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+                ],
+                "customer_data": {
+                    "name": "Ankit",
+                    "phone_number": "9898989898"
+                },
+                "session_id": "abcd1234"
+            }
+        ]
+    }
+    ```
+    """
 
-            customer = customer_serializer.save(restaurant_id=request.user.restaurant)
-            order = order_serializer.save(
-                order_type="take-away",
-                customer_id=customer,
-                restaurant_id=request.user.restaurant,
-            )
-            for item in order.order_items.all():
-                inventory_item = Inventory.objects.get(id=item.inventory_id.id)
-                inventory_item.available_quantity -= item.quantity
-                inventory_item.save()
+    permission_classes = [permissions.IsAuthenticated, IsRestaurant]
+
+    def post(self, request):
+        orders_data = request.data.get("orders")
+        atomic = request.data.get("atomic", True)
+        if not isinstance(orders_data, list) or not orders_data:
             response_data = {
-                "status": status.HTTP_201_CREATED,
+                "status": status.HTTP_400_BAD_REQUEST,
+                "error": True,
+                "detail": "",
+                "message": "orders must be a non-empty list.",
+            }
+            return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+
+        results = [None] * len(orders_data)
+        pending = []
+        for index, order_data in enumerate(orders_data):
+            if not isinstance(order_data, dict):
+                results[index] = self.failure(index, "Invalid order data.")
+                continue
+            message = get_order_payload_error(order_data)
+            if message:
+                results[index] = self.failure(index, message)
+                continue
+            order_serializer, customer_serializer = get_order_serializers(
+                request, order_data
+            )
+            order_valid = order_serializer.is_valid()
+            customer_valid = customer_serializer.is_valid()
+            if not (order_valid and customer_valid):
+                errors = {**order_serializer.errors}
+                if customer_serializer.errors:
+                    errors["customer_data"] = customer_serializer.errors
+                results[index] = self.failure(index, "Validation error", errors)
+                continue
+            ordered_items = order_serializer.validated_data.get("order_items", [])
+            pending.append(
+                (
+                    index,
+                    order_data["order_type"],
+                    order_serializer,
+                    customer_serializer,
+                    collect_quantities(ordered_items),
+                )
+            )
+
+        if atomic and len(pending) != len(orders_data):
+            return self.batch_response(results, created=0)
+
+        try:
+            with transaction.atomic():
+                ordered = merge_quantities(*[p[4] for p in pending])
+                stock = lock_stock(ordered)
+                # What the accepted orders take, decremented at the end.
+                taken = {}
+                accepted = []
+                for index, order_type, order_ser, customer_ser, quantities in pending:
+                    savepoint = transaction.savepoint()
+                    session_id = order_ser.validated_data.get("session_id")
+                    quantities = consume_reservations(session_id, quantities)
+                    if session_id:
+                        # Reserved stock the order does not need went back
+                        # to the free stock, so the snapshot is read again.
+                        stock = lock_stock(ordered)
+                        for inventory_id, quantity in taken.items():
+                            stock[inventory_id].available_quantity -= quantity
+                    shortages = find_shortages(quantities, stock)
+                    if shortages:
+                        transaction.savepoint_rollback(savepoint)
+                        error = InsufficientStockError(shortages)
+                        results[index] = self.failure(
+                            index, error.message, error.shortages
+                        )
+                        continue
+                    transaction.savepoint_commit(savepoint)
+                    # Later orders in the batch see the stock left by the
+                    # earlier ones.
+                    for inventory_id, quantity in quantities.items():
+                        stock[inventory_id].available_quantity -= quantity
+                        taken[inventory_id] = taken.get(inventory_id, 0) + quantity
+                    accepted.append(
+                        (index, order_type, order_ser, customer_ser, quantities)
+                    )
+
+                if atomic and len(accepted) != len(pending):
+                    # Undo the reservations the accepted orders consumed.
+                    transaction.set_rollback(True)
+                    return self.batch_response(results, created=0)
+
+                decrement_stock(
+                    merge_quantities(*[a[4] for a in accepted]), sharded_ids(stock)
+                )
+                for index, order_type, order_ser, customer_ser, _ in accepted:
+                    save_order(request, order_type, order_ser, customer_ser)
+        except InsufficientStockError as exc:
+            for index, *_ in pending:
+                results[index] = self.failure(index, exc.message, exc.shortages)
+            return self.batch_response(results, created=0)
+
+        for index, order_type, order_ser, customer_ser, _ in accepted:
+            results[index] = {
+                "index": index,
                 "error": False,
                 "detail": {
-                    "order": order_serializer.data,
-                    "customer": customer_serializer.data,
+                    "order": order_ser.data,
+                    "customer": customer_ser.data,
                 },
                 "message": "",
             }
-            return Response(response_data, status=status.HTTP_201_CREATED)
+        return self.batch_response(results, created=len(accepted))
+
+    def failure(self, index, message, detail=""):
+        return {"index": index, "error": True, "detail": detail, "message": message}
+
+    def batch_response(self, results, created):
+        results = [
+            result
+            or self.failure(
+                index, "Not created because another order in the batch failed."
+            )
+            for index, result in enumerate(results)
+        ]
+        if created == len(results):
+            response_status = status.HTTP_201_CREATED
+        elif created:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+        response_data = {
+            "status": response_status,
+            "error": created != len(results),
+            "detail": results,
+            "message": f"{created} of {len(results)} orders created.",
+        }
+        return Response(response_data, status=response_status)
+
+
+class ReserveStockApiView(APIView):
+    """
+    Api to hold stock for a cart while the customer is still ordering.
+
+    The reservation expires after `STOCK_RESERVATION_TIMEOUT` seconds. An order
+    created with the same `session_id` uses the reserved stock first.
+    ```
+    {
+        "session_id": "abcd1234",
+        "inventory_id": 14,
+        "quantity": 2
+    }
+    ```
+    `DELETE` with `?session_id=abcd1234` releases everything the cart holds.
+    """
+
+    permission_classes = [permissions.IsAuthenticated, IsRestaurant]
 
     def post(self, request):
-        if request.data.get("order_type") == "dine-in":
-            if not "customer_data" in request.data:
-                response_data = {
-                    "status": status.HTTP_400_BAD_REQUEST,
-                    "error": True,
-                    "detail": "",
-                    "message": "Customer Data is required for this order",
-                }
-                return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
-            if not "table_no" in request.data:
-                response_data = {
-                    "status": status.HTTP_400_BAD_REQUEST,
-                    "error": True,
-                    "detail": "",
-                    "message": "table no is required for this order.",
-                }
-                return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
-            return self.create_dine_in_order(request)
-
-        if request.data.get("order_type") == "take-away":
-            if not "customer_data" in request.data:
-                response_data = {
-                    "status": status.HTTP_400_BAD_REQUEST,
-                    "error": True,
-                    "detail": "",
-                    "message": "Customer Data is required for this order",
-                }
-                return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
-            return self.create_take_away_order(request)
-
-        if request.data.get("order_type") == "home-delivery":
-            if not "customer_data" in request.data:
-                response_data = {
-                    "status": status.HTTP_400_BAD_REQUEST,
-                    "error": True,
-                    "detail": "",
-                    "message": "Customer Data is required for this order",
-                }
-                return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
-            if not request.data["customer_data"].get("address"):
-                response_data = {
-                    "status": status.HTTP_400_BAD_REQUEST,
-                    "error": True,
-                    "detail": "",
-                    "message": "customer address is required for this order.",
-                }
-                return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
-            return self.create_home_delivery_order(request)
+        serializer = StockReservationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        inventory_id = serializer.validated_data["inventory_id"]
+        if not Inventory.objects.filter(
+            id=inventory_id, restaurant=request.user.restaurant
+        ).exists():
+            response_data = {
+                "status": status.HTTP_404_NOT_FOUND,
+                "error": True,
+                "detail": "",
+                "message": "inventory not found",
+            }
+            return Response(response_data, status=status.HTTP_404_NOT_FOUND)
+
+        reservation = reserve(
+            serializer.validated_data["session_id"],
+            inventory_id,
+            serializer.validated_data["quantity"],
+        )
+        if reservation is None:
+            response_data = {
+                "status": status.HTTP_400_BAD_REQUEST,
+                "error": True,
+                "detail": "",
+                "message": f"Insufficient quantity for product {inventory_id}",
+            }
+            return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+        response_data = {
+            "status": status.HTTP_201_CREATED,
+            "error": False,
+            "detail": StockReservationSerializer(reservation).data,
+            "message": "",
+        }
+        return Response(response_data, status=status.HTTP_201_CREATED)
+
+    def delete(self, request):
+        session_id = request.query_params.get("session_id")
+        if not session_id:
+            response_data = {
+                "status": status.HTTP_400_BAD_REQUEST,
+                "error": True,
+                "detail": "",
+                "message": "session_id is required.",
+            }
+            return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+        released = release_reservations(
+            StockReservation.objects.filter(
+                session_id=session_id,
+                inventory__restaurant=request.user.restaurant,
+            )
+        )
+        response_data = {
+            "status": status.HTTP_200_OK,
+            "error": False,
+            "detail": [
+                {"inventory_id": inventory_id, "quantity": quantity}
+                for inventory_id, quantity in released.items()
+            ],
+            "message": "",
+        }
+        return Response(response_data, status=status.HTTP_200_OK)
 
 
 class ListOrderApiView(APIView):
@@ -313,7 +516,17 @@ class ListOrderApiView(APIView):
     A view to list orders based on specified filters for a restaurant.
 
     URL Structure:
-    http://127.0.0.1:8000/api/order/list/?order_type=take-away&search=9636978524&order_status=pending&payment_status=paid&page=1&page_size=5&sort_by=created_at&sort_order=asc&time_filter=yesterday
+    http://127.0.0.1:8000/api/order/list/?order_type=take-away&search=9636978524&order_status=pending&payment_status=paid&page_size=5&sort_by=created_at&sort_order=asc&time_filter=yesterday
+
+    Pages are cursor based: pass `pagination_info.next_cursor` (or
+    `previous_cursor`) back as `cursor` to move between pages. Add
+    `include_total=true` to also get `total_items` and `total_pages`.
+    `page` numbers are deprecated but still answered, with `total_pages`
+    and `current_page` as before.
+
+    `from` and `to` (ISO date or datetime) limit the orders to a creation
+    window; a date as `to` includes that whole day. Archived orders are
+    read from the archive when sorted by creation time without a search.
     """
 
     permission_classes = [permissions.IsAuthenticated, IsRestaurant]
@@ -324,9 +537,6 @@ class ListOrderApiView(APIView):
         order_status = request.query_params.get("order_status")
         payment_status = request.query_params.get("payment_status")
         search_query = request.query_params.get("search")
-        page_number = request.query_params.get("page", 1)
-        page_size = request.query_params.get("page_size", 10)
-        time_filter = request.query_params.get("time_filter")
         sort_by = request.query_params.get("sort_by")
         sort_order = request.query_params.get("sort_order")
 
@@ -338,17 +548,14 @@ class ListOrderApiView(APIView):
             filters["order_status"] = order_status
         if payment_status:
             filters["payment_status"] = payment_status
-        queryset = Order.objects.filter(restaurant_id=restaurant)
+        queryset = OrderOutputSerializer.setup_eager_loading(
+            Order.objects.filter(restaurant_id=restaurant)
+        )
 
         try:
-            if time_filter == "recent":
-                today = timezone.now().date()
-                orders = queryset.filter(created_at__date=today, **filters)
-            elif time_filter == "yesterday":
-                yesterday = timezone.now().date() - timedelta(days=1)
-                orders = queryset.filter(created_at__date=yesterday, **filters)
-            else:
-                orders = queryset.filter(**filters)
+            start, end = get_created_range(request.query_params)
+            orders = filter_created_range(queryset.filter(**filters), start, end)
+            ordering = DEFAULT_ORDERING
             if sort_by in [
                 "id",
                 "table_no",
@@ -357,31 +564,34 @@ class ListOrderApiView(APIView):
                 "created_at",
             ]:
                 if sort_order == "asc":
-                    orders = orders.order_by(sort_by)
+                    ordering = (sort_by, "id")
                 elif sort_order == "desc":
-                    orders = orders.order_by(f"-{sort_by}")
+                    ordering = (f"-{sort_by}", "-id")
+            continuation = None
             if search_query:
-                orders = orders.filter(
-                    Q(id__icontains=search_query)
-                    | Q(table_no__tablenumber__icontains=search_query)
-                    | Q(customer_id__phone_number__icontains=search_query)
-                    | Q(order_status__icontains=search_query)
-                    | Q(created_at__icontains=search_query)
-                )
-            paginator = Paginator(orders, page_size)
-            paginated_orders = paginator.page(page_number)
-            order_serializer = OrderOutputSerializer(paginated_orders, many=True)
+                orders = search_orders(orders, restaurant, search_query)
+            elif needs_archive(restaurant, start) and ordering in (
+                DEFAULT_ORDERING,
+                ("created_at", "id"),
+            ):
+                # Archived orders are all older than the live ones.
+                continuation = archived_orders(restaurant, filters, start, end)
+                if ordering != DEFAULT_ORDERING:
+                    orders, continuation = continuation, orders
+            paginated_orders, pagination_info = paginate_queryset(
+                request,
+                orders,
+                ordering=ordering,
+                default_page_size=10,
+                continuation=continuation,
+            )
+            order_data = serialize_orders(paginated_orders)
             response_data = {
                 "status": status.HTTP_200_OK,
                 "error": False,
-                "detail": order_serializer.data,
-                "message": f"{len(order_serializer.data)} order found.",
-                "pagination_info": {
-                    "total_pages": paginator.num_pages,
-                    "current_page": paginated_orders.number,
-                    "total_items": paginator.count,
-                    "page_size": paginator.per_page,
-                },
+                "detail": order_data,
+                "message": f"{len(order_data)} order found.",
+                "pagination_info": pagination_info,
             }
             return Response(response_data, status=status.HTTP_200_OK)
         except Order.DoesNotExist:
@@ -400,3 +610,178 @@ class ListOrderApiView(APIView):
                 "message": f"{str(e)}",
             }
             return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+
+
+class OrderAnalyticsApiView(APIView):
+    """
+    Sales figures of the restaurant, answered from the daily rollups.
+
+    URL Structure:
+    http://127.0.0.1:8000/api/order/analytics/?from=2024-01-01&to=2024-01-31&top_items=5
+
+    `from` and `to` are dates and both included; by default the last 30 days.
+    `top_items` limits the best selling items (default 10).
+    """
+
+    permission_classes = [permissions.IsAuthenticated, IsRestaurant]
+
+    def get(self, request):
+        try:
+            end = (
+                parse_date(request.query_params.get("to") or "")
+                or timezone.localdate()
+            )
+            start = parse_date(request.query_params.get("from") or "") or (
+                end - timedelta(days=29)
+            )
+            top_items = min(max(int(request.query_params.get("top_items", 10)), 1), 100)
+        except ValueError:
+            response_data = {
+                "status": status.HTTP_400_BAD_REQUEST,
+                "error": True,
+                "detail": "",
+                "message": "Invalid 'from', 'to' or 'top_items' value.",
+            }
+            return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+        if start > end:
+            response_data = {
+                "status": status.HTTP_400_BAD_REQUEST,
+                "error": True,
+                "detail": "",
+                "message": "'from' must not be after 'to'.",
+            }
+            return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+
+        response_data = {
+            "status": status.HTTP_200_OK,
+            "error": False,
+            "detail": SalesSummarySerializer(
+                sales_summary(request.user.restaurant, start, end, top_items)
+            ).data,
+            "message": "Sales analytics fetched successfully.",
+        }
+        return Response(response_data, status=status.HTTP_200_OK)
+
+
+class OrderStatusTransitionApiView(APIView):
+    """
+    Api for kitchen staff and the restaurant to move several orders to a new
+    status at once.
+
+    Allowed transitions: pending to confirmed or cancelled, confirmed to
+    delivered or cancelled. Orders that cannot make the transition are
+    reported and left unchanged.
+    ```
+    {
+        "order_ids": [12, 13, 14],
+        "order_status": "delivered"
+    }
+    ```
+    """
+
+    permission_classes = [permissions.IsAuthenticated, IsKitchenStaff | IsRestaurant]
+
+    def post(self, request):
+        serializer = OrderStatusTransitionSerializer(data=request.data)
+        if not serializer.is_valid():
+            response_data = {
+                "status": status.HTTP_400_BAD_REQUEST,
+                "error": True,
+                "detail": serializer.errors,
+                "message": "Invalid data.",
+            }
+            return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+        restaurant = request.user.restaurant
+        if restaurant is None:
+            response_data = {
+                "status": status.HTTP_403_FORBIDDEN,
+                "error": True,
+                "detail": "",
+                "message": "User is not linked to a restaurant.",
+            }
+            return Response(response_data, status=status.HTTP_403_FORBIDDEN)
+
+        target = serializer.validated_data["order_status"]
+        updated, rejected = transition_orders(
+            restaurant, serializer.validated_data["order_ids"], target
+        )
+        if not rejected:
+            response_status = status.HTTP_200_OK
+        elif updated:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+        response_data = {
+            "status": response_status,
+            "error": bool(rejected),
+            "detail": {"updated": updated, "rejected": rejected},
+            "message": f"{len(updated)} orders changed to {target}.",
+        }
+        return Response(response_data, status=response_status)
+
+
+class ExportOrderApiView(APIView):
+    """
+    Stream the restaurant's orders with their line items as a file.
+
+    URL Structure:
+    http://127.0.0.1:8000/api/order/export/?export_format=ndjson&from=2024-01-01&to=2024-01-31&order_status=delivered
+
+    `export_format` is `csv` (default, one row per line item) or `ndjson`
+    (one JSON document per order). Accepts the filters of the order list:
+    `order_type`, `order_status`, `payment_status`, `time_filter`, `from`
+    and `to`. Archived orders are included when the range reaches back to
+    them.
+    """
+
+    permission_classes = [permissions.IsAuthenticated, IsRestaurant]
+    formats = {
+        "csv": ("text/csv", stream_csv),
+        "ndjson": ("application/x-ndjson", stream_ndjson),
+    }
+
+    def get(self, request):
+        export_format = request.query_params.get("export_format", "csv")
+        if export_format not in self.formats:
+            response_data = {
+                "status": status.HTTP_400_BAD_REQUEST,
+                "error": True,
+                "detail": "",
+                "message": "export_format must be csv or ndjson.",
+            }
+            return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            start, end = get_created_range(request.query_params)
+        except ValueError as e:
+            response_data = {
+                "status": status.HTTP_400_BAD_REQUEST,
+                "error": True,
+                "detail": "",
+                "message": f"{str(e)}",
+            }
+            return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+
+        filters = {
+            field: request.query_params[field]
+            for field in ("order_type", "order_status", "payment_status")
+            if request.query_params.get(field)
+        }
+        restaurant = request.user.restaurant
+        rows = export_rows(
+            filter_created_range(
+                Order.objects.filter(restaurant_id=restaurant, **filters), start, end
+            )
+        )
+        if needs_archive(restaurant, start):
+            # Archived orders are all older than the live ones.
+            rows = chain(
+                archived_export_rows(
+                    archived_orders(restaurant, filters, start, end)
+                ),
+                rows,
+            )
+        content_type, stream = self.formats[export_format]
+        response = StreamingHttpResponse(stream(rows), content_type=content_type)
+        filename = f"orders-{timezone.localdate().isoformat()}.{export_format}"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
@@ -0,0 +1,59 @@
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, PositiveIntegerField, Value, When
+from django.utils import timezone
+from restaurant.models import Inventory
+from .menu_cache import menu_changed
+from .stock import set_sharded_stock, sharded_stock
+
+BULK_UPDATE_FIELDS = {
+    "available_quantity": PositiveIntegerField(),
+    "total_quantity": PositiveIntegerField(),
+    "unit_price": DecimalField(max_digits=5, decimal_places=2),
+}
+
+
+@transaction.atomic
+def update_inventory(restaurant, changes):
+    """
+    Apply ``[{"id": ..., <field>: <value>, ...}]`` to the restaurant's items
+    with a single CASE based UPDATE.
+
+    Returns ``(updated, missing)``: the number of items changed and the ids
+    that are not items of the restaurant.  The UPDATE skips the model
+    signals, so sharded stock and the menu version are updated here.
+    """
+    changes = {change["id"]: change for change in changes}
+    values = {}
+    for field, output_field in BULK_UPDATE_FIELDS.items():
+        whens = [
+            When(id=inventory_id, then=Value(change[field], output_field=output_field))
+            for inventory_id, change in changes.items()
+            if field in change
+        ]
+        if whens:
+            values[field] = Case(*whens, default=F(field), output_field=output_field)
+    updated = Inventory.objects.filter(restaurant=restaurant, id__in=changes).update(
+        updated_at=timezone.now(), **values
+    )
+
+    missing = []
+    if updated != len(changes):
+        found = set(
+            Inventory.objects.filter(
+                restaurant=restaurant, id__in=changes
+            ).values_list("id", flat=True)
+        )
+        missing = [
+            inventory_id for inventory_id in changes if inventory_id not in found
+        ]
+
+    restocked = [
+        inventory_id
+        for inventory_id, change in changes.items()
+        if "available_quantity" in change and inventory_id not in missing
+    ]
+    for inventory_id in sharded_stock(restocked):
+        set_sharded_stock(inventory_id, changes[inventory_id]["available_quantity"])
+    if updated:
+        menu_changed(restaurant.id)
+    return updated, missing
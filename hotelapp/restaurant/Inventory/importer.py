@@ -0,0 +1,226 @@
+"""
+Bulk import of a restaurant's inventory from a CSV file.
+
+The file has a header row; ``name``, ``menu_type``, ``menu_subtype``,
+``unit_category``, ``unit_price``, ``total_quantity`` and
+``available_quantity`` are required, ``description``, ``video_link``,
+``item_image`` (a stored file name) and ``item_categorytype`` optional.
+Items are matched by name: known ones are updated, the others created.  Menu
+types and subtypes are matched by name too and created when missing, units by
+name or abbreviation.
+"""
+
+import csv
+import io
+
+from django.db import transaction
+from hotelapp.images import schedule_derivatives
+from rest_framework import serializers
+from restaurant.models import Inventory, Menu_Subtype, MenuTypes, UnitCategory
+from .menu_cache import bump_menu_version, menu_changed
+from .stock import set_sharded_stock, sharded_stock
+
+IMPORT_BATCH_SIZE = 500
+
+OPTIONAL_FIELDS = ["description", "video_link", "item_image", "item_categorytype"]
+UPDATE_FIELDS = [
+    "menu_type",
+    "menu_subtype",
+    "unit_category",
+    "unit_price",
+    "total_quantity",
+    "available_quantity",
+] + OPTIONAL_FIELDS
+
+
+class InventoryImportRowSerializer(serializers.Serializer):
+    name = serializers.CharField(max_length=20)
+    menu_type = serializers.CharField(max_length=20)
+    menu_subtype = serializers.CharField(max_length=20)
+    unit_category = serializers.CharField(max_length=20)
+    unit_price = serializers.DecimalField(decimal_places=2, max_digits=5)
+    total_quantity = serializers.IntegerField(min_value=0)
+    available_quantity = serializers.IntegerField(min_value=0)
+    description = serializers.CharField(max_length=200, required=False)
+    video_link = serializers.URLField(required=False)
+    item_image = serializers.CharField(max_length=200, required=False)
+    item_categorytype = serializers.ChoiceField(
+        choices=Inventory.CATEGORY, required=False
+    )
+
+
+class InventoryImporter:
+    """
+    Imports rows for one restaurant, batch by batch.  Menu types, subtypes,
+    units and existing items are looked up in maps loaded once; the types,
+    subtypes and units created on the way are added to them.
+    """
+
+    def __init__(self, restaurant, batch_size=IMPORT_BATCH_SIZE):
+        self.restaurant = restaurant
+        self.batch_size = batch_size
+        self.created = 0
+        self.updated = 0
+        self.errors = []
+        self.menu_types = {
+            menu_type.name: menu_type
+            for menu_type in MenuTypes.objects.filter(restaurant=restaurant)
+        }
+        self.subtypes = {
+            (subtype.menutype_id, subtype.name): subtype
+            for subtype in Menu_Subtype.objects.filter(menutype__restaurant=restaurant)
+        }
+        units = list(UnitCategory.objects.all())
+        self.units = {unit.abbreviation: unit for unit in units}
+        self.units.update({unit.name: unit for unit in units})
+        self.inventory = {}
+        for inventory in Inventory.objects.filter(restaurant=restaurant).order_by(
+            "-id"
+        ):
+            # The oldest item wins when names are duplicated.
+            self.inventory[inventory.name] = inventory
+        self.seen = set()
+
+    def run(self, rows):
+        """
+        Import ``(line number, row dict)`` pairs.  Returns a report with the
+        counts and the errors of the rows that were not imported.
+
+        Batches are committed as they go, so the menu is invalidated however
+        far the import got.
+        """
+        batch = []
+        try:
+            for line, row in self.readable(rows):
+                batch.append((line, row))
+                if len(batch) >= self.batch_size:
+                    self.import_batch(batch)
+                    batch = []
+            if batch:
+                self.import_batch(batch)
+        finally:
+            menu_changed(self.restaurant.id)
+        return {"created": self.created, "updated": self.updated, "errors": self.errors}
+
+    def readable(self, rows):
+        """
+        Yield the rows up to where the file stops being valid UTF-8 or CSV,
+        and report an error for the row after the last one read.
+        """
+        line = 1
+        try:
+            for line, row in rows:
+                yield line, row
+        except (UnicodeDecodeError, csv.Error):
+            self.errors.append(
+                {
+                    "row": line + 1,
+                    "errors": {"file": ["The file must be a UTF-8 encoded CSV file."]},
+                }
+            )
+
+    def validate(self, line, row):
+        data = {
+            field: value.strip()
+            for field, value in row.items()
+            if field and value and value.strip()
+        }
+        serializer = InventoryImportRowSerializer(data=data)
+        if not serializer.is_valid():
+            self.errors.append({"row": line, "errors": serializer.errors})
+            return None
+        values = serializer.validated_data
+        if values["name"] in self.seen:
+            self.errors.append(
+                {"row": line, "errors": {"name": ["Item is listed more than once."]}}
+            )
+            return None
+        unit = self.get_unit(values["unit_category"])
+        if unit is None:
+            self.errors.append(
+                {"row": line, "errors": {"unit_category": ["Unknown unit."]}}
+            )
+            return None
+        self.seen.add(values["name"])
+        values["unit_category"] = unit
+        values["menu_type"] = self.get_menu_type(values["menu_type"])
+        values["menu_subtype"] = self.get_subtype(
+            values["menu_type"], values["menu_subtype"]
+        )
+        return values
+
+    def get_unit(self, name):
+        unit = self.units.get(name)
+        if unit is None and name in dict(UnitCategory.UNIT_CHOICES):
+            unit, _ = UnitCategory.objects.get_or_create(
+                name=name, defaults={"abbreviation": name}
+            )
+            self.units[name] = unit
+        return unit
+
+    def get_menu_type(self, name):
+        menu_type = self.menu_types.get(name)
+        if menu_type is None:
+            menu_type = MenuTypes.objects.create(name=name, restaurant=self.restaurant)
+            self.menu_types[name] = menu_type
+        return menu_type
+
+    def get_subtype(self, menu_type, name):
+        subtype = self.subtypes.get((menu_type.id, name))
+        if subtype is None:
+            subtype = Menu_Subtype.objects.create(name=name, menutype=menu_type)
+            self.subtypes[(menu_type.id, name)] = subtype
+        return subtype
+
+    @transaction.atomic
+    def import_batch(self, batch):
+        new, changed, images = [], [], {}
+        for line, row in batch:
+            values = self.validate(line, row)
+            if values is None:
+                continue
+            inventory = self.inventory.get(values["name"])
+            if inventory is None:
+                inventory = Inventory(
+                    restaurant=self.restaurant,
+                    description="",
+                    video_link="",
+                    item_image="",
+                )
+                new.append(inventory)
+            else:
+                changed.append(inventory)
+            for field, value in values.items():
+                setattr(inventory, field, value)
+            if "item_image" in values:
+                images[values["item_image"]] = inventory.item_image
+
+        Inventory.objects.bulk_create(new)
+        Inventory.objects.bulk_update(changed, UPDATE_FIELDS)
+        changed = {inventory.id: inventory for inventory in changed}
+        for inventory_id in sharded_stock(list(changed)):
+            set_sharded_stock(inventory_id, changed[inventory_id].available_quantity)
+        self.created += len(new)
+        self.updated += len(changed)
+
+        # Bulk writes skip the post_save signal that resizes uploaded images.
+        restaurant_id = self.restaurant.id
+        for image in images.values():
+            schedule_derivatives(
+                image, on_done=lambda: bump_menu_version(restaurant_id)
+            )
+
+
+def read_csv(file):
+    """
+    Iterate ``(line number, row dict)`` over an uploaded or opened binary
+    CSV file without reading it into memory.
+    """
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    reader = csv.DictReader(text)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def import_inventory(restaurant, file, batch_size=IMPORT_BATCH_SIZE):
+    return InventoryImporter(restaurant, batch_size).run(read_csv(file))
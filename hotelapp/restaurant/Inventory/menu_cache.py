@@ -0,0 +1,88 @@
+"""
+Versioned cache of the menu snapshots served to diners scanning a table QR.
+
+Every restaurant has a menu version, the time of its last change.  Menu
+snapshots (see ``snapshot``) are cached under it, so changing anything on the
+menu only has to bump the version: ``restaurant.signals`` does so on saves
+and deletes of inventory, menu types, subtypes and units.  The version also
+gives the ETag and Last-Modified of the response.
+
+Stock moves with every order, so the stock helpers only bump the version
+when an item runs out or comes back in stock (see
+``Inventory.stock.stock_changed``); in between, the available quantities of
+a cached menu may be behind.
+"""
+
+import math
+import time
+
+from django.core.cache import caches
+from django.db import transaction
+
+VERSION_KEY = "menu:{}:version"
+
+
+def _cache():
+    return caches["menu"]
+
+
+def get_menu_version(restaurant_id):
+    cache = _cache()
+    key = VERSION_KEY.format(restaurant_id)
+    version = cache.get(key)
+    if version is None:
+        # Unknown or evicted: start a new version, older entries are ignored.
+        cache.add(key, time.time(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_menu_version(restaurant_id):
+    cache = _cache()
+    key = VERSION_KEY.format(restaurant_id)
+    previous = cache.get(key)
+    cache.set(key, time.time(), timeout=None)
+    if previous is not None:
+        # Never served again; do not leave it to the timeout.
+        cache.delete(snapshot_key(restaurant_id, previous))
+
+
+def menu_changed(restaurant_id):
+    """
+    Invalidate the cached menus of a restaurant once the current transaction
+    commits, so no request can cache the old rows under the new version.
+    """
+    if restaurant_id is not None:
+        transaction.on_commit(lambda: bump_menu_version(restaurant_id))
+
+
+def menu_validators(restaurant_id, version):
+    """
+    Return the ``(etag, last_modified)`` of a menu version.
+
+    Last-Modified has whole seconds and cannot tell apart changes within the
+    same second, so requests are only validated by the ETag.  It is rounded
+    up, never claiming the menu is older than its last change.
+    """
+    return f'"menu-{restaurant_id}-{int(version * 1000000)}"', math.ceil(version)
+
+
+def snapshot_key(restaurant_id, version):
+    return f"menu:{restaurant_id}:{int(version * 1000000)}:snapshot"
+
+
+def get_cached_snapshot(restaurant_id, version):
+    return _cache().get(snapshot_key(restaurant_id, version))
+
+
+def set_cached_snapshot(restaurant_id, version, snapshot):
+    _cache().set(snapshot_key(restaurant_id, version), snapshot)
+
+
+def shown_sold_out(restaurant_id):
+    """
+    The ids of the items the cached menu of a restaurant shows as sold out,
+    or None when no menu is cached.
+    """
+    snapshot = get_cached_snapshot(restaurant_id, get_menu_version(restaurant_id))
+    return None if snapshot is None else snapshot.sold_out
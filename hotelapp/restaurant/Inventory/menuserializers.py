@@ -13,4 +13,21 @@ class MenuSubTypeSerializer(serializers.ModelSerializer):
     menutype = MenuTypeSerializer(many=False, required=False, )
     class Meta:
         model = Menu_Subtype
-        fields = "__all__"
\ No newline at end of file
+        fields = "__all__"
+
+
+class MenuTreeSubtypeSerializer(serializers.ModelSerializer):
+    item_count = serializers.IntegerField()
+
+    class Meta:
+        model = Menu_Subtype
+        fields = ["id", "name", "item_count"]
+
+
+class MenuTreeSerializer(serializers.ModelSerializer):
+    item_count = serializers.IntegerField()
+    subtypes = MenuTreeSubtypeSerializer(many=True, source="tree_subtypes")
+
+    class Meta:
+        model = MenuTypes
+        fields = ["id", "name", "item_count", "subtypes"]
@@ -4,7 +4,12 @@ from rest_framework.views import APIView
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework import authentication, permissions
-from .menuserializers import MenuTypeSerializer, MenuSubTypeSerializer
+from django.db.models import Count, Prefetch
+from .menuserializers import (
+    MenuTypeSerializer,
+    MenuSubTypeSerializer,
+    MenuTreeSerializer,
+)
 from restaurant.models import MenuTypes, Menu_Subtype
 from restaurant.permissions import IsSuperAdmin
 from rest_framework.permissions import IsAuthenticated
@@ -21,7 +26,7 @@ class MenuTypeListApiView(APIView):
         try:
             #print("Request>>>", self.request.user.restaurant.id)
             menu_type_objects = MenuTypes.objects.filter(restaurant=self.request.user.restaurant.id)
-            menu_type_data = [MenuTypeSerializer(menu_type).data for menu_type in menu_type_objects]    
+            menu_type_data = MenuTypeSerializer(menu_type_objects, many=True).data
             
             resObj = {'status':status.HTTP_200_OK,'message':'', 'detail':menu_type_data, 'error':False}
             return Response(resObj, status=status.HTTP_200_OK)
@@ -38,10 +43,41 @@ class MenuSubTypeListApiView(APIView):
         Return a list of all users.
         """ 
         try:
-            menusub_type_objects = Menu_Subtype.objects.filter(menutype=menutype_id)
-            menusub_type_data = [MenuSubTypeSerializer(menu_type).data for menu_type in menusub_type_objects]    
+            menusub_type_objects = Menu_Subtype.objects.filter(
+                menutype=menutype_id
+            ).select_related("menutype")
+            menusub_type_data = MenuSubTypeSerializer(menusub_type_objects, many=True).data
             resObj = {'status':status.HTTP_200_OK,'message':'', 'detail':menusub_type_data, 'error':False}
             return Response(resObj, status=status.HTTP_200_OK)
         except MenuTypes.DoesNotExist:
             resObj = {'status':status.HTTP_200_OK,'message':'Menu sub type not exists.', 'detail':[], 'error':False}
             return Response(resObj, status=status.HTTP_200_OK)
+
+
+class MenuTreeApiView(APIView):
+    """
+    Api to get the whole menu of the restaurant in one call: the menu types
+    with their subtypes, each with the number of inventory items in it.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        subtypes = Menu_Subtype.objects.annotate(
+            item_count=Count("menu_subtypes")
+        ).order_by("id")
+        menu_types = (
+            MenuTypes.objects.filter(restaurant=request.user.restaurant_id)
+            .annotate(item_count=Count("menu_types"))
+            .prefetch_related(
+                Prefetch("menusubtypes", queryset=subtypes, to_attr="tree_subtypes")
+            )
+            .order_by("id")
+        )
+        response_data = {
+            "status": status.HTTP_200_OK,
+            "error": False,
+            "detail": MenuTreeSerializer(menu_types, many=True).data,
+            "message": "",
+        }
+        return Response(response_data, status=status.HTTP_200_OK)
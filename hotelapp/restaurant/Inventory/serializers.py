@@ -1,5 +1,7 @@
 from rest_framework import serializers
+from hotelapp.images import derivative_urls
 from restaurant.models import Inventory
+from .stock import set_sharded_stock
 
 
 class InventoryInputSerializer(serializers.Serializer):
@@ -31,6 +33,8 @@ class InventoryInputSerializer(serializers.Serializer):
             "item_categorytype", instance.item_categorytype
         )
         instance.save()
+        if "available_quantity" in validated_data:
+            set_sharded_stock(instance.id, instance.available_quantity)
         return instance
 
 
@@ -38,8 +42,33 @@ class InventoryOutputSerializer(serializers.ModelSerializer):
     unit_category = serializers.StringRelatedField()
     menu_subtype = serializers.StringRelatedField()
     menu_type = serializers.StringRelatedField()
+    item_image_derivatives = serializers.SerializerMethodField()
 
     class Meta:
         model = Inventory
         fields = "__all__"
 
+    def get_item_image_derivatives(self, obj):
+        return derivative_urls(obj.item_image, self.context.get("request"))
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Sharded items keep their live stock in slots, see annotate_available_stock.
+        slot_quantity = getattr(instance, "slot_quantity", None)
+        if slot_quantity is not None:
+            data["available_quantity"] = slot_quantity
+        return data
+
+
+class InventoryBulkUpdateSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    available_quantity = serializers.IntegerField(min_value=0, required=False)
+    total_quantity = serializers.IntegerField(min_value=0, required=False)
+    unit_price = serializers.DecimalField(
+        decimal_places=2, max_digits=5, min_value=0, required=False
+    )
+
+    def validate(self, data):
+        if len(data) == 1:
+            raise serializers.ValidationError("Nothing to update.")
+        return data
@@ -0,0 +1,134 @@
+"""
+Pre-encoded menu snapshots.
+
+A snapshot holds a restaurant's whole menu as the JSON array the inventory
+lists return, newest items first like the live queries, together with the
+byte ranges of every menu type and subtype in it, by name and by id.
+Filtered lists are cut from those ranges, so a request only joins bytes.
+
+Image urls are absolute and depend on the request's host; the snapshot
+carries ``ORIGIN`` in their place, replaced when it is served.
+"""
+
+from urllib.parse import urlsplit
+
+from hotelapp.pagination import DEFAULT_ORDERING
+from hotelapp.renderers import dumps
+from restaurant.models import Inventory
+from .menu_cache import get_cached_snapshot, get_menu_version, set_cached_snapshot
+from .serializers import InventoryOutputSerializer
+from .stock import annotate_available_stock
+
+ORIGIN = "http://menu-origin.invalid"
+
+
+class SnapshotRequest:
+    """Stands in for the request when serializing the menu."""
+
+    def build_absolute_uri(self, location):
+        if urlsplit(location).scheme:
+            return location
+        return ORIGIN + location
+
+
+class MenuSnapshot:
+    def __init__(self, body, type_ranges, subtype_ranges, sold_out=frozenset()):
+        self.body = body
+        self.type_ranges = type_ranges
+        self.subtype_ranges = subtype_ranges
+        # Ids of the items listed as out of stock, see menu_cache.
+        self.sold_out = sold_out
+
+    def render(
+        self, request, menu_type=None, subtype=None, menu_type_id=None, subtype_id=None
+    ):
+        """
+        Return the items matching the filters as a JSON array for
+        ``request``, or None when there are none.  Types and subtypes are
+        filtered by name or by id.
+        """
+        filters = [
+            (self.type_ranges, menu_type),
+            (self.subtype_ranges, subtype),
+            (self.type_ranges, menu_type_id),
+            (self.subtype_ranges, subtype_id),
+        ]
+        filters = [(ranges, key) for ranges, key in filters if key]
+        if filters:
+            ranges = [(1, len(self.body) - 1)]
+            for key_ranges, key in filters:
+                ranges = intersect(ranges, key_ranges.get(key, []))
+            if not ranges:
+                return None
+            body = b",".join(self.body[start:end] for start, end in ranges)
+            body = b"[" + body + b"]"
+        elif len(self.body) > 2:
+            body = self.body
+        else:
+            return None
+        return body.replace(
+            ORIGIN.encode(), request.build_absolute_uri("/")[:-1].encode()
+        )
+
+
+def intersect(ranges, other):
+    """Intersect two sorted lists of disjoint ``(start, end)`` ranges."""
+    result = []
+    i = j = 0
+    while i < len(ranges) and j < len(other):
+        start = max(ranges[i][0], other[j][0])
+        end = min(ranges[i][1], other[j][1])
+        if start < end:
+            result.append((start, end))
+        if ranges[i][1] < other[j][1]:
+            i += 1
+        else:
+            j += 1
+    return result
+
+
+def add_range(ranges, key, start, end):
+    """Record an item's bytes, merging it with the previous one if adjacent."""
+    key_ranges = ranges.setdefault(key, [])
+    if key_ranges and key_ranges[-1][1] + 1 == start:
+        key_ranges[-1] = (key_ranges[-1][0], end)
+    else:
+        key_ranges.append((start, end))
+
+
+def compile_menu(restaurant_id):
+    inventory = annotate_available_stock(
+        Inventory.objects.filter(restaurant=restaurant_id)
+        .select_related("unit_category", "menu_subtype", "menu_type")
+        .order_by(*DEFAULT_ORDERING)
+    )
+    items = InventoryOutputSerializer(
+        inventory, context={"request": SnapshotRequest()}, many=True
+    ).data
+    body = bytearray(b"[")
+    type_ranges, subtype_ranges = {}, {}
+    sold_out = set()
+    for index, (inventory_item, item) in enumerate(zip(inventory, items)):
+        if item["available_quantity"] <= 0:
+            sold_out.add(inventory_item.id)
+        if index:
+            body += b","
+        start = len(body)
+        body += dumps(item)
+        # Ranges are keyed by name and, as ints, by id.
+        add_range(type_ranges, inventory_item.menu_type.name, start, len(body))
+        add_range(type_ranges, inventory_item.menu_type_id, start, len(body))
+        add_range(subtype_ranges, inventory_item.menu_subtype.name, start, len(body))
+        add_range(subtype_ranges, inventory_item.menu_subtype_id, start, len(body))
+    body += b"]"
+    return MenuSnapshot(bytes(body), type_ranges, subtype_ranges, frozenset(sold_out))
+
+
+def get_menu_snapshot(restaurant_id):
+    """Return the ``(version, snapshot)`` of a restaurant's current menu."""
+    version = get_menu_version(restaurant_id)
+    snapshot = get_cached_snapshot(restaurant_id, version)
+    if snapshot is None:
+        snapshot = compile_menu(restaurant_id)
+        set_cached_snapshot(restaurant_id, version, snapshot)
+    return version, snapshot
@@ -0,0 +1,293 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.utils import timezone
+from restaurant.models import Inventory, StockReservation, StockSlot
+from .menu_cache import bump_menu_version, shown_sold_out
+
+# How often a slot decrement retries another random slot after losing a race.
+TAKE_ATTEMPTS = 3
+
+
+def sharded_stock(inventory_ids):
+    """
+    Return ``{inventory_id: available}`` for the sharded items among the ids.
+    Items that are not sharded are left out.
+    """
+    return dict(
+        StockSlot.objects.filter(inventory_id__in=inventory_ids)
+        .values("inventory_id")
+        .annotate(total=Sum("quantity"))
+        .values_list("inventory_id", "total")
+    )
+
+
+def annotate_available_stock(queryset):
+    """
+    Annotate an Inventory queryset with ``slot_quantity``, the sum of the
+    item's stock slots, or None for items that are not sharded.
+    """
+    slot_total = (
+        StockSlot.objects.filter(inventory=OuterRef("pk"))
+        .values("inventory")
+        .annotate(total=Sum("quantity"))
+        .values("total")
+    )
+    return queryset.annotate(slot_quantity=Subquery(slot_total))
+
+
+def stock_changed(inventory_ids):
+    """
+    Invalidate the menus listing the given items after commit, if any of
+    them ran out of stock or came back in stock since the cached menu was
+    built.
+    """
+    inventory_ids = list(inventory_ids)
+    if not inventory_ids:
+        return
+
+    def invalidate():
+        restaurants = {}
+        rows = annotate_available_stock(
+            Inventory.objects.filter(id__in=inventory_ids)
+        ).values_list("restaurant_id", "id", "available_quantity", "slot_quantity")
+        for restaurant_id, inventory_id, available, slot_quantity in rows:
+            if slot_quantity is not None:
+                available = slot_quantity
+            restaurants.setdefault(restaurant_id, {})[inventory_id] = available <= 0
+        for restaurant_id, sold_out in restaurants.items():
+            shown = shown_sold_out(restaurant_id)
+            if shown is None or any(
+                (inventory_id in shown) != is_sold_out
+                for inventory_id, is_sold_out in sold_out.items()
+            ):
+                bump_menu_version(restaurant_id)
+
+    transaction.on_commit(invalidate)
+
+
+def take_from_slots(inventory_id, quantity):
+    """
+    Take ``quantity`` from the slots of a sharded item.
+
+    Usually a single conditional UPDATE on one randomly picked slot that can
+    cover the whole quantity.  When no slot can, the slots are locked and
+    drained in order.  Returns False when the item has too little stock.
+    """
+    for _ in range(TAKE_ATTEMPTS):
+        slot_id = (
+            StockSlot.objects.filter(inventory_id=inventory_id, quantity__gte=quantity)
+            .order_by("?")
+            .values_list("id", flat=True)
+            .first()
+        )
+        if slot_id is None:
+            break
+        updated = StockSlot.objects.filter(id=slot_id, quantity__gte=quantity).update(
+            quantity=F("quantity") - quantity
+        )
+        if updated:
+            stock_changed([inventory_id])
+            return True
+
+    with transaction.atomic():
+        slots = list(
+            StockSlot.objects.select_for_update()
+            .filter(inventory_id=inventory_id)
+            .order_by("slot")
+        )
+        if sum(slot.quantity for slot in slots) < quantity:
+            return False
+        remaining = quantity
+        for slot in slots:
+            taken = min(slot.quantity, remaining)
+            slot.quantity -= taken
+            remaining -= taken
+        StockSlot.objects.bulk_update(slots, ["quantity"])
+    stock_changed([inventory_id])
+    return True
+
+
+def return_stock(inventory_id, quantity):
+    """
+    Put ``quantity`` back, into a random slot for sharded items and into the
+    inventory row otherwise.
+    """
+    slot_id = (
+        StockSlot.objects.filter(inventory_id=inventory_id)
+        .order_by("?")
+        .values_list("id", flat=True)
+        .first()
+    )
+    if slot_id is not None:
+        StockSlot.objects.filter(id=slot_id).update(quantity=F("quantity") + quantity)
+    else:
+        Inventory.objects.filter(id=inventory_id).update(
+            available_quantity=F("available_quantity") + quantity
+        )
+    stock_changed([inventory_id])
+
+
+def distribute(quantity, slot_count):
+    base, extra = divmod(quantity, slot_count)
+    return [base + 1 if slot < extra else base for slot in range(slot_count)]
+
+
+@transaction.atomic
+def shard_inventory(inventory_id, slot_count=None):
+    """
+    Split an item's available stock into ``slot_count`` slots.
+    """
+    slot_count = slot_count or settings.STOCK_SLOT_COUNT
+    inventory = Inventory.objects.select_for_update().get(id=inventory_id)
+    slots = list(StockSlot.objects.select_for_update().filter(inventory=inventory))
+    if slots:
+        available = sum(slot.quantity for slot in slots)
+        StockSlot.objects.filter(inventory=inventory).delete()
+    else:
+        available = inventory.available_quantity
+    StockSlot.objects.bulk_create(
+        [
+            StockSlot(inventory=inventory, slot=slot, quantity=quantity)
+            for slot, quantity in enumerate(distribute(available, slot_count))
+        ]
+    )
+    Inventory.objects.filter(id=inventory_id).update(available_quantity=available)
+
+
+@transaction.atomic
+def unshard_inventory(inventory_id):
+    """
+    Fold the slots of an item back into its inventory row and drop them.
+    """
+    fold_inventory(inventory_id)
+    StockSlot.objects.filter(inventory_id=inventory_id).delete()
+
+
+@transaction.atomic
+def fold_inventory(inventory_id):
+    """
+    Copy the slot total of a sharded item into ``Inventory.available_quantity``
+    and spread the stock evenly over the slots again.
+    """
+    slots = list(
+        StockSlot.objects.select_for_update()
+        .filter(inventory_id=inventory_id)
+        .order_by("slot")
+    )
+    if not slots:
+        return None
+    available = sum(slot.quantity for slot in slots)
+    for slot, quantity in zip(slots, distribute(available, len(slots))):
+        slot.quantity = quantity
+    StockSlot.objects.bulk_update(slots, ["quantity"])
+    Inventory.objects.filter(id=inventory_id).update(available_quantity=available)
+    return available
+
+
+@transaction.atomic
+def set_sharded_stock(inventory_id, available_quantity):
+    """
+    Replace the available stock of a sharded item, e.g. after a restock.
+    Does nothing for items that are not sharded.
+    """
+    slots = list(
+        StockSlot.objects.select_for_update()
+        .filter(inventory_id=inventory_id)
+        .order_by("slot")
+    )
+    if not slots:
+        return
+    for slot, quantity in zip(slots, distribute(available_quantity, len(slots))):
+        slot.quantity = quantity
+    StockSlot.objects.bulk_update(slots, ["quantity"])
+    stock_changed([inventory_id])
+
+
+@transaction.atomic
+def reserve(session_id, inventory_id, quantity, timeout=None):
+    """
+    Hold stock for a cart. Returns the reservation, or None when the item has
+    too little stock left.
+    """
+    if sharded_stock([inventory_id]):
+        taken = take_from_slots(inventory_id, quantity)
+    else:
+        taken = Inventory.objects.filter(
+            id=inventory_id, available_quantity__gte=quantity
+        ).update(available_quantity=F("available_quantity") - quantity)
+        if taken:
+            stock_changed([inventory_id])
+    if not taken:
+        return None
+    timeout = timeout or settings.STOCK_RESERVATION_TIMEOUT
+    return StockReservation.objects.create(
+        inventory_id=inventory_id,
+        session_id=session_id,
+        quantity=quantity,
+        expires_at=timezone.now() + timedelta(seconds=timeout),
+    )
+
+
+@transaction.atomic
+def release_reservations(queryset):
+    """
+    Delete the given reservations and give their stock back.
+    """
+    released = {}
+    for reservation in queryset.select_for_update():
+        released[reservation.inventory_id] = (
+            released.get(reservation.inventory_id, 0) + reservation.quantity
+        )
+        reservation.delete()
+    for inventory_id, quantity in released.items():
+        return_stock(inventory_id, quantity)
+    return released
+
+
+def release_expired_reservations():
+    return release_reservations(
+        StockReservation.objects.filter(expires_at__lte=timezone.now())
+    )
+
+
+def consume_reservations(session_id, quantities):
+    """
+    Use the stock a cart has reserved for an order being placed.
+
+    Must run inside the order's transaction.  Returns the quantities that are
+    still to be taken from the free stock.  Reserved stock beyond what the
+    order needs is given back.
+    """
+    if not session_id or not quantities:
+        return quantities
+    reservations = list(
+        StockReservation.objects.select_for_update().filter(
+            session_id=session_id,
+            inventory_id__in=list(quantities),
+            expires_at__gt=timezone.now(),
+        )
+    )
+    if not reservations:
+        return quantities
+    remaining = dict(quantities)
+    surplus = {}
+    for reservation in reservations:
+        used = min(reservation.quantity, remaining[reservation.inventory_id])
+        remaining[reservation.inventory_id] -= used
+        if reservation.quantity > used:
+            surplus[reservation.inventory_id] = (
+                surplus.get(reservation.inventory_id, 0) + reservation.quantity - used
+            )
+    StockReservation.objects.filter(
+        id__in=[reservation.id for reservation in reservations]
+    ).delete()
+    for inventory_id, quantity in surplus.items():
+        return_stock(inventory_id, quantity)
+    return {
+        inventory_id: quantity
+        for inventory_id, quantity in remaining.items()
+        if quantity
+    }
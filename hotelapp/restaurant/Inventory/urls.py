@@ -1,11 +1,13 @@
 from django.urls import path
-from .menuview import MenuTypeListApiView, MenuSubTypeListApiView
+from .menuview import MenuTypeListApiView, MenuSubTypeListApiView, MenuTreeApiView
 from .views import (
     InventoryListApiView,
     InventoryCreateApiView,
+    InventoryImportApiView,
     InventoryDeleteApiView,
     RestaurantInventoryListApiView,
     InventoryUpdateApiView,
+    InventoryBulkUpdateApiView,
     InventoryDetailApiView,
 )
 
@@ -25,6 +27,11 @@ urlpatterns = [
         InventoryCreateApiView.as_view(),
         name="create_restaurant_inventory",
     ),
+    path(
+        "import/",
+        InventoryImportApiView.as_view(),
+        name="import_restaurant_inventory",
+    ),
     path(
         "delete/<int:inventory_Id>/",
         InventoryDeleteApiView.as_view(),
@@ -35,6 +42,11 @@ urlpatterns = [
         InventoryUpdateApiView.as_view(),
         name="delete_restaurant_inventory",
     ),
+    path(
+        "bulk-update/",
+        InventoryBulkUpdateApiView.as_view(),
+        name="bulk_update_restaurant_inventory",
+    ),
     path(
         "detail/<int:inventory_id>/",
         InventoryDetailApiView.as_view(),
@@ -42,5 +54,6 @@ urlpatterns = [
     ),
     path("menutypes/", MenuTypeListApiView.as_view(), name="list_restaurant_menutypes"),
     path("menusubtype/<int:menutype_id>/", MenuSubTypeListApiView.as_view(), name="list_restaurant_menu_sub_type"),
+    path("menu-tree/", MenuTreeApiView.as_view(), name="restaurant_menu_tree"),
 ]
 
@@ -1,11 +1,18 @@
 from django.shortcuts import get_object_or_404
 from django.http import Http404
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
 from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.exceptions import ValidationError
 from rest_framework.views import APIView
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework import authentication, permissions
-from .serializers import InventoryOutputSerializer, InventoryInputSerializer
+from .serializers import (
+    InventoryBulkUpdateSerializer,
+    InventoryOutputSerializer,
+    InventoryInputSerializer,
+)
 from restaurant.models import (
     Restaurant,
     Category,
@@ -15,17 +22,61 @@ from restaurant.models import (
     UnitCategory,
 )
 from restaurant.permissions import IsSuperAdmin, IsRestaurant
+from .bulk_update import update_inventory
+from .importer import import_inventory
+from .menu_cache import menu_validators
+from .snapshot import get_menu_snapshot
+from .stock import annotate_available_stock
+from hotelapp.pagination import paginate_queryset
+from hotelapp.renderers import EncodedJSON, dumps
+
+
+def get_id_param(request, name):
+    value = request.query_params.get(name)
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValidationError({name: "A valid integer is required."})
 
 
 class InventoryListApiView(APIView):
+    """
+    Api to list the inventory of the restaurant, filtered by `menu_type` and
+    `subtype` names or, cheaper, by `menu_type_id` and `subtype_id`.
+    """
+
     permission_classes = [permissions.IsAuthenticated, IsRestaurant]
 
     def get(self, request):
-        restaurant_id = request.user.restaurant
+        restaurant_id = request.user.restaurant_id
         menu_type = request.query_params.get("menu_type")
         subtype = request.query_params.get("subtype")
+        menu_type_id = get_id_param(request, "menu_type_id")
+        subtype_id = get_id_param(request, "subtype_id")
+
+        # The whole list is cut from the menu snapshot; pages are queried.
+        cursor = request.query_params.get("cursor")
+        paginated = cursor or {"page", "page_size"} & set(request.query_params)
+        if not paginated:
+            _, snapshot = get_menu_snapshot(restaurant_id)
+            detail = snapshot.render(
+                request, menu_type, subtype, menu_type_id, subtype_id
+            )
+            if detail is None:
+                return Response(
+                    {"message": "Inventory not found"},
+                    status=status.HTTP_404_NOT_FOUND,
+                )
+            return Response(
+                EncodedJSON(
+                    b'{"status":200,"error":false,"detail":%s,"message":""}' % detail
+                ),
+                status=status.HTTP_200_OK,
+            )
 
-        filters = {"restaurant": restaurant_id.id}
+        filters = {"restaurant_id": restaurant_id}
 
         if menu_type:
             filters["menu_type__name"] = menu_type
@@ -33,9 +84,19 @@ class InventoryListApiView(APIView):
         if subtype:
             filters["menu_subtype__name"] = subtype
 
-        inventory = Inventory.objects.filter(**filters)
+        if menu_type_id:
+            filters["menu_type_id"] = menu_type_id
+
+        if subtype_id:
+            filters["menu_subtype_id"] = subtype_id
 
-        if not inventory.exists():
+        inventory = annotate_available_stock(
+            Inventory.objects.filter(**filters).select_related(
+                "unit_category", "menu_subtype", "menu_type"
+            )
+        )
+        inventory, pagination_info = paginate_queryset(request, inventory)
+        if not inventory and not cursor:
             return Response(
                 {"message": "Inventory not found"},
                 status=status.HTTP_404_NOT_FOUND,
@@ -48,6 +109,7 @@ class InventoryListApiView(APIView):
             "error": False,
             "detail": inventory_output_serializer.data,
             "message": "",
+            "pagination_info": pagination_info,
         }
         return Response(response_data, status=status.HTTP_200_OK)
 
@@ -149,6 +211,50 @@ class InventoryCreateApiView(APIView):
     #     return Response(response_data, status=status.HTTP_200_OK)
 
 
+class InventoryImportApiView(APIView):
+    """
+    Api to create or update many inventory items at once from a CSV upload,
+    sent as the `file` field of a multipart request.  See
+    `restaurant.Inventory.importer` for the columns.  Rows with errors are
+    skipped and reported with their line number; when the file stops being
+    valid UTF-8 or CSV, the rows before are imported and the rest is
+    reported as one error.
+    """
+
+    permission_classes = [permissions.IsAuthenticated, IsRestaurant]
+    parser_classes = (MultiPartParser, FormParser)
+
+    def post(self, request):
+        upload = request.FILES.get("file")
+        if upload is None:
+            response_data = {
+                "status": status.HTTP_400_BAD_REQUEST,
+                "error": True,
+                "detail": "",
+                "message": "file is required.",
+            }
+            return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+
+        report = import_inventory(request.user.restaurant, upload)
+        imported = report["created"] + report["updated"]
+        if not report["errors"]:
+            response_status = status.HTTP_200_OK
+        elif imported:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+        response_data = {
+            "status": response_status,
+            "error": bool(report["errors"]),
+            "detail": report,
+            "message": (
+                f"{report['created']} items created, {report['updated']} updated, "
+                f"{len(report['errors'])} rows skipped."
+            ),
+        }
+        return Response(response_data, status=response_status)
+
+
 class InventoryDeleteApiView(APIView):
     permission_classes = [permissions.IsAuthenticated, IsRestaurant]
 
@@ -185,6 +291,9 @@ class InventoryDeleteApiView(APIView):
 class RestaurantInventoryListApiView(APIView):
     """
     Api to list inventory of a restaurant by restaurant_id.
+
+    Served from the menu snapshot until the menu changes; clients revalidate
+    with the ETag and get a 304 while it is unchanged.
     """
 
     def get(self, request, restaurant_id, table_id):
@@ -193,32 +302,34 @@ class RestaurantInventoryListApiView(APIView):
         menu_type = request.query_params.get("menu_type")
         subtype = request.query_params.get("subtype")
 
-        filters = {"restaurant": restaurant_id}
+        version, snapshot = get_menu_snapshot(restaurant_id)
+        etag, last_modified = menu_validators(restaurant_id, version)
+        # ETag only: see menu_validators.
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return self.add_validators(not_modified, etag, last_modified)
 
-        if menu_type:
-            filters["menu_type__name"] = menu_type
-
-        if subtype:
-            filters["menu_subtype__name"] = subtype
-
-        inventory = Inventory.objects.filter(**filters)
-
-        if not inventory.exists():
+        detail = snapshot.render(request, menu_type, subtype)
+        if detail is None:
             return Response(
                 {"message": "Inventory not found"},
                 status=status.HTTP_404_NOT_FOUND,
             )
-        inventory_output_serializer = InventoryOutputSerializer(
-            inventory, context={"request": request}, many=True
+        response = Response(
+            EncodedJSON(
+                b'{"status":200,"error":false,"detail":%s,"message":"","table_id":%s}'
+                % (detail, dumps(table_id))
+            ),
+            status=status.HTTP_200_OK,
         )
-        response_data = {
-            "status": status.HTTP_200_OK,
-            "error": False,
-            "detail": inventory_output_serializer.data,
-            "message": "",
-            "table_id": table_id,
-        }
-        return Response(response_data, status=status.HTTP_200_OK)
+        return self.add_validators(response, etag, last_modified)
+
+    def add_validators(self, response, etag, last_modified):
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+        # Stock changes all the time: always revalidate, which is cheap.
+        patch_cache_control(response, no_cache=True)
+        return response
 
 
 class InventoryUpdateApiView(APIView):
@@ -258,6 +369,55 @@ class InventoryUpdateApiView(APIView):
             return Response(response_data, status=status.HTTP_200_OK)
 
 
+class InventoryBulkUpdateApiView(APIView):
+    """
+    Api to change the stock and prices of many items at once, e.g. for the
+    nightly restock. Only the given fields are changed.
+    ```
+    [
+        {"id": 14, "available_quantity": 40, "total_quantity": 40},
+        {"id": 15, "unit_price": "120.00"}
+    ]
+    ```
+    Items that are not found are reported and the others updated.
+    """
+
+    permission_classes = [permissions.IsAuthenticated, IsRestaurant]
+
+    def patch(self, request):
+        serializer = InventoryBulkUpdateSerializer(
+            data=request.data, many=True, allow_empty=False, max_length=1000
+        )
+        if not serializer.is_valid():
+            response_data = {
+                "status": status.HTTP_400_BAD_REQUEST,
+                "error": True,
+                "detail": serializer.errors,
+                "message": "Invalid data.",
+            }
+            return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+
+        updated, missing = update_inventory(
+            request.user.restaurant, serializer.validated_data
+        )
+        if not missing:
+            response_status = status.HTTP_200_OK
+        elif updated:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_404_NOT_FOUND
+        response_data = {
+            "status": response_status,
+            "error": bool(missing),
+            "detail": [
+                {"id": inventory_id, "message": "inventory not found"}
+                for inventory_id in missing
+            ],
+            "message": f"{updated} items updated.",
+        }
+        return Response(response_data, status=response_status)
+
+
 class InventoryDetailApiView(APIView):
 
     """
@@ -268,7 +428,9 @@ class InventoryDetailApiView(APIView):
 
     def get(self, request, inventory_id):
         try:
-            inventory = get_object_or_404(Inventory, id=inventory_id)
+            inventory = get_object_or_404(
+                annotate_available_stock(Inventory.objects.all()), id=inventory_id
+            )
         except Http404:
             return Response(
                 {"message": "inventory not found"},
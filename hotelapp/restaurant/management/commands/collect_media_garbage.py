@@ -0,0 +1,68 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from hotelapp.images import DERIVATIVE_DIR, derivative_names, forget_derivatives
+from hotelapp.storage import file_references
+
+
+def walk(storage, path=""):
+    directories, files = storage.listdir(path)
+    for name in files:
+        yield f"{path}/{name}" if path else name
+    for directory in directories:
+        yield from walk(storage, f"{path}/{directory}" if path else directory)
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete the media files and image derivatives no row refers to any "
+        "more, e.g. after items or restaurants were deleted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report the files that would be deleted.",
+        )
+        parser.add_argument(
+            "--grace-period",
+            type=int,
+            default=settings.MEDIA_GC_GRACE_PERIOD,
+            help="Keep unreferenced files younger than this many seconds.",
+        )
+
+    def handle(self, *args, **options):
+        storage = default_storage
+        if not storage.exists(""):
+            self.stdout.write("No media stored.")
+            return
+        references = file_references()
+        keep = set(references)
+        for name in references:
+            keep.update(derivative_names(name))
+        cutoff = timezone.now() - timedelta(seconds=options["grace_period"])
+
+        deleted, freed = 0, 0
+        for name in walk(storage):
+            if name in keep or storage.get_modified_time(name) > cutoff:
+                continue
+            freed += storage.size(name)
+            deleted += 1
+            if options["dry_run"]:
+                self.stdout.write(name)
+            else:
+                storage.delete(name)
+                if not name.startswith(DERIVATIVE_DIR + "/"):
+                    # The same content may be uploaded again.
+                    forget_derivatives(name)
+
+        shared = sum(1 for count in references.values() if count > 1)
+        self.stdout.write(
+            f"{'Would delete' if options['dry_run'] else 'Deleted'} {deleted} "
+            f"files ({freed} bytes); {len(references)} files are referenced, "
+            f"{shared} of them by several rows."
+        )
@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+from restaurant.models import StockSlot
+from restaurant.Inventory.stock import fold_inventory, release_expired_reservations
+
+
+class Command(BaseCommand):
+    help = (
+        "Release expired cart reservations and fold sharded stock slots back "
+        "into Inventory.available_quantity."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=0,
+            help="Keep running and fold every INTERVAL seconds.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            self.fold()
+            if not options["interval"]:
+                break
+            time.sleep(options["interval"])
+
+    def fold(self):
+        released = release_expired_reservations()
+        inventory_ids = (
+            StockSlot.objects.values_list("inventory_id", flat=True)
+            .order_by("inventory_id")
+            .distinct()
+        )
+        folded = 0
+        for inventory_id in inventory_ids:
+            fold_inventory(inventory_id)
+            folded += 1
+        self.stdout.write(
+            f"Released reservations for {len(released)} items, folded {folded} items."
+        )
@@ -0,0 +1,67 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from hotelapp.images import generate_derivatives
+from restaurant.models import Inventory, Restaurant
+from restaurant.Inventory.menu_cache import bump_menu_version
+
+
+class Command(BaseCommand):
+    help = (
+        "Create the resized WebP/JPEG copies of the item images, logos and "
+        "avatars that do not have them yet."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force", action="store_true", help="Regenerate existing derivatives."
+        )
+        parser.add_argument(
+            "--workers", type=int, default=settings.IMAGE_DERIVATIVE_WORKERS
+        )
+
+    def handle(self, *args, **options):
+        images = {}
+        for model, field_name in (
+            (Inventory, "item_image"),
+            (Restaurant, "logo"),
+            (get_user_model(), "avatar"),
+        ):
+            field = model._meta.get_field(field_name)
+            names = (
+                model.objects.exclude(**{field_name: ""})
+                .exclude(**{f"{field_name}__isnull": True})
+                .values_list(field_name, flat=True)
+                .distinct()
+            )
+            for name in names:
+                images[name] = field.storage
+
+        with ThreadPoolExecutor(max_workers=options["workers"]) as executor:
+            futures = {
+                name: executor.submit(
+                    generate_derivatives, name, storage, options["force"]
+                )
+                for name, storage in images.items()
+            }
+        generated, failed = [], 0
+        for name, future in futures.items():
+            try:
+                if future.result():
+                    generated.append(name)
+            except Exception as exc:
+                failed += 1
+                self.stderr.write(f"{name}: {exc}")
+
+        for restaurant_id in (
+            Inventory.objects.filter(item_image__in=generated)
+            .values_list("restaurant_id", flat=True)
+            .distinct()
+        ):
+            bump_menu_version(restaurant_id)
+        self.stdout.write(
+            f"Generated derivatives for {len(generated)} of {len(images)} images, "
+            f"{failed} failed."
+        )
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from restaurant.models import Restaurant
+from restaurant.Inventory.importer import IMPORT_BATCH_SIZE, import_inventory
+
+
+class Command(BaseCommand):
+    help = (
+        "Create or update the inventory of a restaurant from a CSV file, see "
+        "restaurant.Inventory.importer for the columns."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("restaurant_id", type=int)
+        parser.add_argument("path")
+        parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        restaurant = Restaurant.objects.filter(id=options["restaurant_id"]).first()
+        if restaurant is None:
+            raise CommandError(f"Restaurant {options['restaurant_id']} does not exist.")
+        try:
+            with open(options["path"], "rb") as file:
+                report = import_inventory(restaurant, file, options["batch_size"])
+        except OSError as exc:
+            raise CommandError(str(exc))
+        for error in report["errors"]:
+            messages = "; ".join(
+                f"{field}: {' '.join(str(message) for message in field_messages)}"
+                for field, field_messages in error["errors"].items()
+            )
+            self.stderr.write(f"Line {error['row']}: {messages}")
+        self.stdout.write(
+            f"{report['created']} items created, {report['updated']} updated, "
+            f"{len(report['errors'])} rows skipped."
+        )
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from restaurant.models import Inventory
+from restaurant.Inventory.stock import shard_inventory, unshard_inventory
+
+
+class Command(BaseCommand):
+    help = "Split the stock of hot inventory items into counter slots, or fold it back."
+
+    def add_arguments(self, parser):
+        parser.add_argument("inventory_ids", nargs="+", type=int)
+        parser.add_argument(
+            "--slots",
+            type=int,
+            default=None,
+            help="Number of slots, defaults to STOCK_SLOT_COUNT.",
+        )
+        parser.add_argument(
+            "--off",
+            action="store_true",
+            help="Fold the slots back into the inventory row and remove them.",
+        )
+
+    def handle(self, *args, **options):
+        for inventory_id in options["inventory_ids"]:
+            if not Inventory.objects.filter(id=inventory_id).exists():
+                raise CommandError(f"Inventory {inventory_id} does not exist.")
+            if options["off"]:
+                unshard_inventory(inventory_id)
+                self.stdout.write(f"Inventory {inventory_id} is no longer sharded.")
+            else:
+                shard_inventory(inventory_id, options["slots"])
+                self.stdout.write(f"Inventory {inventory_id} sharded.")
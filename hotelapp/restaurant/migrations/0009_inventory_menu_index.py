@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0008_stockslot_stockreservation'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inventory',
+            index=models.Index(fields=['restaurant', 'menu_type', 'menu_subtype'], name='inventory_menu_idx'),
+        ),
+    ]
@@ -174,6 +174,62 @@ class Inventory(BaseModel):
     class Meta:
         verbose_name = "Inventory"
         verbose_name_plural = "Inventories"
+        # The inventory lists filter the restaurant's items by type and subtype.
+        indexes = [
+            models.Index(
+                fields=["restaurant", "menu_type", "menu_subtype"],
+                name="inventory_menu_idx",
+            ),
+        ]
 
     def __str__(self):
         return self.name
+
+
+class StockSlot(models.Model):
+    """
+    One shard of a hot item's available stock.
+
+    While an item has slots, the slots hold its real available stock and
+    ``Inventory.available_quantity`` is only a mirror that is refreshed when
+    the slots are folded.  Orders decrement a single slot, so concurrent
+    orders for the same item rarely wait on the same row.
+    """
+
+    inventory = models.ForeignKey(
+        Inventory, on_delete=models.CASCADE, related_name="stock_slots"
+    )
+    slot = models.PositiveSmallIntegerField()
+    quantity = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Stock Slot"
+        verbose_name_plural = "Stock Slots"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["inventory", "slot"], name="unique_inventory_stock_slot"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.inventory} - slot {self.slot}"
+
+
+class StockReservation(BaseModel):
+    """
+    Stock held for a cart ``session_id`` until it is ordered or expires.
+    """
+
+    inventory = models.ForeignKey(
+        Inventory, on_delete=models.CASCADE, related_name="stock_reservations"
+    )
+    session_id = models.CharField(max_length=100, db_index=True)
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        verbose_name = "Stock Reservation"
+        verbose_name_plural = "Stock Reservations"
+
+    def __str__(self):
+        return f"{self.session_id} - {self.inventory}"
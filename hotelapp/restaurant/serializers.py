@@ -1,5 +1,6 @@
 import re
 from rest_framework import serializers
+from hotelapp.images import derivative_urls
 from .models import Restaurant, Table
 
 
@@ -92,6 +93,7 @@ class RestaurantOutputSerializer(serializers.ModelSerializer):
     restaurant_category = serializers.StringRelatedField(read_only=True)
     operating_hours = serializers.SerializerMethodField()
     logo = serializers.SerializerMethodField()
+    logo_derivatives = serializers.SerializerMethodField()
 
     class Meta:
         model = Restaurant
@@ -105,6 +107,9 @@ class RestaurantOutputSerializer(serializers.ModelSerializer):
             return self.context["request"].build_absolute_uri(obj.logo.url)
         return None
 
+    def get_logo_derivatives(self, obj):
+        return derivative_urls(obj.logo, self.context.get("request"))
+
 
 class TableInputSerializer(serializers.Serializer):
     tablenumber = serializers.IntegerField(required=True)
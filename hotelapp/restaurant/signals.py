@@ -0,0 +1,63 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from hotelapp.images import schedule_derivatives
+from .Inventory.menu_cache import bump_menu_version, menu_changed
+from .models import Inventory, Menu_Subtype, MenuTypes, Restaurant, UnitCategory
+
+
+@receiver(post_save, sender=Inventory)
+@receiver(post_delete, sender=Inventory)
+@receiver(post_save, sender=MenuTypes)
+@receiver(post_delete, sender=MenuTypes)
+def invalidate_menu(sender, instance, raw=False, **kwargs):
+    if not raw:
+        menu_changed(instance.restaurant_id)
+
+
+@receiver(post_save, sender=Menu_Subtype)
+@receiver(post_delete, sender=Menu_Subtype)
+def invalidate_subtype_menu(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    restaurant_id = (
+        MenuTypes.objects.filter(id=instance.menutype_id)
+        .values_list("restaurant_id", flat=True)
+        .first()
+    )
+    menu_changed(restaurant_id)
+
+
+@receiver(post_save, sender=UnitCategory)
+@receiver(pre_delete, sender=UnitCategory)
+def invalidate_unit_menus(sender, instance, raw=False, **kwargs):
+    # Menus show the unit's name; deleting it also deletes its items.
+    if raw:
+        return
+    restaurant_ids = (
+        Inventory.objects.filter(unit_category=instance.pk)
+        .values_list("restaurant_id", flat=True)
+        .distinct()
+    )
+    for restaurant_id in restaurant_ids:
+        menu_changed(restaurant_id)
+
+
+def image_saved(field_name, update_fields):
+    return update_fields is None or field_name in update_fields
+
+
+@receiver(post_save, sender=Inventory)
+def resize_item_image(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or not image_saved("item_image", update_fields):
+        return
+    restaurant_id = instance.restaurant_id
+    # The menu lists the derivative urls once they exist.
+    schedule_derivatives(
+        instance.item_image, on_done=lambda: bump_menu_version(restaurant_id)
+    )
+
+
+@receiver(post_save, sender=Restaurant)
+def resize_logo(sender, instance, raw=False, update_fields=None, **kwargs):
+    if not raw and image_saved("logo", update_fields):
+        schedule_derivatives(instance.logo)
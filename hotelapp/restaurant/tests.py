@@ -1,3 +1,450 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+import uuid
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils.translation import gettext_lazy
+from PIL import Image
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from account.models import User
+from hotelapp.images import derivative_name, derivative_urls, generate_derivatives
+from hotelapp.renderers import FastJSONRenderer
+from hotelapp.storage import (
+    IMMUTABLE_CACHE_CONTROL,
+    ContentAddressedStorage,
+    serve_media,
+)
+from .models import (
+    Category,
+    Inventory,
+    Menu_Subtype,
+    MenuTypes,
+    Restaurant,
+    StockReservation,
+    UnitCategory,
+)
+from .Inventory.importer import import_inventory
+from .Inventory.serializers import InventoryOutputSerializer
+from .Inventory.menu_cache import (
+    bump_menu_version,
+    get_cached_snapshot,
+    get_menu_version,
+)
+from .Inventory.stock import release_reservations, reserve
+
+
+class MenuTestMixin:
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name="Cafe")
+        cls.restaurant = Restaurant.objects.create(
+            name="Test Restaurant",
+            description="test description",
+            opening_time=time(9, 0),
+            closing_time=time(23, 0),
+            phone_number="7777777777",
+            address="test address",
+            restaurant_category=category,
+            email="restaurant@test.com",
+            logo="restaurants/logo.png",
+        )
+        cls.user = User.objects.create(
+            email="restaurant@test.com", role="restaurant", restaurant=cls.restaurant
+        )
+        menu_type = MenuTypes.objects.create(name="Veg", restaurant=cls.restaurant)
+        cls.starters = Menu_Subtype.objects.create(name="Starters", menutype=menu_type)
+        mains = Menu_Subtype.objects.create(name="Mains", menutype=menu_type)
+        unit_category = UnitCategory.objects.create(name="Plate", abbreviation="plate")
+        for index in range(6):
+            Inventory.objects.create(
+                name=f"Item {index}",
+                restaurant=cls.restaurant,
+                video_link="https://example.com/video",
+                item_image="item.png",
+                description="test item",
+                menu_type=menu_type,
+                menu_subtype=cls.starters if index % 2 else mains,
+                total_quantity=100,
+                available_quantity=100,
+                unit_price="10.50",
+                unit_category=unit_category,
+            )
+
+    def setUp(self):
+        caches["menu"].clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+
+class InventoryListApiViewTests(MenuTestMixin, TestCase):
+    def test_inventory_page_is_a_single_query(self):
+        # The items with their unit, type and subtype and the sharded stock
+        # total, in one joined query however many rows are listed.
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                "/api/restaurant/inventory/list/",
+                {"page_size": 10, "subtype_id": self.starters.id},
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["detail"]), 3)
+        item = response.data["detail"][0]
+        self.assertEqual(item["menu_type"], "Veg")
+        self.assertEqual(item["menu_subtype"], "Starters")
+        self.assertEqual(item["unit_category"], "Plate")
+
+    def test_whole_inventory_is_served_from_the_menu_snapshot(self):
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/restaurant/inventory/list/")
+        self.assertEqual(len(response.json()["detail"]), 6)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                "/api/restaurant/inventory/list/", {"subtype_id": self.starters.id}
+            )
+        self.assertEqual(len(response.json()["detail"]), 3)
+
+
+class MenuTreeApiViewTests(MenuTestMixin, TestCase):
+    def test_tree_counts_items_in_two_queries(self):
+        drinks = MenuTypes.objects.create(name="Drinks", restaurant=self.restaurant)
+        Menu_Subtype.objects.create(name="Juices", menutype=drinks)
+        other = Restaurant.objects.create(
+            name="Other Restaurant",
+            description="other description",
+            opening_time=time(9, 0),
+            closing_time=time(23, 0),
+            phone_number="8888888888",
+            address="other address",
+            restaurant_category=self.restaurant.restaurant_category,
+            email="other@test.com",
+            logo="restaurants/other.png",
+        )
+        MenuTypes.objects.create(name="Non veg", restaurant=other)
+
+        # The menu types with their counts, then all their subtypes with theirs.
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/restaurant/inventory/menu-tree/")
+        self.assertEqual(response.status_code, 200)
+        veg, drinks = response.data["detail"]
+        self.assertEqual((veg["name"], veg["item_count"]), ("Veg", 6))
+        self.assertEqual(
+            [(subtype["name"], subtype["item_count"]) for subtype in veg["subtypes"]],
+            [("Starters", 3), ("Mains", 3)],
+        )
+        self.assertEqual(drinks["item_count"], 0)
+        self.assertEqual(
+            drinks["subtypes"], [{"id": mock.ANY, "name": "Juices", "item_count": 0}]
+        )
+
+
+class FastJSONRendererTests(MenuTestMixin, TestCase):
+    def assert_same_bytes(self, data):
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_serialized_inventory_renders_like_drf(self):
+        items = Inventory.objects.select_related(
+            "unit_category", "menu_subtype", "menu_type"
+        )
+        self.assert_same_bytes(InventoryOutputSerializer(items, many=True).data)
+
+    def test_values_outside_serializers_render_like_drf(self):
+        self.assert_same_bytes(
+            {
+                "price": Decimal("10.50"),
+                "updated_at": datetime(2024, 1, 1, 12, 0, 0, 123456, timezone.utc),
+                "naive": datetime(2024, 1, 1, 12, 0),
+                "date": date(2024, 1, 1),
+                "time": time(9, 30, 15, 250000),
+                "duration": timedelta(minutes=5),
+                "id": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+                "label": gettext_lazy("Starters"),
+                "text": "Caf\u00e9 \u2028 \u2029 \U0001f35c",
+                "missing": None,
+                1: [True, 2.5],
+            }
+        )
+
+    def test_snapshot_response_renders_like_drf(self):
+        # The first request renders the list, the second one is cut from the
+        # cached snapshot and sent as is.
+        for _ in range(2):
+            response = self.client.get("/api/restaurant/inventory/list/")
+            self.assertEqual(response.content, JSONRenderer().render(response.json()))
+
+
+class RestaurantMenuCacheTests(MenuTestMixin, TestCase):
+    def get_menu(self, **headers):
+        return self.client.get(
+            f"/api/restaurant/inventory/list/{self.restaurant.id}/1/", **headers
+        )
+
+    def test_unit_rename_invalidates_the_menu(self):
+        etag = self.get_menu()["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            UnitCategory.objects.filter(name="Plate").get().save()
+        response = self.get_menu(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_menu_is_only_validated_by_etag(self):
+        response = self.get_menu()
+        self.assertEqual(
+            self.get_menu(HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304
+        )
+        # Edits within the same second share the Last-Modified.
+        response = self.get_menu(HTTP_IF_MODIFIED_SINCE=response["Last-Modified"])
+        self.assertEqual(response.status_code, 200)
+
+    def test_stock_only_invalidates_the_menu_when_an_item_sells_out(self):
+        item = Inventory.objects.get(name="Item 0")
+        etag = self.get_menu()["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            reservation = reserve("cart-1", item.id, 40)
+        self.assertEqual(self.get_menu(HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            reserve("cart-2", item.id, 60)
+        response = self.get_menu(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        listed = {row["id"]: row for row in response.json()["detail"]}
+        self.assertEqual(listed[item.id]["available_quantity"], 0)
+
+        etag = response["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            release_reservations(StockReservation.objects.filter(id=reservation.id))
+        response = self.get_menu(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        listed = {row["id"]: row for row in response.json()["detail"]}
+        self.assertEqual(listed[item.id]["available_quantity"], 40)
+
+    def test_new_version_drops_the_previous_snapshot(self):
+        self.get_menu()
+        version = get_menu_version(self.restaurant.id)
+        self.assertIsNotNone(get_cached_snapshot(self.restaurant.id, version))
+        bump_menu_version(self.restaurant.id)
+        self.assertIsNone(get_cached_snapshot(self.restaurant.id, version))
+
+
+class InventoryBulkUpdateTests(MenuTestMixin, TestCase):
+    def update(self, changes):
+        return self.client.patch(
+            "/api/restaurant/inventory/bulk-update/", changes, format="json"
+        )
+
+    def other_restaurants_item(self):
+        item = Inventory.objects.get(name="Item 0")
+        restaurant = Restaurant.objects.create(
+            name="Other Restaurant",
+            description="test description",
+            opening_time=time(9, 0),
+            closing_time=time(23, 0),
+            phone_number="7777777778",
+            address="test address",
+            restaurant_category=self.restaurant.restaurant_category,
+            email="other@test.com",
+            logo="restaurants/logo.png",
+        )
+        return Inventory.objects.create(
+            name="Other Item",
+            restaurant=restaurant,
+            video_link="https://example.com/video",
+            item_image="item.png",
+            description="test item",
+            menu_type=item.menu_type,
+            menu_subtype=item.menu_subtype,
+            total_quantity=100,
+            available_quantity=100,
+            unit_price="10.50",
+            unit_category=item.unit_category,
+        )
+
+    def test_only_the_given_fields_change(self):
+        first = Inventory.objects.get(name="Item 0")
+        second = Inventory.objects.get(name="Item 1")
+        response = self.update(
+            [
+                {"id": first.id, "available_quantity": 40},
+                {"id": second.id, "unit_price": "12.00", "total_quantity": 120},
+            ]
+        )
+        self.assertEqual(response.status_code, 200)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(
+            (first.available_quantity, first.total_quantity, first.unit_price),
+            (40, 100, Decimal("10.50")),
+        )
+        self.assertEqual(
+            (second.available_quantity, second.total_quantity, second.unit_price),
+            (100, 120, Decimal("12.00")),
+        )
+
+    def test_items_of_other_restaurants_are_left_alone(self):
+        item = Inventory.objects.get(name="Item 0")
+        other = self.other_restaurants_item()
+        response = self.update(
+            [
+                {"id": item.id, "available_quantity": 5},
+                {"id": other.id, "available_quantity": 5},
+            ]
+        )
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual([row["id"] for row in response.data["detail"]], [other.id])
+        item.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((item.available_quantity, other.available_quantity), (5, 100))
+
+        response = self.update([{"id": other.id, "unit_price": "1.00"}])
+        self.assertEqual(response.status_code, 404)
+        other.refresh_from_db()
+        self.assertEqual(other.unit_price, Decimal("10.50"))
+
+
+class InventoryImportTests(MenuTestMixin, TestCase):
+    header = (
+        "name,menu_type,menu_subtype,unit_category,unit_price,total_quantity,"
+        "available_quantity,item_image\n"
+    )
+
+    def test_import_creates_and_updates_items(self):
+        rows = (
+            "Item 0,Veg,Starters,plate,12.00,50,40,\n"
+            "Soup,Veg,Soups,plate,5.00,20,20,soup.png\n"
+            "Cake,Veg,Desserts,slice,4.00,10,10,\n"
+        )
+        upload = SimpleUploadedFile("menu.csv", (self.header + rows).encode())
+        with mock.patch(
+            "restaurant.Inventory.importer.schedule_derivatives"
+        ) as schedule:
+            response = self.client.post(
+                "/api/restaurant/inventory/import/", {"file": upload}
+            )
+        self.assertEqual(response.status_code, 207)
+        report = response.data["detail"]
+        self.assertEqual((report["created"], report["updated"]), (1, 1))
+        self.assertEqual(report["errors"][0]["row"], 4)
+        self.assertEqual(Inventory.objects.get(name="Item 0").available_quantity, 40)
+        soup = Inventory.objects.get(name="Soup")
+        self.assertEqual(soup.menu_subtype.name, "Soups")
+        # Bulk writes skip post_save, so the importer resizes images itself.
+        self.assertEqual(schedule.call_args[0][0].name, "soup.png")
+
+    def test_undecodable_tail_keeps_imported_rows_and_invalidates_menu(self):
+        # The menu is cached before the import.
+        self.client.get("/api/restaurant/inventory/list/")
+        version = get_menu_version(self.restaurant.id)
+        rows = "".join(
+            f"Dish {index},Veg,Mains,plate,9.00,10,10,\n" for index in range(500)
+        )
+        file = BytesIO((self.header + rows).encode() + b"Bad \xff,Veg\n")
+        with self.captureOnCommitCallbacks(execute=True):
+            report = import_inventory(self.restaurant, file, batch_size=100)
+        self.assertGreater(report["created"], 0)
+        self.assertEqual(
+            report["errors"][-1]["errors"],
+            {"file": ["The file must be a UTF-8 encoded CSV file."]},
+        )
+        self.assertNotEqual(get_menu_version(self.restaurant.id), version)
+        response = self.client.get("/api/restaurant/inventory/list/")
+        self.assertEqual(len(response.json()["detail"]), 6 + report["created"])
+
+
+class MediaStorageTests(MenuTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        caches["default"].clear()
+
+    def collect_garbage(self):
+        call_command("collect_media_garbage", grace_period=60, stdout=StringIO())
+
+    def test_identical_uploads_share_one_file(self):
+        first, second = Inventory.objects.all()[:2]
+        first.item_image.save("dish.PNG", ContentFile(b"dish"))
+        second.item_image.save("other.png", ContentFile(b"dish"))
+        self.assertEqual(first.item_image.name, second.item_image.name)
+        self.assertRegex(
+            first.item_image.name, r"^[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.png$"
+        )
+
+    def test_garbage_collection_keeps_referenced_and_recent_files(self):
+        first, second = Inventory.objects.all()[:2]
+        first.item_image.save("dish.png", ContentFile(b"dish"))
+        second.item_image.save("dish.png", ContentFile(b"dish"))
+        name = first.item_image.name
+        derivative = default_storage.save(
+            derivative_name(name, 160, "webp"), ContentFile(b"small")
+        )
+        orphan = default_storage.save("old.png", ContentFile(b"old"))
+        for stored in (name, derivative, orphan):
+            os.utime(default_storage.path(stored), (0, 0))
+
+        first.delete()
+        self.collect_garbage()
+        self.assertTrue(default_storage.exists(name))
+        self.assertTrue(default_storage.exists(derivative))
+        self.assertFalse(default_storage.exists(orphan))
+
+        second.delete()
+        # Uploading the orphan again makes it recent, so it survives until
+        # the row referring to it is committed.
+        self.assertEqual(default_storage.save("again.png", ContentFile(b"dish")), name)
+        self.collect_garbage()
+        self.assertTrue(default_storage.exists(name))
+
+        os.utime(default_storage.path(name), (0, 0))
+        self.collect_garbage()
+        self.assertFalse(default_storage.exists(name))
+        self.assertFalse(default_storage.exists(derivative))
+
+    def test_only_content_addressed_files_are_cached_forever(self):
+        name = default_storage.save("dish.png", ContentFile(b"dish"))
+        derivative = default_storage.save(
+            derivative_name(name, 160, "webp"), ContentFile(b"small")
+        )
+        request = RequestFactory().get("/")
+        response = serve_media(request, name, document_root=self.media_root)
+        self.assertEqual(response["Cache-Control"], IMMUTABLE_CACHE_CONTROL)
+        response = serve_media(request, derivative, document_root=self.media_root)
+        self.assertNotIn("Cache-Control", response)
+
+    def test_derivative_availability_is_remembered(self):
+        item = Inventory.objects.first()
+        image = BytesIO()
+        Image.new("RGB", (400, 300), "red").save(image, "PNG")
+        item.item_image.save("dish.png", ContentFile(image.getvalue()))
+        with mock.patch.object(
+            ContentAddressedStorage,
+            "exists",
+            autospec=True,
+            side_effect=FileSystemStorage.exists,
+        ) as exists:
+            self.assertIsNone(derivative_urls(item.item_image))
+            self.assertIsNone(derivative_urls(item.item_image))
+            self.assertEqual(exists.call_count, 1)
+
+            generate_derivatives(item.item_image.name)
+            exists.reset_mock()
+            urls = derivative_urls(item.item_image)
+            self.assertEqual(exists.call_count, 0)
+        self.assertEqual(set(urls), {"160", "320", "640"})
+        self.assertEqual(
+            urls["160"]["webp"],
+            default_storage.url(derivative_name(item.item_image.name, 160, "webp")),
+        )
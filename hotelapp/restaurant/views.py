@@ -26,6 +26,7 @@ from .models import Table
 import qrcode
 from django.db.models import Q
 from django.core.serializers import serialize
+from hotelapp.pagination import paginate_queryset
 
 class TableQRList(APIView):
     
@@ -99,6 +100,7 @@ class TableListApiView(APIView):
     def get(self, request):
         restaurantid = request.user.restaurant.id
         tables = Table.objects.filter(restaurant = restaurantid)
+        tables, pagination_info = paginate_queryset(request, tables)
         restaurant_serializer = TableInputSerializer(
             tables, many=True, context={"request": request}
         )
@@ -108,6 +110,8 @@ class TableListApiView(APIView):
             "detail": restaurant_serializer.data,
             "message": "",
         }
+        if pagination_info is not None:
+            response_data["pagination_info"] = pagination_info
         return Response(response_data)
 class TableCreateApiView(APIView):
     """
@@ -332,7 +336,9 @@ class RestaurantListApiView(APIView):
     permission_classes = [permissions.IsAuthenticated, IsSuperAdmin]
 
     def get(self, request):
-        restaurants = Restaurant.objects.all()
+        restaurants, pagination_info = paginate_queryset(
+            request, Restaurant.objects.all()
+        )
         restaurant_serializer = RestaurantOutputSerializer(
             restaurants, many=True, context={"request": request}
         )
@@ -342,6 +348,8 @@ class RestaurantListApiView(APIView):
             "detail": restaurant_serializer.data,
             "message": "",
         }
+        if pagination_info is not None:
+            response_data["pagination_info"] = pagination_info
         return Response(response_data, status=status.HTTP_200_OK)
 
 